@@ -1,10 +1,45 @@
-import pygame
+import os
 import sys
+import time
+
+STARTUP_BEGIN = time.perf_counter()
+
+# pygame tries pkg_resources to find its bundled font inside zipped
+# installs; importing it costs several times as much as pygame itself.
+# When started as the game (not imported by a tool) we do without it.
+if __name__ == "__main__":
+    sys.modules.setdefault("pkg_resources", None)
+
+import pygame
+import json
 import random
 import math
+import struct
+import zlib
+import queue
+import pstats
+import cProfile
+import gc
+import heapq
+import tracemalloc
+import argparse
+import threading
+import traceback
+import logging
+import logging.handlers
+from array import array
+from bisect import bisect_right
+from collections import deque
 
-# Initialize Pygame
-pygame.init()
+try:
+    from pygame._sdl2 import video as sdl2_video
+except ImportError:          # pygame 1.x / builds without _sdl2
+    sdl2_video = None
+
+# Warnings and errors (failed writes, skipped files, failed background
+# tasks) go here; main() sends them to stderr or to --log-file.
+log = logging.getLogger('pvz')
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
 
 # ==========================================
 # CONSTANTS
@@ -18,6 +53,15 @@ SIDEBAR_WIDTH = 200
 GAME_WIDTH = GRID_COLS * CELL_SIZE
 GAME_HEIGHT = GRID_ROWS * CELL_SIZE
 
+# Layout offsets, derived from the cell size instead of hard-coded pixels
+PAD = CELL_SIZE // 16                 # small inset around text (5px)
+BAR_OFFSET = CELL_SIZE // 8           # health bars sit this far above a sprite
+BAR_HEIGHT = CELL_SIZE // 16
+SEED_SLOT_TOP = CELL_SIZE * 5 // 8    # seed bank in the sidebar
+SEED_SLOT_PITCH = CELL_SIZE * 3 // 4
+SEED_SLOT_HEIGHT = CELL_SIZE * 5 // 8
+SIDEBAR_MARGIN = CELL_SIZE // 8
+
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -46,23 +90,25 @@ STONE_LIGHT = (160, 160, 160)
 # Game settings
 SUN_START = 50
 SUN_DROP_RATE = 600          # frames between natural sun drops
-ZOMBIE_SPAWN_BASE = 400
 PEA_SHOOT_COOLDOWN = 90
 SUNFLOWER_GEN_RATE = 600
+COOLDOWN_FRAMES = None       # per-plant seed packet recharge in frames, None = no recharge
+LAWN_MOWERS = False          # each row has a mower that clears it once instead of losing
+GROUND_COLOR = None          # fill for the strip between the lawn and the screen bottom
 
 # Plant Data
 PLANT_DATA = {
-    'peashooter': {'cost': 100, 'health': 100, 'cooldown': 0, 'unlock': '1-1'},
-    'sunflower':  {'cost': 50,  'health': 100, 'cooldown': 0, 'unlock': '1-1'},
-    'wallnut':    {'cost': 50,  'health': 800, 'cooldown': 0, 'unlock': '1-4'},
-    'cherrybomb': {'cost': 150, 'health': 100, 'cooldown': 0, 'unlock': '1-2'},
-    'snowpea':    {'cost': 175, 'health': 100, 'cooldown': 0, 'unlock': '1-6'},
-    'repeater':   {'cost': 200, 'health': 100, 'cooldown': 0, 'unlock': '1-8'},
-    'potatomine': {'cost': 25,  'health': 100, 'cooldown': 200, 'unlock': '1-5'},
-    'chomper':    {'cost': 150, 'health': 100, 'cooldown': 0, 'unlock': '1-7'},
-    'puffshroom': {'cost': 0,   'health': 100, 'cooldown': 0, 'unlock': '2-1'},
-    'lilypad':    {'cost': 25,  'health': 100, 'cooldown': 0, 'unlock': '2-1'},
-    'squash':     {'cost': 50,  'health': 100, 'cooldown': 0, 'unlock': '1-3'}
+    'peashooter': {'cost': 100, 'health': 100, 'cooldown': 0},
+    'sunflower':  {'cost': 50,  'health': 100, 'cooldown': 0},
+    'wallnut':    {'cost': 50,  'health': 800, 'cooldown': 0},
+    'cherrybomb': {'cost': 150, 'health': 100, 'cooldown': 0},
+    'snowpea':    {'cost': 175, 'health': 100, 'cooldown': 0},
+    'repeater':   {'cost': 200, 'health': 100, 'cooldown': 0},
+    'potatomine': {'cost': 25,  'health': 100, 'cooldown': 200},
+    'chomper':    {'cost': 150, 'health': 100, 'cooldown': 0},
+    'puffshroom': {'cost': 0,   'health': 100, 'cooldown': 0},
+    'lilypad':    {'cost': 25,  'health': 100, 'cooldown': 0},
+    'squash':     {'cost': 50,  'health': 100, 'cooldown': 0}
 }
 
 # Zombie Data
@@ -77,55 +123,357 @@ ZOMBIE_DATA = {
     'ducky':     {'health': 100, 'speed': 0.3, 'damage': 100}
 }
 
-# Set up display
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("AC'S PVZ 1.X")          # <-- Changed title
-clock = pygame.time.Clock()
-font = pygame.font.Font(None, 36)
-small_font = pygame.font.Font(None, 24)
-title_font = pygame.font.Font(None, 74)
+# Display, opened by init_display()
+CAPTION = "AC'S PVZ 1.X"
+window = None
+screen = None            # render target, see set_render_scale()
+clock = None             # frame timer of the pacer, also made by init_display()
 
 # ==========================================
-# HELPER FUNCTIONS
+# RENDER RESOLUTION
 # ==========================================
-def check_unlock(plant_name, level_str):
-    """Return True if plant is unlocked at the given level."""
-    unlocks = {
-        'peashooter': '1-1', 'sunflower': '1-1', 'cherrybomb': '1-2',
-        'squash': '1-3', 'wallnut': '1-4', 'potatomine': '1-5',
-        'snowpea': '1-6', 'chomper': '1-7', 'repeater': '1-8',
-        'puffshroom': '2-1', 'lilypad': '2-1'
-    }
-    if plant_name not in unlocks:
-        return True
-    # Compare level strings (e.g. "2-1" vs "1-5")
-    current_world, current_level = map(int, level_str.split('-'))
-    req_world, req_level = map(int, unlocks[plant_name].split('-'))
-    if current_world > req_world:
-        return True
-    if current_world == req_world and current_level >= req_level:
-        return True
-    return False
+# The game logic and all layout work in logical pixels (SCREEN_WIDTH x
+# SCREEN_HEIGHT). Frames are drawn at RENDER_SCALE times that size into
+# `screen` and scaled to the window in one pass when presented, so a cheaper
+# internal resolution needs no separate build of the game.
+RENDER_SCALE = 1.0
+MIN_RENDER_SCALE = 0.25          # --render-scale range
+MAX_RENDER_SCALE = 4.0
+FONT_SIZES = {'font': 36, 'small_font': 24, 'title_font': 74}
+
+class CachedFont:
+    """A pygame Font that opens on first use and keeps what it renders.
+
+    Menus, the sidebar and the entities draw the same few dozen strings
+    every frame, so each is rendered once and blitted from then on. Warmup
+    fills the cache ahead of time while the menu is idle.
+    """
+    MAX_ENTRIES = 512
+
+    def __init__(self, size):
+        self.size = size
+        self.font = None
+        self.surfaces = {}
+
+    def load(self):
+        if self.font is None:
+            self.font = pygame.font.Font(None, self.size)
+        return self.font
+
+    def render(self, text, antialias, color, background=None):
+        key = (text, antialias, color, background)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= self.MAX_ENTRIES:
+                self.surfaces.clear()
+            surface = self.surfaces[key] = self.load().render(text, antialias, color, background)
+        return surface
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+font = CachedFont(FONT_SIZES['font'])
+small_font = CachedFont(FONT_SIZES['small_font'])
+title_font = CachedFont(FONT_SIZES['title_font'])
+
+def sc(value):
+    """Convert a logical coordinate to internal render pixels."""
+    return int(value * RENDER_SCALE)
+
+def sc_rect(rect):
+    x, y, w, h = rect
+    return pygame.Rect(sc(x), sc(y), sc(w), sc(h))
+
+def sc_width(width):
+    """Scale an outline width, keeping outlines at least one pixel wide."""
+    if width == 0:
+        return 0
+    return max(1, round(width * RENDER_SCALE))
+
+def draw_rect(surface, color, rect, width=0):
+    pygame.draw.rect(surface, color, sc_rect(rect), sc_width(width))
+
+def draw_circle(surface, color, center, radius, width=0):
+    pygame.draw.circle(surface, color, (sc(center[0]), sc(center[1])),
+                       max(1, sc(radius)), sc_width(width))
+
+def blit(surface, source, pos):
+    surface.blit(source, (sc(pos[0]), sc(pos[1])))
+
+def text_width(text):
+    """Width of a rendered text surface in logical pixels."""
+    return int(text.get_width() / RENDER_SCALE)
+
+def internal_size():
+    return (sc(SCREEN_WIDTH), sc(SCREEN_HEIGHT))
+
+def set_render_scale(scale):
+    """Switch the internal render resolution, rebuilding fonts and `screen`."""
+    global RENDER_SCALE, screen, font, small_font, title_font
+    RENDER_SCALE = scale
+    font = CachedFont(max(8, round(FONT_SIZES['font'] * scale)))
+    small_font = CachedFont(max(8, round(FONT_SIZES['small_font'] * scale)))
+    title_font = CachedFont(max(8, round(FONT_SIZES['title_font'] * scale)))
+    screen = backend.make_screen()
+    backend.invalidate()
+
+def set_window_size(size):
+    """Open the window at `size`; the render resolution is kept."""
+    global window
+    window = pygame.display.set_mode(size)
+    set_render_scale(RENDER_SCALE)
+
+def init_display(size=None):
+    """Start SDL's display and font subsystems and open the window.
+
+    Nothing touches SDL when this module is imported; main() calls this
+    first, as must tools that draw. pygame.init() would also start audio,
+    joysticks and timers, none of which the game uses.
+    """
+    global clock
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_caption(CAPTION)
+    clock = pygame.time.Clock()
+    set_window_size(size or (SCREEN_WIDTH, SCREEN_HEIGHT))
+
+# Costly visual features the quality governor can switch off, ordered from the
+# first to go to the last. render_scale is relative to the --render-scale the
+# game was started with.
+QUALITY_LEVELS = [
+    {'speckles': True,  'water_anim': True,  'health_bars': True,  'entity_text': True,  'render_scale': 1.0},
+    {'speckles': False, 'water_anim': True,  'health_bars': True,  'entity_text': True,  'render_scale': 1.0},
+    {'speckles': False, 'water_anim': False, 'health_bars': True,  'entity_text': True,  'render_scale': 1.0},
+    {'speckles': False, 'water_anim': False, 'health_bars': False, 'entity_text': True,  'render_scale': 1.0},
+    {'speckles': False, 'water_anim': False, 'health_bars': False, 'entity_text': False, 'render_scale': 1.0},
+    {'speckles': False, 'water_anim': False, 'health_bars': False, 'entity_text': False, 'render_scale': 0.75},
+    {'speckles': False, 'water_anim': False, 'health_bars': False, 'entity_text': False, 'render_scale': 0.5},
+]
+quality = dict(QUALITY_LEVELS[0])
+
+def window_to_logical(pos, window_size):
+    x, y = pos
+    w, h = window_size
+    return (int(x * SCREEN_WIDTH / w), int(y * SCREEN_HEIGHT / h))
+
+def event_pos(event):
+    """Position of a mouse event in logical pixels."""
+    return backend.to_logical(event.pos)
+
+# ==========================================
+# LEVELS
+# ==========================================
+# Level rules are data, in levels.json next to this script:
+# - "unlocks": the level from which each seed packet can be used
+# - "environments": the water rows of each, and whether sun falls
+# - "worlds": the environment of each world, "*" for all others
+# - "schedule": zombies per level (plus per sublevel), the tick of the
+#   first one and the delay between them (minus per sublevel)
+# - "waves": rules tried in order; the first whose "worlds", "modes" and
+#   "from_level" (sublevel) all match gives the zombie mix. "zombies" is
+#   [[type, r], ...], sending the first type whose r is above a random
+#   number in [0, 1), or with "pick": "uniform" a list of equally likely
+#   types. "water_zombie" goes down the water rows instead. A rule may
+#   override any "schedule" value too, so a survival rule can send a wave
+#   of thousands without code changes.
+# level_rules() compiles a level once into a LevelRules of flat tuples and
+# arrays, so Game neither parses nor branches on the level while playing.
+LEVELS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels.json")
+
+def level_key(level_str):
+    """Sort key of a "world-level" string."""
+    return tuple(map(int, level_str.split('-')))
+
+def load_levels(path):
+    with open(path) as f:
+        data = json.load(f)
+    data['unlocks'] = {plant: level_key(level) for plant, level in data['unlocks'].items()}
+    return data
+
+LEVELS = None                # levels.json, read by levels() on first use
+LEVEL_RULES = {}             # (level_str, mode) -> LevelRules
+
+def levels():
+    global LEVELS
+    if LEVELS is None:
+        LEVELS = load_levels(LEVELS_FILE)
+    return LEVELS
+
+def unlocked_plants(level_str):
+    """The plants whose seed packets can be used at a level."""
+    key = level_key(level_str)
+    return frozenset(p for p in PLANT_DATA if levels()['unlocks'].get(p, (0, 0)) <= key)
+
+def wave_matches(rule, world, sublevel, mode):
+    return (world in rule.get('worlds', (world,)) and mode in rule.get('modes', (mode,))
+            and sublevel >= rule.get('from_level', 0))
+
+class LevelRules:
+    """One level of levels.json, compiled for Game."""
+
+    def __init__(self, level_str, mode):
+        world, sublevel = level_key(level_str)
+        data = levels()
+        self.env = data['worlds'].get(str(world), data['worlds']['*'])
+        environment = data['environments'][self.env]
+        self.water_rows = tuple(environment['water_rows'])
+        self.sun_drop = environment['sun_drop']
+        self.unlocked = unlocked_plants(level_str)
+
+        wave = next((rule for rule in data['waves'] if wave_matches(rule, world, sublevel, mode)), None)
+        if wave is None:
+            raise ValueError("%s: no wave for %s %s" % (LEVELS_FILE, mode, level_str))
+        schedule = {name: wave.get(name, value) for name, value in data['schedule'].items()}
+        self.zombies_to_spawn = schedule['count'] + schedule['count_per_level'] * sublevel
+        self.first_spawn = schedule['first_spawn']
+        self.spawn_delay = schedule['spawn_delay']
+        self.spawn_speedup = schedule['delay_per_level'] * sublevel
+
+        # The zombie forced on each row (the water zombie on water rows), and
+        # the land mix as types with the thresholds that pick them.
+        water = wave.get('water_zombie')
+        self.row_zombie = tuple(water if row in self.water_rows else None for row in range(GRID_ROWS))
+        self.uniform = wave.get('pick') == 'uniform'
+        if self.uniform:
+            self.types = tuple(wave['zombies'])
+            self.thresholds = array('d')
+        else:
+            self.types = tuple(z_type for z_type, _ in wave['zombies'])
+            self.thresholds = array('d', (r for _, r in wave['zombies']))
+            if not self.thresholds or self.thresholds[-1] < 1:
+                raise ValueError("%s: the last zombie of a mix needs r = 1" % LEVELS_FILE)
+        for z_type in self.types + ((water,) if water else ()):
+            if z_type not in ZOMBIE_DATA:
+                raise ValueError("%s: unknown zombie %r" % (LEVELS_FILE, z_type))
+
+def level_rules(level_str, mode):
+    key = (level_str, mode)
+    if key not in LEVEL_RULES:
+        LEVEL_RULES[key] = LevelRules(level_str, mode)
+    return LEVEL_RULES[key]
 
 # ==========================================
 # STONE TEXTURE (PvZ1 style)
 # ==========================================
+# Speckles use their own generator so that drawing never consumes numbers from
+# the global one the game logic spawns zombies with.
+stone_random = random.Random()
+
+STONE_SPECKLES = 300
+
 def draw_stone_background(screen, rect):
     """Fill the given rectangle with a speckled stone texture."""
-    pygame.draw.rect(screen, STONE_COLOR, rect)
-    # Add random light and dark speckles
-    for _ in range(300):
-        x = random.randint(rect.left, rect.right - 1)
-        y = random.randint(rect.top, rect.bottom - 1)
-        if random.random() < 0.5:
+    area = sc_rect(rect)
+    pygame.draw.rect(screen, STONE_COLOR, area)
+    if not quality['speckles']:
+        return
+    # Add random light and dark speckles (same density at any render scale)
+    for _ in range(int(STONE_SPECKLES * RENDER_SCALE * RENDER_SCALE)):
+        x = stone_random.randint(area.left, area.right - 1)
+        y = stone_random.randint(area.top, area.bottom - 1)
+        if stone_random.random() < 0.5:
             color = STONE_LIGHT
         else:
             color = STONE_DARK
         pygame.draw.circle(screen, color, (x, y), 1)
 
+# ==========================================
+# STARTUP AND WARM-UP
+# ==========================================
+STARTUP_REPORT = False       # print the startup milestones once the menu shows
+
+class StartupTimer:
+    """Milestones from the start of the module to the first menu frame."""
+
+    def __init__(self):
+        self.marks = []
+        self.first_frame_ms = None
+
+    def mark(self, name):
+        self.marks.append((name, (time.perf_counter() - STARTUP_BEGIN) * 1000))
+
+    def first_frame(self):
+        """Call after presenting a menu frame; only the first call counts."""
+        if self.first_frame_ms is not None:
+            return
+        self.mark('first frame')
+        self.first_frame_ms = self.marks[-1][1]
+        warmup.start()
+        if STARTUP_REPORT:
+            print(self.summary())
+
+    def summary(self):
+        return "startup: " + ", ".join("%s %.1f ms" % mark for mark in self.marks)
+
+startup = StartupTimer()
+
+def warm_texts():
+    """The strings levels draw most, as {font name: [(text, color)]}."""
+    small = [(f"{p[:6]}({data['cost']})", BLACK) for p, data in PLANT_DATA.items()]
+    small += [(p[0].upper(), BLACK) for p in PLANT_DATA]
+    small += [("Zzz", WHITE), ("Z", BLACK), ("25", BLACK)]
+    small += [(str(seconds), BLACK) for seconds in range(60)]      # recharge timers
+    small += [(f"Mode: {mode}", BLACK) for mode in ("adventure", "mini", "survival", "zen")]
+    large = [(f"Sun: {sun}", BLACK) for sun in range(0, 1001, 25)]
+    large += [("GAME OVER", RED), ("LEVEL COMPLETE!", GREEN), ("PAUSED", YELLOW)]
+    return {'small_font': small, 'font': large}
+
+class Warmup:
+    """Render the common level texts into the font caches while the menu idles.
+
+    Started once the first menu frame is up, so it never delays that frame.
+    SDL_ttf must only be used from one thread, so instead of a background
+    thread the menu calls step() after each frame it presents, which renders
+    on the main thread until SLICE_MS of the frame are used up.
+    """
+    SLICE_MS = 2.0
+
+    def __init__(self):
+        self.pending = None      # (font name, text, color) still to render
+        self.ms = None           # render time spent so far
+
+    def start(self):
+        if self.pending is not None:
+            return
+        self.pending = deque((name, text, color) for name, texts in warm_texts().items()
+                             for text, color in texts)
+        self.ms = 0.0
+
+    def step(self):
+        """Render pending texts for up to SLICE_MS; returns whether any are left."""
+        if not self.pending:
+            return False
+        start = time.perf_counter()
+        end = start + self.SLICE_MS / 1000
+        while self.pending and time.perf_counter() < end:
+            name, text, color = self.pending.popleft()
+            # By name: set_render_scale() replaces the font objects.
+            globals()[name].render(text, True, color)
+        self.ms += (time.perf_counter() - start) * 1000
+        return bool(self.pending)
+
+warmup = Warmup()
+
 # ==========================================
 # INFO SCREEN DISPLAY (How to Play, Controls, Credits, About)
 # ==========================================
+# Menu and info screen positions in logical pixels, derived from the window,
+# cell and font sizes so that every profile gets the same proportions.
+# apply_profile() recomputes them.
+def menu_layout():
+    w, h, text = SCREEN_WIDTH, SCREEN_HEIGHT, FONT_SIZES['font']
+    return {
+        'title_x': w*3//20, 'title_y': h//12,      # menu title, left of the centre line
+        'button_size': (w//5, h//10),              # main_menu() widens it for long labels
+        'column_gap': w//25, 'buttons_y': h//3, 'button_pitch': h*7//60,
+        'button_text_dy': text*5//12, 'button_border': h//200,
+        'sun': (CELL_SIZE*7//8, CELL_SIZE*7//16, CELL_SIZE*7//20),   # centre, outer and inner radius
+        'sun_text': (CELL_SIZE*9//40, text*5//12),
+        'info_title_y': h*2//15, 'info_lines_y': h*3//10, 'info_pitch': h//15, 'info_bottom': h//10,
+    }
+
+MENU_LAYOUT = menu_layout()
+
 def draw_info_background(screen):
     """Draw the lawn background with stone sidebar."""
     for row in range(GRID_ROWS):
@@ -133,39 +481,46 @@ def draw_info_background(screen):
             rect = pygame.Rect(col*CELL_SIZE, row*CELL_SIZE, CELL_SIZE, CELL_SIZE)
             base_color = LIGHT_GREEN
             alt_color = DARK_GREEN
-            pygame.draw.rect(screen, base_color if (row+col)%2==0 else alt_color, rect)
-            pygame.draw.rect(screen, BLACK, rect, 1)
+            draw_rect(screen, base_color if (row+col)%2==0 else alt_color, rect)
+            draw_rect(screen, BLACK, rect, 1)
     # Stone sidebar
     sidebar_rect = pygame.Rect(GAME_WIDTH, 0, SIDEBAR_WIDTH, SCREEN_HEIGHT)
     draw_stone_background(screen, sidebar_rect)
 
+def draw_info_screen(title, lines, instruction):
+    draw_info_background(screen)
+    # Draw a semi‑transparent overlay for readability
+    overlay = pygame.Surface(screen.get_size())
+    overlay.set_alpha(200)
+    overlay.fill(BLACK)
+    blit(screen, overlay, (0, 0))
+
+    # Title
+    title_surf = title_font.render(title, True, YELLOW)
+    blit(screen, title_surf, (SCREEN_WIDTH//2 - text_width(title_surf)//2, MENU_LAYOUT['info_title_y']))
+
+    # Lines
+    y_offset = MENU_LAYOUT['info_lines_y']
+    # Long pages close up so the last line stays above the instruction
+    room = SCREEN_HEIGHT - MENU_LAYOUT['info_bottom'] - y_offset
+    pitch = min(MENU_LAYOUT['info_pitch'], room // max(1, len(lines)))
+    for line in lines:
+        text = font.render(line, True, WHITE)
+        blit(screen, text, (SCREEN_WIDTH//2 - text_width(text)//2, y_offset))
+        y_offset += pitch
+
+    # Instruction at bottom
+    instr = small_font.render(instruction, True, GRAY)
+    blit(screen, instr, (SCREEN_WIDTH//2 - text_width(instr)//2,
+                         SCREEN_HEIGHT - MENU_LAYOUT['info_bottom']))
+
+    backend.present_screen()
+
 def display_info_screen(title, lines):
     """Show a full‑screen info panel. Press ESC or click to return."""
     waiting = True
     while waiting:
-        draw_info_background(screen)
-        # Draw a semi‑transparent overlay for readability
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(200)
-        overlay.fill(BLACK)
-        screen.blit(overlay, (0, 0))
-
-        # Title
-        title_surf = title_font.render(title, True, YELLOW)
-        screen.blit(title_surf, (SCREEN_WIDTH//2 - title_surf.get_width()//2, 80))
-
-        # Lines
-        y_offset = 180
-        for line in lines:
-            text = font.render(line, True, WHITE)
-            screen.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, y_offset))
-            y_offset += 40
-
-        # Instruction at bottom
-        instr = small_font.render("Press ESC or click to return to menu", True, GRAY)
-        screen.blit(instr, (SCREEN_WIDTH//2 - instr.get_width()//2, SCREEN_HEIGHT-60))
-
-        pygame.display.flip()
+        draw_info_screen(title, lines, "Press ESC or click to return to menu")
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -174,7 +529,22 @@ def display_info_screen(title, lines):
                 waiting = False
             if event.type == pygame.MOUSEBUTTONDOWN:
                 waiting = False
-        clock.tick(60)
+        pacer.wait(60)
+
+def ask_screen(title, lines):
+    """An info panel with a yes/no question: True, False or "quit"."""
+    while True:
+        draw_info_screen(title, lines, "Y or Enter: yes    N or ESC: no")
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return "quit"
+            if event.type == pygame.KEYDOWN:
+                if event.key in (pygame.K_y, pygame.K_RETURN, pygame.K_KP_ENTER):
+                    return True
+                if event.key in (pygame.K_n, pygame.K_ESCAPE):
+                    return False
+        pacer.wait(60)
 
 # ==========================================
 # MAIN MENU (with two columns)
@@ -186,8 +556,8 @@ def draw_menu_background(screen, frame_count):
             rect = pygame.Rect(col*CELL_SIZE, row*CELL_SIZE, CELL_SIZE, CELL_SIZE)
             base_color = LIGHT_GREEN
             alt_color = DARK_GREEN
-            pygame.draw.rect(screen, base_color if (row+col)%2==0 else alt_color, rect)
-            pygame.draw.rect(screen, BLACK, rect, 1)
+            draw_rect(screen, base_color if (row+col)%2==0 else alt_color, rect)
+            draw_rect(screen, BLACK, rect, 1)
     # Stone sidebar (replaces plain gray)
     sidebar_rect = pygame.Rect(GAME_WIDTH, 0, SIDEBAR_WIDTH, SCREEN_HEIGHT)
     draw_stone_background(screen, sidebar_rect)
@@ -197,11 +567,11 @@ def draw_menu_sidebar(screen):
     plants = ['peashooter', 'sunflower', 'wallnut', 'cherrybomb',
               'snowpea', 'repeater', 'potatomine', 'chomper',
               'puffshroom', 'lilypad', 'squash']
-    y = 50
     for i, p in enumerate(plants):
-        btn = pygame.Rect(GAME_WIDTH+10, y + i*60, 180, 50)
+        btn = pygame.Rect(GAME_WIDTH+SIDEBAR_MARGIN, SEED_SLOT_TOP + i*SEED_SLOT_PITCH,
+                          SIDEBAR_WIDTH - 2*SIDEBAR_MARGIN, SEED_SLOT_HEIGHT)
         # Outer border (slot)
-        pygame.draw.rect(screen, BLACK, btn, 3)
+        draw_rect(screen, BLACK, btn, 3)
         # Inner background (seed packet)
         color_map = {
             'peashooter': GREEN,
@@ -217,25 +587,25 @@ def draw_menu_sidebar(screen):
             'squash': ORANGE
         }
         color = color_map.get(p, WHITE)
-        inner_rect = btn.inflate(-10, -10)
-        pygame.draw.rect(screen, color, inner_rect)
+        inner_rect = btn.inflate(-2*PAD, -2*PAD)
+        draw_rect(screen, color, inner_rect)
         # Plant initial
         letter = p[0].upper()
         txt = small_font.render(letter, True, BLACK)
-        screen.blit(txt, (inner_rect.x + 10, inner_rect.y + 10))
+        blit(screen, txt, (inner_rect.x + 2*PAD, inner_rect.y + 2*PAD))
         # Cost
         cost = PLANT_DATA[p]['cost']
         cost_txt = small_font.render(str(cost), True, BLACK)
-        screen.blit(cost_txt, (inner_rect.x + 120, inner_rect.y + 10))
+        blit(screen, cost_txt, (inner_rect.x + SIDEBAR_WIDTH*3//5, inner_rect.y + 2*PAD))
 
 def draw_menu_sun(screen):
     """Draw a sun with a number (like the sun counter)."""
-    sun_x = 70
-    sun_y = 70
-    pygame.draw.circle(screen, YELLOW, (sun_x, sun_y), 35)
-    pygame.draw.circle(screen, ORANGE, (sun_x, sun_y), 28)
+    sun_x = sun_y = MENU_LAYOUT['sun'][0]
+    draw_circle(screen, YELLOW, (sun_x, sun_y), MENU_LAYOUT['sun'][1])
+    draw_circle(screen, ORANGE, (sun_x, sun_y), MENU_LAYOUT['sun'][2])
     text = font.render("50", True, BLACK)
-    screen.blit(text, (sun_x - 18, sun_y - 15))
+    dx, dy = MENU_LAYOUT['sun_text']
+    blit(screen, text, (sun_x - dx, sun_y - dy))
 
 def main_menu():
     """Display the PvZ1-style main menu with two columns and return the selected action."""
@@ -264,16 +634,22 @@ def main_menu():
         # Draw the title
         title_shadow = title_font.render("AC'S PVZ", True, DARK_BROWN)   # updated title
         title_text = title_font.render("AC'S PVZ", True, (255, 255, 150))
-        screen.blit(title_shadow, (SCREEN_WIDTH//2 - 148, 52))
-        screen.blit(title_text, (SCREEN_WIDTH//2 - 150, 50))
+        title_x = SCREEN_WIDTH//2 - MENU_LAYOUT['title_x']
+        blit(screen, title_shadow, (title_x + 2, MENU_LAYOUT['title_y'] + 2))
+        blit(screen, title_text, (title_x, MENU_LAYOUT['title_y']))
 
         # Draw left column buttons (wooden plank style)
-        left_x = SCREEN_WIDTH//2 - 240
-        right_x = SCREEN_WIDTH//2 + 40
-        button_width = 200
-        button_height = 60
-        start_y = 200
-        spacing = 70
+        button_width, button_height = MENU_LAYOUT['button_size']
+        labels = {text: font.render(text, True, BLACK) for text, _ in left_buttons + right_buttons}
+        widest = max(text_width(label) for label in labels.values())
+        if widest > button_width:        # leave the labels a margin as wide as the plank's inset
+            button_width = widest + 2*PAD
+        left_x = SCREEN_WIDTH//2 - MENU_LAYOUT['column_gap'] - button_width
+        right_x = SCREEN_WIDTH//2 + MENU_LAYOUT['column_gap']
+        start_y = MENU_LAYOUT['buttons_y']
+        spacing = MENU_LAYOUT['button_pitch']
+        border = MENU_LAYOUT['button_border']
+        text_dy = MENU_LAYOUT['button_text_dy']
 
         rects = []  # store (rect, action)
 
@@ -281,25 +657,27 @@ def main_menu():
             y = start_y + i * spacing
             rect = pygame.Rect(left_x, y, button_width, button_height)
             # Wood grain
-            pygame.draw.rect(screen, (160, 100, 40), rect)
-            pygame.draw.rect(screen, (200, 140, 60), rect.inflate(-10, -10))
-            pygame.draw.rect(screen, BLACK, rect, 3)
-            txt_surf = font.render(text, True, BLACK)
-            screen.blit(txt_surf, (rect.centerx - txt_surf.get_width()//2, rect.centery - 15))
+            draw_rect(screen, (160, 100, 40), rect)
+            draw_rect(screen, (200, 140, 60), rect.inflate(-2*PAD, -2*PAD))
+            draw_rect(screen, BLACK, rect, border)
+            txt_surf = labels[text]
+            blit(screen, txt_surf, (rect.centerx - text_width(txt_surf)//2, rect.centery - text_dy))
             rects.append((rect, action))
 
         # Draw right column buttons
         for i, (text, action) in enumerate(right_buttons):
             y = start_y + i * spacing
             rect = pygame.Rect(right_x, y, button_width, button_height)
-            pygame.draw.rect(screen, (160, 100, 40), rect)
-            pygame.draw.rect(screen, (200, 140, 60), rect.inflate(-10, -10))
-            pygame.draw.rect(screen, BLACK, rect, 3)
-            txt_surf = font.render(text, True, BLACK)
-            screen.blit(txt_surf, (rect.centerx - txt_surf.get_width()//2, rect.centery - 15))
+            draw_rect(screen, (160, 100, 40), rect)
+            draw_rect(screen, (200, 140, 60), rect.inflate(-2*PAD, -2*PAD))
+            draw_rect(screen, BLACK, rect, border)
+            txt_surf = labels[text]
+            blit(screen, txt_surf, (rect.centerx - text_width(txt_surf)//2, rect.centery - text_dy))
             rects.append((rect, action))
 
-        pygame.display.flip()
+        backend.present_screen()
+        startup.first_frame()
+        warmup.step()
         frame_count += 1
 
         for event in pygame.event.get():
@@ -307,13 +685,817 @@ def main_menu():
                 return "quit"
             if event.type == pygame.MOUSEBUTTONDOWN:
                 for rect, action in rects:
-                    if rect.collidepoint(event.pos):
+                    if rect.collidepoint(event_pos(event)):
                         return action
-        clock.tick(60)
+        pacer.wait(60)
+
+# ==========================================
+# PROFILING
+# ==========================================
+current_stage = 'idle'       # innermost active span, read by the hitch and GC monitors
+
+class Span:
+    """Times one stage of a frame for the frame profiler and the tracer."""
+    __slots__ = ('name', 'args', 'start', 'outer')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        global current_stage
+        self.outer = current_stage
+        current_stage = self.name
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global current_stage
+        record_span(self.name, self.start, self.args)
+        current_stage = self.outer
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+NULL_SPAN = NullSpan()
+
+def span(name, args=None):
+    """Context manager around a named stage; costs next to nothing when off."""
+    if profiler.enabled or tracer.enabled or watchdog.enabled or memory.enabled:
+        return Span(name, args)
+    return NULL_SPAN
+
+def record_span(name, start, args=None):
+    """Report a stage that started at perf_counter() time `start` and ends now."""
+    end = time.perf_counter()
+    if profiler.enabled:
+        profiler.add(name, end - start)
+    if tracer.enabled:
+        tracer.events.append((name, start, end, args))
+
+class FrameProfiler:
+    """Rolling per-stage timings shown as an overlay (toggle with F3)."""
+    TOGGLE_KEY = pygame.K_F3
+    STAGES = ('update_plants', 'update_projectiles', 'update_zombies', 'update_suns',
+              'shooting_logic', 'draw_background', 'draw_entities', 'draw_sidebar',
+              'draw_overlay', 'flip')
+    REFRESH_FRAMES = 15          # rebuild the panel four times a second
+
+    def __init__(self, window=120, frame_window=600):
+        self.enabled = False
+        self.window = window
+        self.stage_ms = {}
+        self.current = {}
+        self.frame_ms = deque(maxlen=frame_window)
+        self.last_frame_end = None
+        self.panel = None
+        self.frames = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.stage_ms.clear()
+        self.current.clear()
+        self.frame_ms.clear()
+        self.last_frame_end = None
+        self.panel = None
+
+    def add(self, name, seconds):
+        self.current[name] = self.current.get(name, 0.0) + seconds * 1000
+
+    def end_frame(self):
+        """Close the current frame: fold its stage times into the rolling windows."""
+        for name, ms in self.current.items():
+            samples = self.stage_ms.get(name)
+            if samples is None:
+                samples = self.stage_ms[name] = deque(maxlen=self.window)
+            samples.append(ms)
+        self.current.clear()
+        now = time.perf_counter()
+        if self.last_frame_end is not None:
+            self.frame_ms.append((now - self.last_frame_end) * 1000)
+        self.last_frame_end = now
+        self.frames += 1
+
+    def percentile(self, fraction):
+        if not self.frame_ms:
+            return 0.0
+        ordered = sorted(self.frame_ms)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def rows(self, game):
+        """(label, value) pairs shown in the overlay."""
+        plants = sum(1 for row in game.grid for plant in row if plant)
+        rows = [("frame p50 / p99", "%.1f / %.1f ms" % (self.percentile(0.5), self.percentile(0.99))),
+                ("zombies / peas / suns", "%d / %d / %d" % (len(game.zombies), len(game.projectiles),
+                                                          len(game.suns))),
+                ("plants", str(plants))]
+        if latency.samples:
+            p50, p95, _ = latency.percentiles(flip for flip, _ in latency.samples)
+            rows.append(("click->flip p50 / p95", "%.1f / %.1f ms" % (p50, p95)))
+        for name in self.STAGES:
+            samples = self.stage_ms.get(name)
+            if samples:
+                rows.append((name, "%.2f ms" % (sum(samples) / len(samples))))
+        return rows
+
+    def draw(self, game):
+        """Draw the overlay on top of the current frame."""
+        if self.panel is None or self.frames % self.REFRESH_FRAMES == 0:
+            rows = [(small_font.render(label, True, WHITE), small_font.render(value, True, YELLOW))
+                    for label, value in self.rows(game)]
+            label_width = max(label.get_width() for label, _ in rows) + 12
+            width = label_width + max(value.get_width() for _, value in rows) + 8
+            height = sum(label.get_height() for label, _ in rows) + 8
+            self.panel = pygame.Surface((width, height))
+            self.panel.set_alpha(200)
+            y = 4
+            for label, value in rows:
+                self.panel.blit(label, (4, y))
+                self.panel.blit(value, (4 + label_width, y))
+                y += label.get_height()
+        backend.draw_panel(self.panel, (4, 4))
+
+profiler = FrameProfiler()
+
+class Tracer:
+    """Collect spans as Chrome/Perfetto trace events (open in ui.perfetto.dev).
+
+    Spans are appended to an in-memory list as plain tuples. Full batches are
+    handed to a writer thread, which does the JSON encoding and file I/O, so
+    the frame loop never formats or writes anything itself.
+    """
+    FLUSH_EVENTS = 20000
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.file = None
+        self.batches = None
+        self.writer = None
+        self.origin = 0.0
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+
+    def start(self, path):
+        self.file = open(path, 'w')
+        self.file.write('[\n')
+        self.file.write(json.dumps({"name": "process_name", "ph": "M", "pid": self.pid,
+                                    "args": {"name": "AC'S PVZ"}}))
+        self.origin = time.perf_counter()
+        self.batches = queue.Queue()
+        self.writer = threading.Thread(target=self.write_batches, name="trace-writer", daemon=True)
+        self.writer.start()
+        self.enabled = True
+
+    def instant(self, name, args=None):
+        if self.enabled:
+            now = time.perf_counter()
+            self.events.append((name, now, None, args))
+
+    def maybe_flush(self):
+        """Hand the buffer to the writer thread once it is large enough."""
+        if len(self.events) >= self.FLUSH_EVENTS:
+            self.flush()
+
+    def flush(self):
+        if self.events:
+            batch, self.events = self.events, []
+            self.batches.put(batch)
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.flush()
+        self.batches.put(None)
+        self.writer.join()
+        self.file.write('\n]\n')
+        self.file.close()
+
+    def write_batches(self):
+        while True:
+            batch = self.batches.get()
+            if batch is None:
+                return
+            chunks = []
+            for name, start, end, args in batch:
+                event = {"name": name, "cat": "pvz", "pid": self.pid, "tid": self.tid,
+                         "ts": round((start - self.origin) * 1e6, 1)}
+                if end is None:
+                    event["ph"] = "i"
+                    event["s"] = "p"
+                else:
+                    event["ph"] = "X"
+                    event["dur"] = round((end - start) * 1e6, 1)
+                if args:
+                    event["args"] = args
+                chunks.append(json.dumps(event))
+            self.file.write(',\n' + ',\n'.join(chunks))
+
+tracer = Tracer()
+
+class FrameCapture:
+    """Run cProfile over exactly the next `frames` frames (or headless ticks).
+
+    Each capture writes <prefix>.pstats for pstats/snakeviz and <prefix>.txt
+    with the top functions, named after the level and the frame range so
+    captures from different waves do not overwrite each other.
+    """
+    HOTKEY = pygame.K_F9
+    TOP_FUNCTIONS = 30
+
+    def __init__(self, frames=300, out_dir="."):
+        self.frames = frames
+        self.out_dir = out_dir
+        self.profile = None
+        self.remaining = 0
+        self.first_frame = 0
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def start(self, frame):
+        if self.profile is not None:
+            return
+        self.first_frame = frame
+        self.remaining = self.frames
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def end_frame(self, level_str, frame):
+        """Count a finished frame; stop and save once the capture is complete."""
+        if self.profile is None:
+            return None
+        self.remaining -= 1
+        if self.remaining > 0:
+            return None
+        return self.stop(level_str, frame)
+
+    def end_level(self, level_str, frame):
+        """Save a capture the level ended before it was complete, so it
+        neither runs on into the next level nor gets its name."""
+        if self.profile is None:
+            return None
+        return self.stop(level_str, frame)
+
+    def stop(self, level_str, frame):
+        self.profile.disable()
+        os.makedirs(self.out_dir, exist_ok=True)
+        prefix = os.path.join(self.out_dir, "pvz_profile_%s_f%d-%d" % (level_str, self.first_frame, frame))
+        self.profile.dump_stats(prefix + ".pstats")
+        with open(prefix + ".txt", "w") as summary:
+            summary.write("Level %s, frames %d-%d\n\n" % (level_str, self.first_frame, frame))
+            stats = pstats.Stats(self.profile, stream=summary)
+            stats.sort_stats("cumulative").print_stats(self.TOP_FUNCTIONS)
+            stats.sort_stats("tottime").print_stats(self.TOP_FUNCTIONS)
+        self.profile = None
+        return prefix
+
+capture = None
+
+class HitchWatchdog:
+    """Samples the main thread's stack while a frame runs over budget.
+
+    The game loop brackets each frame with begin_frame()/end_frame(). A
+    daemon thread wakes a few times per budget and, once the current frame
+    is late, grabs the main thread's stack through sys._current_frames().
+    Late frames are logged from the watchdog thread, with the Game stage
+    (from the active span), entity counts and the sampled stacks, so the
+    game loop itself only pays for two perf_counter() calls per frame.
+    """
+    MAX_SAMPLES = 8
+    LOG_BYTES = 1 << 20
+    LOG_BACKUPS = 3
+
+    def __init__(self):
+        self.enabled = False
+        self.budget = 0.025
+        self.current = None           # (frame, start, samples) of the running frame
+        self.late = queue.SimpleQueue()
+        self.main_thread = threading.main_thread().ident
+        self.log = logging.getLogger('pvz.hitch')
+        self.log.propagate = False
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self, budget_ms, path):
+        self.budget = budget_ms / 1000.0
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=self.LOG_BYTES, backupCount=self.LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        self.log.addHandler(handler)
+        self.log.setLevel(logging.INFO)
+        self.enabled = True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.watch, name='hitch-watchdog', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.stop_event.set()
+        self.thread.join()
+        self.write_late()
+        for handler in self.log.handlers[:]:
+            handler.close()
+            self.log.removeHandler(handler)
+
+    def begin_frame(self, frame):
+        self.current = (frame, time.perf_counter(), [])
+
+    def cancel_frame(self):
+        """Forget the running frame, e.g. before blocking in the pause screen."""
+        self.current = None
+
+    def end_frame(self, game):
+        current = self.current
+        self.current = None
+        if current is None:
+            return
+        frame, start, samples = current
+        elapsed = time.perf_counter() - start
+        if elapsed > self.budget:
+            plants = sum(plant is not None for row in game.grid for plant in row)
+            counts = (plants, len(game.zombies), len(game.projectiles), len(game.suns))
+            self.late.put((frame, elapsed, counts, samples))
+
+    def watch(self):
+        interval = self.budget / 4
+        while not self.stop_event.wait(interval):
+            current = self.current
+            if current is not None:
+                frame, start, samples = current
+                late_by = time.perf_counter() - start - self.budget
+                if late_by > 0 and len(samples) < self.MAX_SAMPLES:
+                    stack = sys._current_frames().get(self.main_thread)
+                    if stack is not None:
+                        samples.append((late_by, current_stage, traceback.format_stack(stack)))
+            self.write_late()
+
+    def write_late(self):
+        while True:
+            try:
+                frame, elapsed, counts, samples = self.late.get_nowait()
+            except queue.Empty:
+                return
+            stages = []
+            for _, stage, _ in samples:
+                if stage not in stages:
+                    stages.append(stage)
+            lines = ["hitch: frame %d took %.1f ms (budget %.0f ms) in %s, "
+                     "%d plants %d zombies %d projectiles %d suns"
+                     % ((frame, elapsed * 1000, self.budget * 1000,
+                         ", ".join(stages) or "an unsampled stage") + counts)]
+            previous = None
+            for late_by, sample_stage, stack in samples:
+                lines.append("  sample at +%.1f ms over budget in %s:" % (late_by * 1000, sample_stage))
+                if stack == previous:
+                    lines.append("    (same stack)")
+                else:
+                    lines.extend("    " + line.rstrip().replace("\n", "\n    ") for line in stack)
+                previous = stack
+            self.log.info("\n".join(lines))
+
+watchdog = HitchWatchdog()
+
+class MemoryMonitor:
+    """Per-frame allocation and GC-pause accounting for one level at a time.
+
+    tracemalloc gives the net bytes and the peak of each frame, gc.callbacks
+    times every collection and books it against the frame and stage it
+    landed in, and a snapshot taken after level load is diffed at level end
+    to list the top allocation sites of each subsystem (the game function
+    the allocation came from). The report is appended to a text file.
+
+    With freeze=True the level's long-lived objects are moved out of the
+    collector's reach with gc.freeze() right after load, so gen-2 passes
+    only walk what the level allocates afterwards. Callers pair
+    begin_level() with end_level() in a try/finally, which unfreezes them
+    again before the menus run.
+    """
+    TRACE_FRAMES = 12
+    WORST_FRAMES = 10
+    SLOW_COLLECTIONS = 10
+    SITES_PER_SUBSYSTEM = 5
+    SUBSYSTEMS = 8
+
+    def __init__(self):
+        self.enabled = False
+        self.freeze = False
+        self.frozen = False
+        self.path = None
+        self.level = None
+        self.frame = 0
+        self.gc_start = 0.0
+        self.collections = []
+        self.baseline = None
+
+    def start(self, path):
+        self.path = path
+        self.enabled = True
+        tracemalloc.start(self.TRACE_FRAMES)
+        gc.callbacks.append(self.on_gc)
+
+    def stop(self):
+        self.end_level()
+        if self.enabled:
+            gc.callbacks.remove(self.on_gc)
+            tracemalloc.stop()
+            self.enabled = False
+
+    def on_gc(self, phase, info):
+        if phase == "start":
+            self.gc_start = time.perf_counter()
+        elif self.level is not None:
+            self.collections.append((info["generation"], time.perf_counter() - self.gc_start,
+                                     info["collected"], self.frame, current_stage))
+
+    def begin_level(self, level_str):
+        if self.freeze:
+            gc.collect()
+            gc.freeze()
+            self.frozen = True
+        if not self.enabled:
+            return
+        self.level = level_str
+        self.frames = 0
+        self.net_total = 0
+        self.worst = []
+        self.collections = []
+        self.baseline = tracemalloc.take_snapshot()
+        self.frame_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def begin_frame(self, frame):
+        self.frame = frame
+
+    def end_frame(self):
+        current, peak = tracemalloc.get_traced_memory()
+        net = current - self.frame_memory
+        entry = (peak - self.frame_memory, net, self.frame)
+        if len(self.worst) < self.WORST_FRAMES:
+            heapq.heappush(self.worst, entry)
+        else:
+            heapq.heappushpop(self.worst, entry)
+        self.frames += 1
+        self.net_total += net
+        self.frame_memory = current
+        tracemalloc.reset_peak()
+
+    def end_level(self):
+        if self.frozen:
+            gc.unfreeze()
+            self.frozen = False
+        if not self.enabled or self.level is None:
+            return
+        level = self.level
+        self.level = None            # stop booking collections caused by the report itself
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)])
+        with open(self.path, "a") as report:
+            report.write("\n".join(self.report_lines(level, snapshot)) + "\n\n")
+        self.baseline = None
+
+    def report_lines(self, level, snapshot):
+        frames = max(self.frames, 1)
+        lines = ["=== level %s: %d frames, %.1f KB net per frame, gc.freeze %s"
+                 % (level, self.frames, self.net_total / frames / 1024,
+                    "on" if self.freeze else "off")]
+        lines.append("worst frames (peak KB above frame start, net KB):")
+        for peak, net, frame in sorted(self.worst, reverse=True):
+            lines.append("  frame %6d  peak %8.1f  net %8.1f" % (frame, peak / 1024, net / 1024))
+        lines.append("gc collections:")
+        for generation in range(3):
+            pauses = [c[1] for c in self.collections if c[0] == generation]
+            if pauses:
+                lines.append("  gen %d: %5d runs, total %7.2f ms, max %6.2f ms"
+                             % (generation, len(pauses), sum(pauses) * 1000, max(pauses) * 1000))
+        slowest = sorted(self.collections, key=lambda c: c[1], reverse=True)[:self.SLOW_COLLECTIONS]
+        for generation, pause, collected, frame, stage in slowest:
+            lines.append("  frame %6d  gen %d  %6.2f ms  %5d collected  in %s"
+                         % (frame, generation, pause * 1000, collected, stage))
+        lines.append("top allocation sites since level load, by subsystem:")
+        sites = {}
+        ranges = function_ranges()
+        this_file = os.path.abspath(__file__)
+        for stat in snapshot.compare_to(self.baseline, "traceback"):
+            if stat.size_diff <= 0:
+                continue
+            subsystem = "other"
+            for frame in reversed(stat.traceback):
+                if os.path.abspath(frame.filename) == this_file:
+                    subsystem = function_at(ranges, frame.lineno)
+                    break
+            if subsystem.startswith("MemoryMonitor."):
+                continue
+            site = stat.traceback[-1]
+            key = "%s:%d" % (os.path.basename(site.filename), site.lineno)
+            by_site = sites.setdefault(subsystem, {})
+            size, count = by_site.get(key, (0, 0))
+            by_site[key] = (size + stat.size_diff, count + stat.count_diff)
+        totals = sorted(((sum(size for size, _ in by_site.values()), name)
+                         for name, by_site in sites.items()), reverse=True)
+        for total, name in totals[:self.SUBSYSTEMS]:
+            lines.append("  %s: %.1f KB" % (name, total / 1024))
+            top = sorted(sites[name].items(), key=lambda item: item[1][0], reverse=True)
+            for key, (size, count) in top[:self.SITES_PER_SUBSYSTEM]:
+                lines.append("    %-28s %8.1f KB %7d blocks" % (key, size / 1024, count))
+        return lines
+
+def function_ranges():
+    """(first line, last line, qualified name) of every function in this file."""
+    ranges = []
+    for name, obj in list(globals().items()):
+        if isinstance(obj, type):
+            members = [(name + "." + attr, value) for attr, value in vars(obj).items()]
+        else:
+            members = [(name, obj)]
+        for qualname, func in members:
+            code = getattr(func, "__code__", None)
+            if code is None or code.co_filename != __file__:
+                continue
+            last = max((line for _, _, line in code.co_lines() if line), default=code.co_firstlineno)
+            ranges.append((code.co_firstlineno, last, qualname))
+    return ranges
+
+def function_at(ranges, lineno):
+    """Name of the innermost function in `ranges` that contains `lineno`."""
+    best = None
+    for first, last, name in ranges:
+        if first <= lineno <= last and (best is None or first > best[0]):
+            best = (first, name)
+    return best[1] if best else "module"
+
+memory = MemoryMonitor()
+
+class LatencyMeter:
+    """Click-to-photon latency: from handling a MOUSEBUTTONDOWN to the flip showing it.
+
+    pygame events carry no timestamp, so a click is stamped when the loop
+    handles it. The time since the loop last drained the event queue is kept
+    alongside as the upper bound of how long the click sat in the queue.
+    """
+    def __init__(self, window=600):
+        self.enabled = False
+        self.samples = deque(maxlen=window)  # (handled -> flip, queue bound) in ms
+        self.pending = []
+        self.last_poll = time.perf_counter()
+
+    def polled(self):
+        self.last_poll = time.perf_counter()
+
+    def click(self):
+        now = time.perf_counter()
+        self.pending.append((now, now - self.last_poll))
+
+    def presented(self):
+        if not self.pending:
+            return
+        now = time.perf_counter()
+        for handled, queued in self.pending:
+            self.samples.append(((now - handled) * 1000, queued * 1000))
+        self.pending.clear()
+
+    def percentiles(self, values):
+        """p50, p95 and max of `values`."""
+        ordered = sorted(values)
+        last = len(ordered) - 1
+        return ordered[min(last, len(ordered) // 2)], ordered[min(last, len(ordered) * 95 // 100)], ordered[last]
+
+    def summary(self):
+        if not self.samples:
+            return "no clicks"
+        handled = self.percentiles(flip for flip, _ in self.samples)
+        worst = self.percentiles(flip + queued for flip, queued in self.samples)
+        return ("%d clicks, click->flip p50 %.1f / p95 %.1f / max %.1f ms, "
+                "including queue wait at most p50 %.1f / p95 %.1f / max %.1f ms"
+                % ((len(self.samples),) + handled + worst))
+
+latency = LatencyMeter()
+
+class MetricsExporter:
+    """Live counters and gauges in the Prometheus text format.
+
+    The game loop only appends its frame time and, every PUBLISH_FRAMES
+    frames, swaps in a small dict of plain numbers read from the Game. The
+    text is built on the reader's side: an HTTP server thread on localhost
+    (GET /metrics) or a thread rewriting a file every second, so a slow
+    scraper never holds up a frame.
+    """
+    PUBLISH_FRAMES = 30
+    FILE_INTERVAL = 1.0
+
+    def __init__(self):
+        self.enabled = False
+        self.frame_ms = deque(maxlen=600)
+        self.frames = 0
+        self.frame_ms_sum = 0.0
+        self.finished_ticks = 0
+        self.finished_sun = 0
+        self.gc_runs = [0, 0, 0]
+        self.gc_seconds = [0.0, 0.0, 0.0]
+        self.gc_start = 0.0
+        self.snapshot = None
+        self.server = None
+        self.game = None
+        self.level = ('', '')
+
+    def start(self, port=None, path=None):
+        self.enabled = True
+        gc.callbacks.append(self.on_gc)
+        if port is not None:
+            import http.server      # slow to import, so only when serving
+            self.server = http.server.ThreadingHTTPServer(("127.0.0.1", port),
+                                                          metrics_handler(http.server))
+            self.server.exporter = self
+            threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True).start()
+        if path is not None:
+            threading.Thread(target=self.write_file, args=(path,), name='metrics-file', daemon=True).start()
+
+    def stop(self):
+        if self.enabled:
+            gc.callbacks.remove(self.on_gc)
+            self.enabled = False
+        if self.server:
+            self.server.shutdown()
+            self.server = None
+
+    def on_gc(self, phase, info):
+        if phase == "start":
+            self.gc_start = time.perf_counter()
+        else:
+            generation = info["generation"]
+            self.gc_runs[generation] += 1
+            self.gc_seconds[generation] += time.perf_counter() - self.gc_start
+
+    def begin_level(self, game, level_str, mode):
+        if self.game is not None:
+            self.finished_ticks += self.game.frame_count
+            self.finished_sun += self.game.sun_earned
+        self.game = game
+        self.level = (level_str, mode)
+        self.publish()
+
+    def frame(self, work_ms):
+        self.frame_ms.append(work_ms)
+        self.frame_ms_sum += work_ms
+        self.frames += 1
+        if self.frames % self.PUBLISH_FRAMES == 0:
+            self.publish()
+
+    def publish(self):
+        game = self.game
+        caches = getattr(backend, 'sprites', None), getattr(backend, 'texts', None)
+        self.snapshot = {
+            'level': self.level[0],
+            'mode': self.level[1],
+            'ticks': self.finished_ticks + game.frame_count,
+            'sun_earned': self.finished_sun + game.sun_earned,
+            'sun_points': game.sun_points,
+            'plants': sum(plant is not None for row in game.grid for plant in row),
+            'zombies': len(game.zombies),
+            'projectiles': len(game.projectiles),
+            'suns': len(game.suns),
+            'sprite_cache': len(caches[0]) if caches[0] is not None else None,
+            'text_cache': len(caches[1]) if caches[1] is not None else None,
+            'quality': governor.level if governor else None,
+            'tasks': task_stats.snapshot() if ASYNC_LOOP else {},
+        }
+
+    def render(self):
+        snap = self.snapshot
+        frames = sorted(self.frame_ms)
+        lines = ["# TYPE pvz_frames_total counter", "pvz_frames_total %d" % self.frames,
+                 "# TYPE pvz_frame_time_milliseconds summary"]
+        for q in (0.5, 0.9, 0.99):
+            if frames:
+                value = frames[min(len(frames) - 1, int(len(frames) * q))]
+                lines.append('pvz_frame_time_milliseconds{quantile="%s"} %.3f' % (q, value))
+        lines += ["pvz_frame_time_milliseconds_sum %.3f" % self.frame_ms_sum,
+                  "pvz_frame_time_milliseconds_count %d" % self.frames,
+                  "# TYPE pvz_gc_collections_total counter"]
+        lines += ['pvz_gc_collections_total{generation="%d"} %d' % (g, n) for g, n in enumerate(self.gc_runs)]
+        lines.append("# TYPE pvz_gc_pause_seconds_total counter")
+        lines += ['pvz_gc_pause_seconds_total{generation="%d"} %.6f' % (g, t)
+                  for g, t in enumerate(self.gc_seconds)]
+        if startup.first_frame_ms is not None:
+            lines += ["# TYPE pvz_startup_seconds gauge",
+                      "pvz_startup_seconds %.3f" % (startup.first_frame_ms / 1000)]
+        if snap is None:
+            return "\n".join(lines) + "\n"
+        lines += ["# TYPE pvz_ticks_total counter", "pvz_ticks_total %d" % snap['ticks'],
+                  "# TYPE pvz_sun_earned_total counter", "pvz_sun_earned_total %d" % snap['sun_earned'],
+                  "# TYPE pvz_sun_points gauge", "pvz_sun_points %d" % snap['sun_points'],
+                  "# TYPE pvz_entities gauge"]
+        lines += ['pvz_entities{kind="%s"} %d' % (kind, snap[kind])
+                  for kind in ('plants', 'zombies', 'projectiles', 'suns')]
+        if snap['sprite_cache'] is not None:
+            lines += ["# TYPE pvz_texture_cache_entries gauge",
+                      'pvz_texture_cache_entries{cache="sprites"} %d' % snap['sprite_cache'],
+                      'pvz_texture_cache_entries{cache="text"} %d' % snap['text_cache']]
+        if snap['quality'] is not None:
+            lines += ["# TYPE pvz_quality_level gauge", "pvz_quality_level %d" % snap['quality']]
+        if snap['tasks']:
+            lines.append("# TYPE pvz_task_lag_milliseconds summary")
+            lines += ['pvz_task_lag_milliseconds{task="%s",quantile="%s"} %.3f' % (name, q, values[i])
+                      for name, values in sorted(snap['tasks'].items()) for i, q in enumerate(("0.5", "0.99"))]
+            lines.append("# TYPE pvz_task_run_milliseconds summary")
+            lines += ['pvz_task_run_milliseconds{task="%s",quantile="%s"} %.3f' % (name, q, values[2 + i])
+                      for name, values in sorted(snap['tasks'].items()) for i, q in enumerate(("0.5", "0.99"))]
+        lines += ["# TYPE pvz_level_info gauge",
+                  'pvz_level_info{level="%s",mode="%s"} 1' % (snap['level'], snap['mode'])]
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """Rewrite `path` every FILE_INTERVAL; a failed write is reported
+        once and retried, so metrics resume when the disk comes back."""
+        failing = False
+        while self.enabled:
+            temp = path + ".tmp"
+            try:
+                with open(temp, "w") as out:
+                    out.write(self.render())
+                os.replace(temp, path)
+                failing = False
+            except OSError as exc:
+                if not failing:
+                    log.warning("could not write metrics to %s: %s", path, exc)
+                failing = True
+            time.sleep(self.FILE_INTERVAL)
+
+def metrics_handler(server_module):
+    """The request handler class for MetricsExporter's HTTP server."""
+    class MetricsHandler(server_module.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = self.server.exporter.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+    return MetricsHandler
+
+metrics = MetricsExporter()
 
 # ==========================================
 # GAME CLASSES (unchanged, except where noted)
 # ==========================================
+# Moves longer than this between two ticks (e.g. pole vault jumps) are
+# drawn as a jump instead of being smeared across the frames in between.
+SNAP_DISTANCE = CELL_SIZE // 2
+
+# Entity geometry in logical pixels. These are gameplay rules (hit boxes,
+# ranges, speeds), so a profile with a different cell size sets its own.
+PLANT_INSET = 5              # plant's top-left corner inside its cell
+PLANT_MARGIN = 10            # cell size minus plant size
+ZOMBIE_INSET = 10
+ZOMBIE_MARGIN = 20
+ZOMBIE_SPREAD = 200          # zombies enter up to this far right of the lawn
+ZOMBIE_REACH = 10            # how far ahead of its x a zombie finds a plant to eat
+POLE_RANGE = 40              # pole vaulters jump plants this close
+POLE_JUMP = 100
+CHOMPER_RANGE = 40
+MINE_RANGE = 50
+REPEATER_GAP = 20            # distance between a repeater's two peas
+PEA_SIZE = 10
+PEA_SPEED = 6
+SUN_SIZE = 30
+SUN_REST = 50                # falling suns stop this far above the lawn's bottom edge
+MOWER_RECT = (CELL_SIZE//8, CELL_SIZE//2, CELL_SIZE*3//8)    # x, width and height of a lawn mower
+
+def lerp_position(entity, alpha):
+    """Where to draw a moving entity, `alpha` of the way from its previous
+    simulated position to the current one (see Game.remember_positions)."""
+    if alpha >= 1.0 or not hasattr(entity, 'prev_x'):
+        return entity.x, entity.y        # spawned this tick, or no interpolation
+    dx = entity.x - entity.prev_x
+    dy = entity.y - entity.prev_y
+    if abs(dx) > SNAP_DISTANCE or abs(dy) > SNAP_DISTANCE:
+        return entity.x, entity.y
+    return entity.prev_x + dx * alpha, entity.prev_y + dy * alpha
+
+def draw_health_bar(screen, rects):
+    """Draw a red/green health bar from an entity's health_bar_rects()."""
+    if rects is None or not quality['health_bars']:
+        return
+    back, fill = rects
+    draw_rect(screen, RED, back)
+    draw_rect(screen, GREEN, fill)
+
 class Plant:
     def __init__(self, x, y, plant_type, env="day"):
         self.x = x
@@ -321,7 +1503,7 @@ class Plant:
         self.type = plant_type
         self.health = PLANT_DATA.get(plant_type, {}).get('health', 100)
         self.max_health = self.health
-        self.rect = pygame.Rect(x, y, CELL_SIZE-10, CELL_SIZE-10)
+        self.rect = pygame.Rect(x, y, CELL_SIZE-PLANT_MARGIN, CELL_SIZE-PLANT_MARGIN)
         self.last_shot = 0
         self.last_sun_gen = 0
         self.exploded = False
@@ -369,13 +1551,31 @@ class Plant:
                 self.chewing -= 1
             else:
                 for z in zombies:
-                    if z.row == (self.y // CELL_SIZE) and abs(z.x - self.x) < 40:
+                    if z.row == (self.y // CELL_SIZE) and abs(z.x - self.x) < CHOMPER_RANGE:
                         if z.type not in ('football', 'bucket'):   # cannot eat these
                             self.chewing = 300
                             return ('eat_zombie', z)
         return None
 
+    def sprite_key(self):
+        """Everything the plant's look depends on, apart from its position."""
+        return (self.type, self.is_armed, self.sleeping, self.chewing > 0)
+
+    def health_bar_rects(self, x, y):
+        """Return (background, fill) rects of the health bar, or None if full."""
+        if self.health >= self.max_health:
+            return None
+        bar_width = self.rect.width * (self.health / self.max_health)
+        return ((x, y-BAR_OFFSET, self.rect.width, BAR_HEIGHT),
+                (x, y-BAR_OFFSET, bar_width, BAR_HEIGHT))
+
     def draw(self, screen):
+        self.draw_sprite(screen, self.x, self.y)
+        draw_health_bar(screen, self.health_bar_rects(self.x, self.y))
+
+    def draw_sprite(self, screen, x, y):
+        """Draw the plant body with its top-left corner at (x, y)."""
+        rect = pygame.Rect(x, y, self.rect.width, self.rect.height)
         # Color based on type
         color_map = {
             'peashooter': GREEN,
@@ -392,26 +1592,23 @@ class Plant:
         }
         color = color_map.get(self.type, WHITE)
 
-        pygame.draw.rect(screen, color, self.rect)
+        draw_rect(screen, color, rect)
 
         if self.sleeping:
-            pygame.draw.circle(screen, BLACK, self.rect.center, 10)
-            text = small_font.render("Zzz", True, WHITE)
-            screen.blit(text, (self.x+5, self.y-20))
+            draw_circle(screen, BLACK, rect.center, CELL_SIZE//8)
+            if quality['entity_text']:
+                text = small_font.render("Zzz", True, WHITE)
+                blit(screen, text, (x+PAD, y-CELL_SIZE//4))
         elif self.type == 'chomper' and self.chewing > 0:
             # mouth closed (full)
-            pygame.draw.rect(screen, RED, (self.x+20, self.y-10, 20, 10))
+            draw_rect(screen, RED, (x+CELL_SIZE//4, y-CELL_SIZE//8, CELL_SIZE//4, CELL_SIZE//8))
 
+        if not quality['entity_text']:
+            return
         # initial letter
         letter = self.type[0].upper()
         text = small_font.render(letter, True, BLACK)
-        screen.blit(text, (self.rect.centerx - 5, self.rect.centery - 8))
-
-        # health bar
-        if self.health < self.max_health:
-            bar_width = self.rect.width * (self.health / self.max_health)
-            pygame.draw.rect(screen, RED, (self.x, self.y-10, self.rect.width, 5))
-            pygame.draw.rect(screen, GREEN, (self.x, self.y-10, bar_width, 5))
+        blit(screen, text, (rect.centerx - PAD, rect.centery - CELL_SIZE//10))
 
 class Zombie:
     def __init__(self, row, col, z_type='basic', env='day'):
@@ -424,9 +1621,9 @@ class Zombie:
         self.base_speed = data['speed']
         self.speed = self.base_speed
 
-        self.x = GAME_WIDTH + random.randint(0, 200)
-        self.y = row * CELL_SIZE + 10
-        self.rect = pygame.Rect(self.x, self.y, CELL_SIZE-20, CELL_SIZE-20)
+        self.x = GAME_WIDTH + random.randint(0, ZOMBIE_SPREAD)
+        self.y = row * CELL_SIZE + ZOMBIE_INSET
+        self.rect = pygame.Rect(self.x, self.y, CELL_SIZE-ZOMBIE_MARGIN, CELL_SIZE-ZOMBIE_MARGIN)
         self.eating = False
         self.target_plant = None
 
@@ -455,8 +1652,8 @@ class Zombie:
                     plant = grid[r][c]
                     if plant and r == self.row:
                         if plant.type not in ('lilypad', 'tallnut'):   # jumpable
-                            if abs(plant.x - self.x) < 40:
-                                self.x -= 100   # jump over
+                            if abs(plant.x - self.x) < POLE_RANGE:
+                                self.x -= POLE_JUMP   # jump over
                                 self.has_pole = False
                                 return
 
@@ -467,7 +1664,7 @@ class Zombie:
             self.rect.x = self.x
 
         # Check for plant in front
-        front_col = max(0, int((self.x + 10) // CELL_SIZE))
+        front_col = max(0, int((self.x + ZOMBIE_REACH) // CELL_SIZE))
         if front_col < len(grid[0]):
             plant = grid[self.row][front_col]
             if plant and not self.eating:
@@ -482,7 +1679,24 @@ class Zombie:
                     self.eating = False
                     self.target_plant = None
 
-    def draw(self, screen):
+    def sprite_key(self):
+        """Everything the zombie's look depends on, apart from its position."""
+        return (self.type, self.angry, self.has_pole, self.slowed > 0)
+
+    def health_bar_rects(self, x, y):
+        """Return (background, fill) rects of the health bar for a zombie at (x, y)."""
+        bar_width = self.rect.width * (self.health / self.max_health)
+        return ((x, y-BAR_OFFSET, self.rect.width, BAR_HEIGHT),
+                (x, y-BAR_OFFSET, bar_width, BAR_HEIGHT))
+
+    def draw(self, screen, alpha=1.0):
+        x, y = lerp_position(self, alpha)
+        self.draw_sprite(screen, x, y)
+        draw_health_bar(screen, self.health_bar_rects(x, y))
+
+    def draw_sprite(self, screen, x, y):
+        """Draw the zombie body with its top-left corner at (x, y)."""
+        rect = pygame.Rect(x, y, self.rect.width, self.rect.height)
         color_map = {
             'basic': BROWN,
             'cone': ORANGE,
@@ -494,43 +1708,47 @@ class Zombie:
             'ducky': YELLOW
         }
         color = color_map.get(self.type, BROWN)
-        pygame.draw.rect(screen, color, self.rect)
+        draw_rect(screen, color, rect)
 
         if self.slowed > 0:
-            pygame.draw.rect(screen, ICE_BLUE, self.rect, 3)
+            draw_rect(screen, ICE_BLUE, rect, 3)
 
+        if not quality['entity_text']:
+            return
         text = small_font.render("Z", True, BLACK)
-        screen.blit(text, (self.x+25, self.y+20))
-
-        # health bar
-        bar_width = self.rect.width * (self.health / self.max_health)
-        pygame.draw.rect(screen, RED, (self.x, self.y-10, self.rect.width, 5))
-        pygame.draw.rect(screen, GREEN, (self.x, self.y-10, bar_width, 5))
+        blit(screen, text, (x + CELL_SIZE*5//16, y + CELL_SIZE//4))
 
 class Projectile:
     def __init__(self, x, y, target_row, damage=20, p_type='pea'):
         self.x = x
-        self.y = y + CELL_SIZE//2 - 5
+        self.y = y + CELL_SIZE//2 - PEA_SIZE//2
         self.target_row = target_row
-        self.speed = 6
+        self.speed = PEA_SPEED
         self.damage = damage
         self.type = p_type
-        self.rect = pygame.Rect(self.x, self.y, 10, 10)
+        self.rect = pygame.Rect(self.x, self.y, PEA_SIZE, PEA_SIZE)
 
     def move(self):
         self.x += self.speed
         self.rect.x = self.x
 
-    def draw(self, screen):
+    def sprite_key(self):
+        return (self.type,)
+
+    def draw(self, screen, alpha=1.0):
+        self.draw_sprite(screen, *lerp_position(self, alpha))
+
+    def draw_sprite(self, screen, x, y):
+        """Draw the projectile centred on (x, y)."""
         color = GREEN if self.type == 'pea' else ICE_BLUE
-        pygame.draw.circle(screen, color, (int(self.x), int(self.y)), 5)
+        draw_circle(screen, color, (int(x), int(y)), PEA_SIZE//2)
 
 class Sun:
     def __init__(self, x, y, value):
         self.x = x
         self.y = y
         self.value = value
-        self.rect = pygame.Rect(x-15, y-15, 30, 30)
+        self.rect = pygame.Rect(x-SUN_SIZE//2, y-SUN_SIZE//2, SUN_SIZE, SUN_SIZE)
         self.falling = True
         self.speed = 1
 
@@ -538,13 +1756,22 @@ class Sun:
         if self.falling:
             self.y += self.speed
             self.rect.y = self.y
-            if self.y > GAME_HEIGHT - 50:
+            if self.y > GAME_HEIGHT - SUN_REST:
                 self.falling = False
 
-    def draw(self, screen):
-        pygame.draw.circle(screen, YELLOW, (self.x, self.y), 15)
+    def sprite_key(self):
+        return (self.value,)
+
+    def draw(self, screen, alpha=1.0):
+        self.draw_sprite(screen, *lerp_position(self, alpha))
+
+    def draw_sprite(self, screen, x, y):
+        """Draw the sun centred on (x, y)."""
+        draw_circle(screen, YELLOW, (x, y), SUN_SIZE//2)
+        if not quality['entity_text']:
+            return
         text = small_font.render(str(self.value), True, BLACK)
-        screen.blit(text, (self.x-8, self.y-10))
+        blit(screen, text, (x - SUN_SIZE*4//15, y - SUN_SIZE//3))
 
 # ==========================================
 # GAME MANAGER (unchanged)
@@ -553,35 +1780,35 @@ class Game:
     def __init__(self, level_str="1-1", mode="adventure"):
         self.mode = mode
         self.level_str = level_str
-        self.world, self.sublevel = map(int, level_str.split('-'))
-
-        # Environment setup
-        if self.world == 1:
-            self.env = "day"
-        elif self.world == 2:
-            self.env = "night"
-        elif self.world == 3:
-            self.env = "pool"
-        else:
-            self.env = "fog"
+        self.world, self.sublevel = level_key(level_str)
+        self.rules = rules = level_rules(level_str, mode)
+        self.env = rules.env
 
         # Grid
         self.grid = [[None for _ in range(GRID_COLS)] for _ in range(GRID_ROWS)]
-        self.water_rows = [2, 3] if self.env in ("pool", "fog") else []
+        self.water_rows = list(rules.water_rows)
 
         # Objects
         self.zombies = []
         self.projectiles = []
         self.suns = []
         self.sun_points = SUN_START
+        self.sun_earned = 0
         self.frame_count = 0
         self.selected_plant = None
         self.game_over = False
         self.win = False
         self.zombies_spawned = 0
-        self.zombies_to_spawn = 5 + self.sublevel * 2
-        self.spawn_delay = ZOMBIE_SPAWN_BASE
-        self.next_spawn = 200
+        self.zombies_to_spawn = rules.zombies_to_spawn
+        self.spawn_delay = rules.spawn_delay
+        self.spawn_speedup = rules.spawn_speedup
+        self.next_spawn = rules.first_spawn
+        self.reschedule()
+
+        # Profile rules: frame at which each seed packet is ready again, and
+        # which rows still have their lawn mower (None when the rule is off)
+        self.plant_cooldowns = {p: 0 for p in PLANT_DATA} if COOLDOWN_FRAMES else None
+        self.lawn_mowers = [True] * GRID_ROWS if LAWN_MOWERS else None
 
     def handle_click(self, pos):
         x, y = pos
@@ -608,16 +1835,30 @@ class Game:
                         if target_cell is None:
                             self.place_plant(row, col, p_type)
 
+    def reschedule(self):
+        """Set the tick update() next looks at the wave: the next spawn, or
+        every tick (for the win) once all zombies are out. Call it after
+        changing next_spawn or zombies_to_spawn from outside."""
+        self.spawn_check = self.next_spawn if self.zombies_spawned < self.zombies_to_spawn else 0
+
+    def recharging(self, p_type):
+        """True while the plant's seed packet is on cooldown."""
+        return self.plant_cooldowns is not None and self.frame_count < self.plant_cooldowns[p_type]
+
     def place_plant(self, row, col, p_type):
         cost = PLANT_DATA[p_type]['cost']
         if self.sun_points >= cost:
+            if self.recharging(p_type):
+                return
             self.sun_points -= cost
-            new_plant = Plant(col*CELL_SIZE+5, row*CELL_SIZE+5, p_type, self.env)
+            new_plant = Plant(col*CELL_SIZE+PLANT_INSET, row*CELL_SIZE+PLANT_INSET, p_type, self.env)
             self.grid[row][col] = new_plant
             self.selected_plant = None
+            if self.plant_cooldowns is not None:
+                self.plant_cooldowns[p_type] = self.frame_count + COOLDOWN_FRAMES[p_type]
 
     def handle_sidebar_click(self, x, y):
-        y_index = (y - 50) // 60
+        y_index = (y - SEED_SLOT_TOP) // SEED_SLOT_PITCH
         plants_available = [
             'peashooter', 'sunflower', 'wallnut', 'cherrybomb',
             'snowpea', 'repeater', 'potatomine', 'chomper',
@@ -625,7 +1866,7 @@ class Game:
         ]
         if 0 <= y_index < len(plants_available):
             p = plants_available[y_index]
-            if check_unlock(p, self.level_str):
+            if p in self.rules.unlocked and not self.recharging(p):
                 self.selected_plant = p
 
     def update(self):
@@ -635,49 +1876,45 @@ class Game:
         self.frame_count += 1
 
         # Natural sun drop
-        if self.env == "day" and self.frame_count % SUN_DROP_RATE == 0:
+        if self.rules.sun_drop and self.frame_count % SUN_DROP_RATE == 0:
             self.suns.append(Sun(random.randint(50, GAME_WIDTH-50), 0, 25))
 
-        # Zombie spawning
+        # Zombie spawning: one comparison until the next zombie is due
+        if self.frame_count >= self.spawn_check:
+            self.advance_wave()
+
+        with span('update_plants'):
+            self.update_plants()
+        with span('update_projectiles'):
+            self.update_projectiles()
+        with span('update_zombies'):
+            self.update_zombies()
+        with span('update_suns'):
+            self.update_suns()
+        with span('shooting_logic'):
+            self.shooting_logic()
+
+    def advance_wave(self):
+        """Spawn the zombie that is due, or win once all are out and gone."""
         if self.zombies_spawned < self.zombies_to_spawn:
             if self.frame_count >= self.next_spawn:
                 self.spawn_zombie()
-                self.next_spawn = self.frame_count + self.spawn_delay - (self.sublevel * 10)
+                self.next_spawn = self.frame_count + self.spawn_delay - self.spawn_speedup
+            self.reschedule()
         elif len(self.zombies) == 0:
             self.win = True
 
-        self.update_plants()
-        self.update_projectiles()
-        self.update_zombies()
-        self.update_suns()
-        self.shooting_logic()
-
     def spawn_zombie(self):
+        rules = self.rules
         row = random.randint(0, GRID_ROWS-1)
-        # Choose type based on level
+        # The mix's random number is drawn even on rows that ignore it
         r = random.random()
-        if self.world == 3:   # Pool
-            if row in self.water_rows:
-                z_type = 'ducky'
-            else:
-                z_type = random.choice(['basic', 'cone', 'bucket'])
-        else:
-            if self.sublevel >= 5:
-                if r < 0.2:
-                    z_type = 'pole'
-                elif r < 0.4:
-                    z_type = 'newspaper'
-                elif r < 0.6:
-                    z_type = 'bucket'
-                else:
-                    z_type = 'basic'
-            elif self.sublevel >= 3:
-                if r < 0.3:
-                    z_type = 'cone'
-                else:
-                    z_type = 'basic'
+        z_type = rules.row_zombie[row]
+        if z_type is None:
+            if rules.uniform:
+                z_type = random.choice(rules.types)
             else:
-                z_type = 'basic'
+                z_type = rules.types[bisect_right(rules.thresholds, r)]
         self.zombies.append(Zombie(row, GRID_COLS-1, z_type, self.env))
         self.zombies_spawned += 1
 
@@ -700,7 +1937,7 @@ class Game:
                                 p_type = 'frozen'
                             self.projectiles.append(Projectile(plant.x+CELL_SIZE, plant.y, row, p_type=p_type))
                             if plant.type == 'repeater':
-                                self.projectiles.append(Projectile(plant.x+CELL_SIZE+20, plant.y, row, p_type='pea'))
+                                self.projectiles.append(Projectile(plant.x+CELL_SIZE+REPEATER_GAP, plant.y, row, p_type='pea'))
 
     def update_plants(self):
         for r in range(GRID_ROWS):
@@ -717,7 +1954,7 @@ class Game:
                     elif action == 'mine_explode':
                         _, ex, ey = result
                         for z in self.zombies[:]:
-                            if z.row == r and abs(z.x - ex) < 50:
+                            if z.row == r and abs(z.x - ex) < MINE_RANGE:
                                 z.health = 0
                         self.grid[r][c] = None
                     elif action == 'eat_zombie':
@@ -737,7 +1974,13 @@ class Game:
     def update_zombies(self):
         for z in self.zombies[:]:
             z.update(self.grid)
-            if z.x < -20:
+            if z.x < 0 and self.lawn_mowers and self.lawn_mowers[z.row]:
+                # The row's mower clears every zombie in it, once
+                self.lawn_mowers[z.row] = False
+                for zombie in self.zombies:
+                    if zombie.row == z.row:
+                        zombie.health = 0
+            elif z.x < -20:
                 self.game_over = True
             if z.health <= 0:
                 self.zombies.remove(z)
@@ -764,24 +2007,43 @@ class Game:
             if s.y > SCREEN_HEIGHT:
                 self.suns.remove(s)
 
-    def draw(self, screen):
-        self.draw_background(screen)
+    def remember_positions(self):
+        """Record where moving entities are before a tick, for render interpolation."""
+        for entity in self.zombies:
+            entity.prev_x, entity.prev_y = entity.x, entity.y
+        for entity in self.projectiles:
+            entity.prev_x, entity.prev_y = entity.x, entity.y
+        for entity in self.suns:
+            entity.prev_x, entity.prev_y = entity.x, entity.y
 
-        # Plants
-        for row in range(GRID_ROWS):
-            for col in range(GRID_COLS):
-                if self.grid[row][col]:
-                    self.grid[row][col].draw(screen)
+    def draw(self, screen, alpha=1.0):
+        with span('draw_background'):
+            self.draw_background(screen)
 
-        for z in self.zombies:
-            z.draw(screen)
-        for p in self.projectiles:
-            p.draw(screen)
-        for s in self.suns:
-            s.draw(screen)
+        with span('draw_entities'):
+            # Plants
+            for row in range(GRID_ROWS):
+                for col in range(GRID_COLS):
+                    if self.grid[row][col]:
+                        self.grid[row][col].draw(screen)
 
-        self.draw_sidebar(screen)
-        self.draw_overlay(screen)
+            for z in self.zombies:
+                z.draw(screen, alpha)
+            for p in self.projectiles:
+                p.draw(screen, alpha)
+            for s in self.suns:
+                s.draw(screen, alpha)
+
+        with span('draw_sidebar'):
+            self.draw_sidebar(screen)
+        with span('draw_overlay'):
+            self.draw_overlay(screen)
+
+    def water_phase(self):
+        """Which of the two water frames to show (frozen at low quality)."""
+        if not self.water_rows or not quality['water_anim']:
+            return 0
+        return (self.frame_count // 10) % 2
 
     def draw_background(self, screen):
         for row in range(GRID_ROWS):
@@ -794,14 +2056,37 @@ class Game:
                     alt_color = (30, 60, 30)
                 elif row in self.water_rows:
                     # Animate water slightly
-                    if (self.frame_count // 10) % 2 == 0:
+                    if self.water_phase() == 0:
                         base_color = WATER_BLUE
                         alt_color = DARK_WATER
                     else:
                         base_color = DARK_WATER
                         alt_color = WATER_BLUE
-                pygame.draw.rect(screen, base_color if (row+col)%2==0 else alt_color, rect)
-                pygame.draw.rect(screen, BLACK, rect, 1)
+                draw_rect(screen, base_color if (row+col)%2==0 else alt_color, rect)
+                draw_rect(screen, BLACK, rect, 1)
+            if self.lawn_mowers is not None:
+                self.draw_mower(screen, row)
+        if GROUND_COLOR and GAME_HEIGHT < SCREEN_HEIGHT:
+            draw_rect(screen, GROUND_COLOR, (0, GAME_HEIGHT, GAME_WIDTH, SCREEN_HEIGHT - GAME_HEIGHT))
+
+    def draw_mower(self, screen, row):
+        """A red mower while the row still has one, a gray one once it has run."""
+        x, width, height = MOWER_RECT
+        rect = pygame.Rect(x, row*CELL_SIZE + CELL_SIZE//2 - height//2, width, height)
+        if self.lawn_mowers[row]:
+            draw_rect(screen, RED, rect)
+            draw_rect(screen, BLACK, rect, 2)
+            draw_circle(screen, BLACK, (rect.right - PAD, rect.centery), height*4//15)
+        else:
+            draw_rect(screen, GRAY, rect)
+            draw_rect(screen, BLACK, rect, 2)
+
+    def recharge_seconds(self):
+        """Seconds left on each seed packet still recharging, as shown in the sidebar."""
+        if self.plant_cooldowns is None:
+            return ()
+        return tuple((self.plant_cooldowns[p] - self.frame_count) // SIM_FPS if self.recharging(p) else None
+                     for p in PLANT_DATA)
 
     def draw_sidebar(self, screen):
         # Stone background instead of plain gray
@@ -810,107 +2095,2314 @@ class Game:
 
         # Sun counter
         text = font.render(f"Sun: {self.sun_points}", True, BLACK)
-        screen.blit(text, (GAME_WIDTH+10, 10))
+        blit(screen, text, (GAME_WIDTH+SIDEBAR_MARGIN, SIDEBAR_MARGIN))
 
         # Plant selection buttons
         plants = ['peashooter', 'sunflower', 'wallnut', 'cherrybomb',
                   'snowpea', 'repeater', 'potatomine', 'chomper',
                   'puffshroom', 'lilypad', 'squash']
-        y = 50
+        y = SEED_SLOT_TOP
         for p in plants:
-            btn = pygame.Rect(GAME_WIDTH+10, y, 180, 50)
-            if not check_unlock(p, self.level_str):
+            btn = pygame.Rect(GAME_WIDTH+SIDEBAR_MARGIN, y,
+                              SIDEBAR_WIDTH - 2*SIDEBAR_MARGIN, SEED_SLOT_HEIGHT)
+            recharging = self.recharging(p)
+            if p not in self.rules.unlocked:
                 color = DARK_BROWN
+            elif recharging:
+                color = (100, 100, 100)
             elif self.selected_plant == p:
                 color = GREEN
             else:
                 color = WHITE
-            pygame.draw.rect(screen, color, btn)
-            pygame.draw.rect(screen, BLACK, btn, 2)
+            draw_rect(screen, color, btn)
+            draw_rect(screen, BLACK, btn, 2)
+
+            if recharging:
+                remaining = (self.plant_cooldowns[p] - self.frame_count) // SIM_FPS
+                timer_text = small_font.render(str(remaining), True, BLACK)
+                blit(screen, timer_text, (btn.right - CELL_SIZE*3//8, btn.y + SEED_SLOT_HEIGHT*3//5))
 
             cost = PLANT_DATA[p]['cost']
             txt = small_font.render(f"{p[:6]}({cost})", True, BLACK)
-            screen.blit(txt, (btn.x+5, btn.y+15))
-            y += 60
+            blit(screen, txt, (btn.x+PAD, btn.y+SEED_SLOT_HEIGHT*3//10))
+            y += SEED_SLOT_PITCH
 
         # Level info
         lvl_txt = font.render(f"Lvl: {self.level_str}", True, BLACK)
-        screen.blit(lvl_txt, (GAME_WIDTH+10, SCREEN_HEIGHT-100))
+        blit(screen, lvl_txt, (GAME_WIDTH+SIDEBAR_MARGIN, SCREEN_HEIGHT-CELL_SIZE*5//4))
         mode_txt = small_font.render(f"Mode: {self.mode}", True, BLACK)
-        screen.blit(mode_txt, (GAME_WIDTH+10, SCREEN_HEIGHT-60))
+        blit(screen, mode_txt, (GAME_WIDTH+SIDEBAR_MARGIN, SCREEN_HEIGHT-CELL_SIZE*3//4))
 
     def draw_overlay(self, screen):
         if self.game_over:
-            s = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            s = pygame.Surface(screen.get_size())
             s.set_alpha(128)
             s.fill((0,0,0))
-            screen.blit(s, (0,0))
+            blit(screen, s, (0,0))
             txt = font.render("GAME OVER", True, RED)
-            screen.blit(txt, (SCREEN_WIDTH//2 - 80, SCREEN_HEIGHT//2))
+            blit(screen, txt, (SCREEN_WIDTH//2 - text_width(txt)//2, SCREEN_HEIGHT//2))
         elif self.win:
-            s = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            s = pygame.Surface(screen.get_size())
             s.set_alpha(128)
             s.fill((0,0,0))
-            screen.blit(s, (0,0))
+            blit(screen, s, (0,0))
             txt = font.render("LEVEL COMPLETE!", True, GREEN)
-            screen.blit(txt, (SCREEN_WIDTH//2 - 100, SCREEN_HEIGHT//2))
+            blit(screen, txt, (SCREEN_WIDTH//2 - text_width(txt)//2, SCREEN_HEIGHT//2))
 
 # ==========================================
-# GAME LOOP (with ESC to menu)
+# RENDER BACKENDS
 # ==========================================
-def run_game(level_str, mode="adventure"):
-    """Run a level and return the next level string or 'menu'."""
-    game = Game(level_str, mode)
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return "quit"
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    return "menu"          # Press ESC to return to main menu
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                game.handle_click(event.pos)
+class SoftwareBackend:
+    """Draw everything with Surface operations, scaled once to the window."""
+    name = "software"
 
-                # Sun collection
-                for s in game.suns[:]:
-                    if s.rect.collidepoint(event.pos):
-                        game.sun_points += s.value
-                        game.suns.remove(s)
+    def make_screen(self):
+        """Return the surface frames are drawn on at the internal resolution."""
+        if window.get_size() == internal_size():
+            return window
+        return pygame.Surface(internal_size())
 
-                if game.win:
-                    # Advance to next level
-                    w, sl = map(int, level_str.split('-'))
-                    sl += 1
-                    if sl > 10:
-                        sl = 1
-                        w += 1
-                    return f"{w}-{sl}"
-                if game.game_over:
-                    return "menu"
+    def invalidate(self):
+        pass
 
-        game.update()
-        game.draw(screen)
+    def draw_game(self, game, alpha=1.0):
+        game.draw(screen, alpha)
+
+    def present(self):
+        if screen is not window:
+            pygame.transform.scale(screen, window.get_size(), window)
         pygame.display.flip()
-        clock.tick(60)
 
-def main():
+    def present_screen(self):
+        """Show whatever menus and info screens drew on `screen`."""
+        self.present()
+
+    def capture(self):
+        """Return a copy of the last frame at the internal resolution."""
+        return screen.copy()
+
+    def draw_panel(self, panel, pos):
+        """Draw a debug panel (already at internal resolution) over the frame."""
+        screen.blit(panel, pos)
+
+    def to_logical(self, pos):
+        return window_to_logical(pos, window.get_size())
+
+class SDLRendererBackend:
+    """Composite cached textures with the SDL2 Renderer.
+
+    Sprites, text, the lawn and the sidebar are rendered once through the
+    regular software drawing code and kept as textures, so a level frame is
+    only texture copies plus a few filled rects for health bars. Menus still
+    draw on the `screen` surface, which is uploaded to a streaming texture.
+    """
+    name = "sdl2"
+    MAX_TEXT_TEXTURES = 512
+
+    def __init__(self, driver=None, vsync=False):
+        size = window.get_size()
+        pygame.display.quit()
+        pygame.display.init()
+        self.window = sdl2_video.Window(CAPTION, size=size)
+        index = -1
+        if driver:
+            names = [info.name for info in sdl2_video.get_drivers()]
+            index = names.index(driver)
+        self.renderer = sdl2_video.Renderer(self.window, index=index, vsync=vsync)
+        self.invalidate()
+
+    def make_screen(self):
+        # Menus keep drawing on a plain surface that present_screen() uploads.
+        return pygame.Surface(internal_size())
+
+    def invalidate(self):
+        """Drop every cached texture after a render scale or quality change."""
+        # The renderer scales the internal resolution to the window and maps
+        # mouse positions back to it.
+        self.renderer.logical_size = internal_size()
+        self.screen_texture = sdl2_video.Texture(self.renderer, internal_size(), streaming=True)
+        self.sprites = {}
+        self.texts = {}
+        self.backgrounds = {}
+        self.sidebar = (None, None)
+
+    def texture(self, surface):
+        return sdl2_video.Texture.from_surface(self.renderer, surface)
+
+    def sprite(self, entity, pad_x, pad_y, width, height):
+        """Return the cached texture for the entity's current look."""
+        key = (type(entity).__name__,) + entity.sprite_key()
+        tex = self.sprites.get(key)
+        if tex is None:
+            surf = pygame.Surface((sc(width), sc(height)), pygame.SRCALPHA)
+            entity.draw_sprite(surf, pad_x, pad_y)
+            tex = self.sprites[key] = self.texture(surf)
+        return tex
+
+    def text(self, text_font, text, color):
+        key = (id(text_font), text, color)
+        tex = self.texts.get(key)
+        if tex is None:
+            if len(self.texts) >= self.MAX_TEXT_TEXTURES:
+                self.texts.clear()
+            tex = self.texts[key] = self.texture(text_font.render(text, True, color))
+        return tex
+
+    def fill_rect(self, color, rect):
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.fill_rect(sc_rect(rect))
+
+    def draw_health_bar(self, rects):
+        if rects is None or not quality['health_bars']:
+            return
+        back, fill = rects
+        self.fill_rect(RED, back)
+        self.fill_rect(GREEN, fill)
+
+    def draw_background(self, game):
+        key = (game.env, tuple(game.water_rows), game.water_phase(), tuple(game.lawn_mowers or ()))
+        tex = self.backgrounds.get(key)
+        if tex is None:
+            surf = pygame.Surface((sc(GAME_WIDTH), sc(SCREEN_HEIGHT)))
+            game.draw_background(surf)
+            tex = self.backgrounds[key] = self.texture(surf)
+        tex.draw(dstrect=(0, 0))
+
+    def draw_sidebar(self, game):
+        key = (game.sun_points, game.selected_plant, game.level_str, game.mode, game.recharge_seconds())
+        cached_key, tex = self.sidebar
+        if cached_key != key:
+            surf = pygame.Surface(internal_size())
+            game.draw_sidebar(surf)
+            sidebar_rect = sc_rect((GAME_WIDTH, 0, SIDEBAR_WIDTH, SCREEN_HEIGHT))
+            tex = self.texture(surf.subsurface(sidebar_rect))
+            self.sidebar = (key, tex)
+        tex.draw(dstrect=(sc(GAME_WIDTH), 0))
+
+    def draw_overlay(self, game):
+        if game.game_over:
+            message, color = "GAME OVER", RED
+        elif game.win:
+            message, color = "LEVEL COMPLETE!", GREEN
+        else:
+            return
+        self.renderer.draw_blend_mode = 1     # SDL_BLENDMODE_BLEND
+        self.fill_rect((0, 0, 0, 128), (0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.renderer.draw_blend_mode = 0
+        tex = self.text(font, message, color)
+        tex.draw(dstrect=(sc(SCREEN_WIDTH//2) - tex.width//2, sc(SCREEN_HEIGHT//2)))
+
+    def draw_game(self, game, alpha=1.0):
+        self.renderer.draw_color = pygame.Color(BLACK)
+        self.renderer.clear()
+        with span('draw_background'):
+            self.draw_background(game)
+        with span('draw_entities'):
+            self.draw_entities(game, alpha)
+        with span('draw_sidebar'):
+            self.draw_sidebar(game)
+        with span('draw_overlay'):
+            self.draw_overlay(game)
+
+    def draw_entities(self, game, alpha):
+        # Sprites are padded so the "Zzz" and chomper mouth above a plant fit.
+        for row in game.grid:
+            for plant in row:
+                if plant:
+                    pad = CELL_SIZE//4
+                    tex = self.sprite(plant, 0, pad, CELL_SIZE, CELL_SIZE + pad)
+                    tex.draw(dstrect=(sc(plant.x), sc(plant.y) - sc(pad)))
+                    self.draw_health_bar(plant.health_bar_rects(plant.x, plant.y))
+        for z in game.zombies:
+            x, y = lerp_position(z, alpha)
+            tex = self.sprite(z, 0, 0, CELL_SIZE, CELL_SIZE)
+            tex.draw(dstrect=(sc(x), sc(y)))
+            self.draw_health_bar(z.health_bar_rects(x, y))
+        # A circle of radius r covers 2*r + 1 pixels: one more on each side
+        half = PEA_SIZE//2 + 1
+        for p in game.projectiles:
+            x, y = lerp_position(p, alpha)
+            tex = self.sprite(p, half, half, 2*half, 2*half)
+            tex.draw(dstrect=(sc(int(x)) - sc(half), sc(int(y)) - sc(half)))
+        half = SUN_SIZE//2 + 1
+        for sun in game.suns:
+            x, y = lerp_position(sun, alpha)
+            tex = self.sprite(sun, half, half, 2*half, 2*half)
+            tex.draw(dstrect=(sc(x) - sc(half), sc(y) - sc(half)))
+
+    def present(self):
+        self.renderer.present()
+
+    def present_screen(self):
+        self.screen_texture.update(screen)
+        self.screen_texture.draw()
+        self.renderer.present()
+
+    def capture(self):
+        frame = pygame.Surface(internal_size(), 0, 32)
+        return self.renderer.to_surface(frame)
+
+    def draw_panel(self, panel, pos):
+        tex = self.texture(panel)
+        tex.alpha = panel.get_alpha()
+        tex.draw(dstrect=pos)
+
+    def to_logical(self, pos):
+        return (int(pos[0] / RENDER_SCALE), int(pos[1] / RENDER_SCALE))
+
+backend = SoftwareBackend()
+
+def init_backend(name, driver=None, vsync=False):
+    """Select the render backend at startup, optionally synced to vblank."""
+    global backend, screen, window
+    if name == "sdl2" and sdl2_video is None:
+        log.warning("pygame._sdl2 is not available, using the software renderer")
+        name = "software"
+    if name == "sdl2":
+        backend = SDLRendererBackend(driver, vsync)
+    else:
+        if vsync:
+            # Window surfaces only get vsync through SDL's renderer, which
+            # SCALED puts behind the display surface.
+            try:
+                window = pygame.display.set_mode(window.get_size(), pygame.SCALED, vsync=1)
+            except pygame.error as error:
+                log.warning("vsync is not available (%s), pacing with hybrid sleep instead", error)
+                pacer.strategy = 'hybrid'
+        backend = SoftwareBackend()
+    screen = backend.make_screen()
+
+# ==========================================
+# QUALITY GOVERNOR
+# ==========================================
+class QualityGovernor:
+    """Trade visual effects for frame time.
+
+    Every frame reports how long its update, draw and present took. When that
+    work stays over the frame budget for `down_frames` frames in a row the
+    next QUALITY_LEVELS entry is applied; when it stays under `headroom` of
+    the budget for `up_frames` frames one level is restored. A step up that
+    is quickly undone doubles the wait before the next one, so the governor
+    settles instead of oscillating between two levels.
+    """
+
+    def __init__(self, fps=60, base_scale=1.0, down_frames=30, up_frames=180,
+                 headroom=0.6, max_up_frames=3600):
+        self.budget_ms = 1000.0 / fps
+        self.base_scale = base_scale
+        self.down_frames = down_frames
+        self.up_frames = up_frames
+        self.headroom = headroom
+        self.max_up_frames = max_up_frames
+        self.level = 0
+        self.over = 0
+        self.under = 0
+        self.frames_since_up = None
+
+    def frame(self, work_ms):
+        if work_ms > self.budget_ms:
+            self.over += 1
+            self.under = 0
+        elif work_ms < self.budget_ms * self.headroom:
+            self.under += 1
+            self.over = 0
+        else:
+            self.over = self.under = 0
+        if self.frames_since_up is not None:
+            self.frames_since_up += 1
+
+        if self.over >= self.down_frames and self.level < len(QUALITY_LEVELS) - 1:
+            if self.frames_since_up is not None and self.frames_since_up < self.up_frames:
+                self.up_frames = min(self.up_frames * 2, self.max_up_frames)
+            self.set_level(self.level + 1)
+        elif self.under >= self.up_frames and self.level > 0:
+            self.set_level(self.level - 1)
+            self.frames_since_up = 0
+
+    def set_level(self, level):
+        self.level = level
+        self.over = self.under = 0
+        apply_quality(level, self.base_scale)
+
+def apply_quality(level, base_scale=1.0):
+    """Switch the visual features of QUALITY_LEVELS[level] on or off."""
+    quality.update(QUALITY_LEVELS[level])
+    scale = base_scale * quality['render_scale']
+    if scale != RENDER_SCALE:
+        set_render_scale(scale)
+    else:
+        backend.invalidate()
+
+governor = None
+
+# ==========================================
+# FRAME PACING
+# ==========================================
+class FramePacer:
+    """Waits out the rest of each frame and keeps statistics on the result.
+
+    Strategies:
+      tick    clock.tick(), sleeps with SDL_Delay granularity
+      busy    clock.tick_busy_loop(), spins for the whole wait
+      hybrid  sleeps until SPIN_MS before the deadline, then spins
+      vsync   no waiting here; present() blocks on the display's vblank
+
+    Every frame interval lands in a 1 ms histogram; level_summary() turns it
+    into mean, jitter (standard deviation), p99 and dropped frames, i.e.
+    intervals that spanned more than one frame period.
+    """
+    STRATEGIES = ('tick', 'busy', 'hybrid', 'vsync')
+    SPIN_MS = 2.0
+    MAX_BUCKET_MS = 100          # the last bucket collects every longer interval
+
+    def __init__(self, strategy='tick'):
+        self.strategy = strategy
+        self.deadline = None
+        self.last = None
+        self.begin_level()
+
+    def begin_level(self):
+        self.histogram = [0] * (self.MAX_BUCKET_MS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.dropped = 0
+        self.longest = 0.0
+        self.last = None
+
+    def reset(self):
+        """Forget the previous frame, e.g. after a pause."""
+        self.deadline = None
+        self.last = None
+
+    def wait(self, fps):
+        if self.strategy == 'tick':
+            clock.tick(fps)
+        elif self.strategy == 'busy':
+            clock.tick_busy_loop(fps)
+        else:
+            if self.strategy == 'hybrid' and fps:
+                self.sleep_then_spin(1.0 / fps)
+            clock.tick()
+        self.mark(fps)
+
+    def sleep_then_spin(self, period):
+        now = time.perf_counter()
+        if self.deadline is None or now > self.deadline + period:
+            self.deadline = now          # fell a whole frame behind: start over
+        else:
+            self.deadline += period
+        rest = self.deadline - now - self.SPIN_MS / 1000
+        if rest > 0:
+            time.sleep(rest)
+        while time.perf_counter() < self.deadline:
+            pass
+
+    def mark(self, fps):
+        """Record the interval since the previous frame."""
+        now = time.perf_counter()
+        if self.last is not None:
+            ms = (now - self.last) * 1000
+            self.histogram[min(int(ms), self.MAX_BUCKET_MS)] += 1
+            self.count += 1
+            self.total += ms
+            self.total_sq += ms * ms
+            self.longest = max(self.longest, ms)
+            if fps:
+                self.dropped += max(0, round(ms * fps / 1000) - 1)
+        self.last = now
+
+    def percentile(self, fraction):
+        target = self.count * fraction
+        seen = 0
+        for ms, n in enumerate(self.histogram):
+            seen += n
+            if seen >= target:
+                return ms
+        return self.MAX_BUCKET_MS
+
+    def level_summary(self, fps):
+        if not self.count:
+            return "no frames"
+        mean = self.total / self.count
+        jitter = math.sqrt(max(0.0, self.total_sq / self.count - mean * mean))
+        lines = ["%s pacing: %d frames, mean %.2f ms (target %s), jitter %.2f ms, "
+                 "p99 < %d ms, max %.1f ms, %d dropped"
+                 % (self.strategy, self.count, mean, "%.2f ms" % (1000 / fps) if fps else "uncapped",
+                    jitter, self.percentile(0.99) + 1, self.longest, self.dropped)]
+        peak = max(self.histogram)
+        for ms, n in enumerate(self.histogram):
+            if n:
+                label = ">=%d" % ms if ms == self.MAX_BUCKET_MS else "%2d-%d" % (ms, ms + 1)
+                lines.append("  %7s ms %6d %s" % (label, n, "#" * max(1, n * 40 // peak)))
+        return "\n".join(lines)
+
+pacer = FramePacer()
+
+# ==========================================
+# PAUSE / POWER SAVING
+# ==========================================
+PAUSE_KEY = pygame.K_p
+
+FOCUS_LOST_EVENTS = (pygame.WINDOWFOCUSLOST, pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN)
+FOCUS_GAINED_EVENTS = (pygame.WINDOWFOCUSGAINED, pygame.WINDOWRESTORED)
+
+def draw_pause_overlay(screen, frame, reason):
+    """Redraw the cached last frame with a pause banner on top."""
+    blit(screen, frame, (0, 0))
+    s = pygame.Surface(screen.get_size())
+    s.set_alpha(128)
+    s.fill((0,0,0))
+    blit(screen, s, (0,0))
+    txt = font.render("PAUSED", True, YELLOW)
+    blit(screen, txt, (SCREEN_WIDTH//2 - text_width(txt)//2, SCREEN_HEIGHT//2 - 20))
+    if reason == "key":
+        hint = "Press P or click to resume"
+    else:
+        hint = "Return to the window to resume"
+    hint_txt = small_font.render(hint, True, WHITE)
+    blit(screen, hint_txt, (SCREEN_WIDTH//2 - text_width(hint_txt)//2, SCREEN_HEIGHT//2 + 20))
+    backend.present_screen()
+
+def pause_game(reason):
+    """Freeze the level until it is resumed and return 'quit', 'menu' or None.
+
+    The simulation is frame based, so simply not calling Game.update keeps every
+    timer exact. While paused nothing is simulated or redrawn: the loop sleeps
+    in pygame.event.wait() and only repaints the cached frame when the window
+    is exposed again.
+    """
+    frame = backend.capture()
+    draw_pause_overlay(screen, frame, reason)
+    while True:
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            return "quit"
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                return "menu"
+            if event.key == PAUSE_KEY:
+                break
+        if event.type == pygame.MOUSEBUTTONDOWN and reason == "key":
+            break
+        if reason == "focus" and event.type in FOCUS_GAINED_EVENTS:
+            break
+        if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+            draw_pause_overlay(screen, frame, reason)
+    # Put the cached frame back and restart the clock so the first frame after
+    # resuming neither sleeps for the pause length nor tries to catch up.
+    blit(screen, frame, (0, 0))
+    clock.tick()
+    pacer.reset()
+    return None
+
+# ==========================================
+# VARIANT PROFILES
+# ==========================================
+# The other scripts in this folder used to be forks of this file; they are
+# now profiles of the same engine, chosen with --profile at startup. A
+# profile is plain data: screen and cell size, fonts, speckles, seed packet
+# cooldowns, lawn mowers, zombie speeds and entity geometry; the menu layout
+# and the lawn mowers' size follow from the screen and cell size.
+# 'render_scale', 'render_fps' and 'quality' are the defaults of the
+# command line options with those names.
+GEOMETRY_SETTINGS = ('PLANT_INSET', 'PLANT_MARGIN', 'ZOMBIE_INSET', 'ZOMBIE_MARGIN',
+                     'ZOMBIE_SPREAD', 'ZOMBIE_REACH', 'POLE_RANGE', 'POLE_JUMP',
+                     'CHOMPER_RANGE', 'MINE_RANGE', 'REPEATER_GAP', 'PEA_SIZE', 'PEA_SPEED',
+                     'SUN_SIZE', 'SUN_REST')
+CLASSIC_ZOMBIES = {z: dict(data) for z, data in ZOMBIE_DATA.items()}
+
+# PvZ1 seed packet recharge in frames: 7.5s, 30s for wall-nuts, 50s for cherry bombs
+PVZ1_COOLDOWNS = dict.fromkeys(PLANT_DATA, 450)
+PVZ1_COOLDOWNS.update(wallnut=1800, cherrybomb=3000)
+SLOW_ZOMBIE_SPEEDS = {'basic': 0.25, 'cone': 0.25, 'bucket': 0.25, 'flag': 0.5,
+                      'newspaper': 0.25, 'pole': 0.7, 'football': 0.6, 'ducky': 0.25}
+
+CLASSIC_PROFILE = {
+    'caption': CAPTION,
+    'screen': (SCREEN_WIDTH, SCREEN_HEIGHT),
+    'grid_cols': GRID_COLS,
+    'cell_size': CELL_SIZE,
+    'sidebar_width': SIDEBAR_WIDTH,
+    'seed_slots': None,                  # (top, pitch, height), None = derived from the cell size
+    'fonts': dict(FONT_SIZES),
+    'speckles': STONE_SPECKLES,
+    'cooldowns': None,
+    'lawn_mowers': False,
+    'ground_color': None,
+    'zombie_speeds': {},
+    'geometry': {name: globals()[name] for name in GEOMETRY_SETTINGS},
+    'render_scale': 1.0,
+    'render_fps': 60,
+    'quality': 'auto',
+}
+
+PROFILES = {
+    'classic': CLASSIC_PROFILE,
+    # AC's holdings: PvZ1 recharge and lawn mowers, slower zombies
+    'holdings': dict(CLASSIC_PROFILE, cooldowns=PVZ1_COOLDOWNS, lawn_mowers=True,
+                     ground_color=(50, 50, 20), zombie_speeds=SLOW_ZOMBIE_SPEEDS),
+    # Cat's 600x400 build: the holdings rules on a 7-column lawn of 60px cells
+    'cat': dict(CLASSIC_PROFILE, caption="AC'S PVZ", screen=(600, 400), grid_cols=7,
+                cell_size=60, sidebar_width=180, seed_slots=(35, 32, 30),
+                fonts={'font': 28, 'small_font': 20, 'title_font': 50}, speckles=150,
+                cooldowns=PVZ1_COOLDOWNS, lawn_mowers=True, ground_color=(50, 50, 20),
+                zombie_speeds=SLOW_ZOMBIE_SPEEDS,
+                geometry={'PLANT_INSET': 2, 'PLANT_MARGIN': 5, 'ZOMBIE_INSET': 5,
+                          'ZOMBIE_MARGIN': 15, 'ZOMBIE_SPREAD': 100, 'ZOMBIE_REACH': 5,
+                          'POLE_RANGE': 30, 'POLE_JUMP': 80, 'CHOMPER_RANGE': 30,
+                          'MINE_RANGE': 40, 'REPEATER_GAP': 10, 'PEA_SIZE': 6, 'PEA_SPEED': 4,
+                          'SUN_SIZE': 20, 'SUN_REST': 30}),
+    # Cheap hardware: classic rules at half the internal resolution, 30 drawn
+    # frames per second, and quality level 2 (no speckles, still water)
+    'lowspec': dict(CLASSIC_PROFILE, speckles=100, render_scale=0.5, render_fps=30, quality=2),
+}
+PROFILE = 'classic'
+
+def apply_profile(name):
+    """Install the settings of PROFILES[name].
+
+    Must run before the first Game is created. The window and fonts are not
+    touched; main() reopens them at the profile's size afterwards.
+    """
+    global PROFILE, CAPTION, SCREEN_WIDTH, SCREEN_HEIGHT, GRID_COLS, CELL_SIZE, SIDEBAR_WIDTH
+    global GAME_WIDTH, GAME_HEIGHT, PAD, BAR_OFFSET, BAR_HEIGHT, SIDEBAR_MARGIN, SNAP_DISTANCE
+    global SEED_SLOT_TOP, SEED_SLOT_PITCH, SEED_SLOT_HEIGHT, STONE_SPECKLES, COOLDOWN_FRAMES
+    global LAWN_MOWERS, GROUND_COLOR, ZOMBIE_DATA, MOWER_RECT, MENU_LAYOUT
+    profile = PROFILES[name]
+    PROFILE = name
+    CAPTION = profile['caption']
+    SCREEN_WIDTH, SCREEN_HEIGHT = profile['screen']
+    GRID_COLS = profile['grid_cols']
+    CELL_SIZE = profile['cell_size']
+    SIDEBAR_WIDTH = profile['sidebar_width']
+    # Same derivations as in CONSTANTS
+    GAME_WIDTH = GRID_COLS * CELL_SIZE
+    GAME_HEIGHT = GRID_ROWS * CELL_SIZE
+    PAD = CELL_SIZE // 16
+    BAR_OFFSET = CELL_SIZE // 8
+    BAR_HEIGHT = CELL_SIZE // 16
+    SIDEBAR_MARGIN = CELL_SIZE // 8
+    SNAP_DISTANCE = CELL_SIZE // 2
+    MOWER_RECT = (CELL_SIZE//8, CELL_SIZE//2, CELL_SIZE*3//8)
+    SEED_SLOT_TOP, SEED_SLOT_PITCH, SEED_SLOT_HEIGHT = profile['seed_slots'] or (
+        CELL_SIZE * 5 // 8, CELL_SIZE * 3 // 4, CELL_SIZE * 5 // 8)
+    FONT_SIZES.update(profile['fonts'])
+    STONE_SPECKLES = profile['speckles']
+    COOLDOWN_FRAMES = profile['cooldowns']
+    LAWN_MOWERS = profile['lawn_mowers']
+    GROUND_COLOR = profile['ground_color']
+    ZOMBIE_DATA = {z: dict(data, speed=profile['zombie_speeds'].get(z, data['speed']))
+                   for z, data in CLASSIC_ZOMBIES.items()}
+    globals().update(profile['geometry'])
+    MENU_LAYOUT = menu_layout()
+
+# ==========================================
+# SAVE GAMES
+# ==========================================
+# Files per profile under SAVE_DIR: progress_<profile>.json (adventure
+# level, unlocked plants, settings) and autosave_<mode>_<profile>.sav, the
+# whole board of a level left unfinished. Both are written by one
+# background thread, to a temporary file that is fsynced and renamed over
+# the old one, so a reboot leaves either the previous save or the new one.
+# journal_<profile>.bin is the input journal of the level being played,
+# appended to by a thread of its own (see InputJournal).
+SAVE_DIR = "pvz_save"
+SAVE_MAGIC = b"PVZS"
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct("<4sB")
+PLANT_TYPES = tuple(PLANT_DATA)
+ZOMBIE_TYPES = tuple(ZOMBIE_DATA)
+PROJECTILE_TYPES = ('pea', 'frozen')
+NO_CELL = 0xFFFF                 # a plant a zombie still eats after it left the grid
+
+# frame, sun, sun earned, selected (255 = none), game over, win, spawned,
+# to spawn, spawn delay, next spawn (a double: test boards use infinity),
+# mowers (bit per row, 255 = no mowers), cooldowns present
+GAME_RECORD = struct.Struct("<IiiBBBIIidBB")
+# cell, type, x, y, health, max health, last shot, last sun, exploded,
+# arm timer, armed, chewing, sleeping, watered, fertilized
+PLANT_RECORD = struct.Struct("<HBhhqqiiBiBiBBB")
+# row, col, type, flags (ZOMBIE_FLAGS), x, y, rect x, rect y, health,
+# max health, base speed, speed, target plant (-1 = none), slowed
+ZOMBIE_RECORD = struct.Struct("<BBBBdiiiqqddii")
+ZOMBIE_FLAGS = ('eating', 'has_pole', 'angry')
+X_IS_INT = 8                 # a zombie's x stays an int until it first moves
+# type, row, x, y, rect x, rect y, damage, speed
+PROJECTILE_RECORD = struct.Struct("<BBiiiiii")
+# x, y, rect x, rect y, value, falling, speed
+SUN_RECORD = struct.Struct("<iiiiiBi")
+COUNT = struct.Struct("<I")
+RANDOM_STATE = struct.Struct("<B625IBd")
+
+def save_path(kind, extension):
+    return os.path.join(SAVE_DIR, "%s_%s.%s" % (kind, PROFILE, extension))
+
+def pack_text(text):
+    data = text.encode()
+    return bytes((len(data),)) + data
+
+def unpack_text(data, offset):
+    if offset >= len(data) or offset + 1 + data[offset] > len(data):
+        raise ValueError("save data cut short")
+    end = offset + 1 + data[offset]
+    return data[offset + 1:end].decode(), end
+
+def zombie_flags(z):
+    flags = sum(1 << bit for bit, name in enumerate(ZOMBIE_FLAGS) if getattr(z, name))
+    return flags | X_IS_INT if isinstance(z.x, int) else flags
+
+def encode_game(game):
+    """The complete simulation state of `game` and of the random module.
+
+    Render-only state (interpolation positions) is left out. Zombies keep
+    eating a plant that a mine or cherry bomb already removed from the grid,
+    so such plants are stored too, without a cell.
+    """
+    table, index = [], {}
+    for cell, plant in enumerate(plant for row in game.grid for plant in row):
+        if plant:
+            index[id(plant)] = len(table)
+            table.append((cell, plant))
+    for z in game.zombies:
+        target = z.target_plant
+        if target is not None and id(target) not in index:
+            index[id(target)] = len(table)
+            table.append((NO_CELL, target))
+    mowers = 255 if game.lawn_mowers is None else sum(1 << row for row, mower in enumerate(game.lawn_mowers)
+                                                       if mower)
+    selected = PLANT_TYPES.index(game.selected_plant) if game.selected_plant else 255
+    parts = [pack_text(PROFILE), pack_text(game.level_str), pack_text(game.mode),
+             GAME_RECORD.pack(game.frame_count, game.sun_points, game.sun_earned, selected, game.game_over,
+                              game.win, game.zombies_spawned, game.zombies_to_spawn, game.spawn_delay,
+                              game.next_spawn, mowers, game.plant_cooldowns is not None)]
+    if game.plant_cooldowns is not None:
+        parts.append(struct.pack("<%di" % len(PLANT_TYPES), *(game.plant_cooldowns[p] for p in PLANT_TYPES)))
+    parts.append(COUNT.pack(len(table)))
+    parts += [PLANT_RECORD.pack(cell, PLANT_TYPES.index(p.type), p.x, p.y, p.health, p.max_health,
+                                p.last_shot, p.last_sun_gen, p.exploded, p.arm_timer, p.is_armed,
+                                p.chewing, p.sleeping, p.watered, p.fertilized)
+              for cell, p in table]
+    parts.append(COUNT.pack(len(game.zombies)))
+    parts += [ZOMBIE_RECORD.pack(z.row, z.col, ZOMBIE_TYPES.index(z.type), zombie_flags(z), z.x, z.y,
+                                 z.rect.x, z.rect.y, z.health, z.max_health, z.base_speed, z.speed,
+                                 -1 if z.target_plant is None else index[id(z.target_plant)], z.slowed)
+              for z in game.zombies]
+    parts.append(COUNT.pack(len(game.projectiles)))
+    parts += [PROJECTILE_RECORD.pack(PROJECTILE_TYPES.index(p.type), p.target_row, p.x, p.y, p.rect.x,
+                                     p.rect.y, p.damage, p.speed)
+              for p in game.projectiles]
+    parts.append(COUNT.pack(len(game.suns)))
+    parts += [SUN_RECORD.pack(s.x, s.y, s.rect.x, s.rect.y, s.value, s.falling, s.speed) for s in game.suns]
+    version, words, gauss = random.getstate()
+    parts.append(RANDOM_STATE.pack(version, *words, gauss is not None, gauss or 0.0))
+    return b"".join(parts)
+
+def records(record, data, offset):
+    """Unpack a count-prefixed run of `record`s; return (tuples, new offset)."""
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    end = offset + count * record.size
+    if end > len(data):
+        raise ValueError("save data cut short")
+    return list(record.iter_unpack(data[offset:end])), end
+
+def decode_game(data):
+    """Rebuild the Game stored by encode_game() and restore the random state."""
+    profile, offset = unpack_text(data, 0)
+    if profile != PROFILE:
+        raise ValueError("saved with the %s profile, playing %s" % (profile, PROFILE))
+    level_str, offset = unpack_text(data, offset)
+    mode, offset = unpack_text(data, offset)
+    game = Game(level_str, mode)
+    (game.frame_count, game.sun_points, game.sun_earned, selected, over, win, game.zombies_spawned,
+     game.zombies_to_spawn, game.spawn_delay, game.next_spawn, mowers,
+     has_cooldowns) = GAME_RECORD.unpack_from(data, offset)
+    offset += GAME_RECORD.size
+    if game.next_spawn.is_integer():
+        game.next_spawn = int(game.next_spawn)
+    game.reschedule()
+    game.selected_plant = None if selected == 255 else PLANT_TYPES[selected]
+    game.game_over, game.win = bool(over), bool(win)
+    game.lawn_mowers = None if mowers == 255 else [bool(mowers >> row & 1) for row in range(GRID_ROWS)]
+    if has_cooldowns:
+        cooldowns = struct.unpack_from("<%di" % len(PLANT_TYPES), data, offset)
+        offset += 4 * len(PLANT_TYPES)
+        game.plant_cooldowns = dict(zip(PLANT_TYPES, cooldowns))
+    else:
+        game.plant_cooldowns = None
+
+    rows, offset = records(PLANT_RECORD, data, offset)
+    plants = []
+    for (cell, kind, x, y, health, max_health, last_shot, last_sun, exploded, arm_timer, armed,
+         chewing, sleeping, watered, fertilized) in rows:
+        p = Plant.__new__(Plant)
+        p.type, p.x, p.y = PLANT_TYPES[kind], x, y
+        p.rect = pygame.Rect(x, y, CELL_SIZE-PLANT_MARGIN, CELL_SIZE-PLANT_MARGIN)
+        p.health, p.max_health, p.last_shot, p.last_sun_gen = health, max_health, last_shot, last_sun
+        p.exploded, p.arm_timer, p.is_armed, p.chewing = bool(exploded), arm_timer, bool(armed), chewing
+        p.sleeping, p.watered, p.fertilized = bool(sleeping), bool(watered), bool(fertilized)
+        plants.append(p)
+        if cell != NO_CELL:
+            game.grid[cell // GRID_COLS][cell % GRID_COLS] = p
+
+    rows, offset = records(ZOMBIE_RECORD, data, offset)
+    for (row, col, kind, flags, x, y, rect_x, rect_y, health, max_health, base_speed, speed,
+         target, slowed) in rows:
+        z = Zombie.__new__(Zombie)
+        z.row, z.col, z.type, z.y = row, col, ZOMBIE_TYPES[kind], y
+        z.x = int(x) if flags & X_IS_INT else x
+        z.rect = pygame.Rect(rect_x, rect_y, CELL_SIZE-ZOMBIE_MARGIN, CELL_SIZE-ZOMBIE_MARGIN)
+        z.health, z.max_health, z.base_speed, z.speed = health, max_health, base_speed, speed
+        for bit, name in enumerate(ZOMBIE_FLAGS):
+            setattr(z, name, bool(flags >> bit & 1))
+        z.target_plant = None if target < 0 else plants[target]
+        z.slowed = slowed
+        game.zombies.append(z)
+
+    rows, offset = records(PROJECTILE_RECORD, data, offset)
+    for kind, target_row, x, y, rect_x, rect_y, damage, speed in rows:
+        p = Projectile.__new__(Projectile)
+        p.type, p.target_row, p.x, p.y = PROJECTILE_TYPES[kind], target_row, x, y
+        p.rect = pygame.Rect(rect_x, rect_y, PEA_SIZE, PEA_SIZE)
+        p.damage, p.speed = damage, speed
+        game.projectiles.append(p)
+
+    rows, offset = records(SUN_RECORD, data, offset)
+    for x, y, rect_x, rect_y, value, falling, speed in rows:
+        s = Sun.__new__(Sun)
+        s.x, s.y, s.value, s.falling, s.speed = x, y, value, bool(falling), speed
+        s.rect = pygame.Rect(rect_x, rect_y, SUN_SIZE, SUN_SIZE)
+        game.suns.append(s)
+
+    state = RANDOM_STATE.unpack_from(data, offset)
+    random.setstate((state[0], state[1:626], state[627] if state[626] else None))
+    return game
+
+def save_file(raw):
+    """File contents for encoded game state: a header, then the state deflated."""
+    return SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION) + zlib.compress(raw)
+
+def load_file(contents):
+    magic, version = SAVE_HEADER.unpack_from(contents)
+    if magic != SAVE_MAGIC or version != SAVE_VERSION:
+        raise ValueError("not a version %d save file" % SAVE_VERSION)
+    return decode_game(zlib.decompress(contents[SAVE_HEADER.size:]))
+
+def write_atomic(path, data):
+    """Replace `path` with `data` so that a crash leaves the old or the new file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp = path + ".tmp"
+    with open(temp, "wb") as out:
+        out.write(data)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(temp, path)
+
+class SaveWriter:
+    """The thread that writes save files with write_atomic().
+
+    Only the newest data queued for a path is written; older data still
+    waiting is dropped. Data may be a function returning the bytes, so that
+    building them (compression) happens on this thread too. None deletes
+    the file instead.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.busy = False
+        self.stopping = False
+        self.wake = threading.Condition()
+        self.thread = None
+
+    def put(self, path, data):
+        with self.wake:
+            self.pending[path] = data
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='save-writer', daemon=True)
+                self.thread.start()
+            self.wake.notify()
+
+    def stop(self):
+        """Write whatever is still queued, then end the thread."""
+        if self.thread is None:
+            return
+        with self.wake:
+            self.stopping = True
+            self.wake.notify()
+        self.thread.join()
+        self.thread = None
+        self.stopping = False
+
+    def run(self):
+        while True:
+            with self.wake:
+                while not self.pending and not self.stopping:
+                    self.wake.wait()
+                if not self.pending:
+                    return
+                path, data = self.pending.popitem()
+            try:
+                if data is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    write_atomic(path, data() if callable(data) else data)
+            except OSError as exc:
+                log.error("could not write %s: %s", path, exc)
+
+writer = SaveWriter()
+
+class Autosaver:
+    """Mid-level saves of the running Game, at most one every INTERVAL seconds.
+
+    Only encode_game() runs on the frame that saves (well under a
+    millisecond for a full board); compression, fsync and the rename happen
+    on the writer thread.
+    """
+    INTERVAL = 10.0
+
+    def __init__(self):
+        self.enabled = False
+        self.last = 0.0
+
+    def path(self, mode):
+        """One autosave per mode, so a survival run keeps the adventure save."""
+        return save_path('autosave_' + mode, 'sav')
+
+    def begin_level(self):
+        self.last = time.perf_counter()
+
+    def due(self):
+        now = time.perf_counter()
+        if now - self.last < self.INTERVAL:
+            return False
+        self.last = now
+        return True
+
+    def maybe_save(self, game):
+        if self.due():
+            self.save(game)
+
+    def save(self, game):
+        try:
+            raw = encode_game(game)
+        except (struct.error, ValueError) as exc:
+            log.warning("autosave skipped: %s", exc)
+            return
+        writer.put(self.path(game.mode), lambda: save_file(raw))
+
+    def discard(self, mode):
+        writer.put(self.path(mode), None)
+
+    def resume(self, level_str, mode):
+        """The saved Game if the autosave is of this level and mode, else None."""
+        try:
+            with open(self.path(mode), "rb") as f:
+                game = load_file(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, zlib.error) as exc:
+            log.warning("ignoring autosave %s: %s", self.path(mode), exc)
+            return None
+        if (game.level_str, game.mode) != (level_str, mode):
+            return None
+        return game
+
+autosave = Autosaver()
+
+class Progress:
+    """What survives a restart: the adventure level, unlocked plants and settings.
+
+    Settings are the options saved with --save-settings; see valid_setting()
+    for what a loaded value must look like.
+    """
+    SETTINGS = ('fps', 'render_scale', 'quality', 'speed')
+
+    def __init__(self):
+        self.enabled = False
+        self.level = "1-1"
+        self.best = "1-1"
+        self.settings = {}
+
+    def path(self):
+        return save_path('progress', 'json')
+
+    def load(self):
+        try:
+            with open(self.path()) as f:
+                data = json.load(f)
+            level, best = data['level'], data.get('best', data['level'])
+            if level_key(best) < level_key(level):
+                best = level
+            self.level, self.best = level, best
+            self.settings = {}
+            for name, value in data.get('settings', {}).items():
+                if name in self.SETTINGS and valid_setting(name, value):
+                    self.settings[name] = value
+                else:
+                    log.warning("ignoring setting %s=%r in %s", name, value, self.path())
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            log.warning("ignoring progress file %s: %s", self.path(), exc)
+
+    def unlocked(self):
+        unlocked = unlocked_plants(self.best)
+        return [p for p in PLANT_DATA if p in unlocked]
+
+    def save(self):
+        if self.enabled:
+            data = {'level': self.level, 'best': self.best, 'unlocked': self.unlocked(),
+                    'settings': self.settings}
+            writer.put(self.path(), (json.dumps(data, indent=1) + "\n").encode())
+
+    def reached(self, level_str):
+        """Adventure continues at `level_str` from now on."""
+        self.level = level_str
+        if level_key(level_str) > level_key(self.best):
+            self.best = level_str
+        self.save()
+
+    def remember(self, **settings):
+        """Store these settings over the saved ones, if that changes them."""
+        merged = dict(self.settings, **settings)
+        if merged != self.settings:
+            self.settings = merged
+            self.save()
+
+def valid_setting(name, value):
+    """Whether a loaded setting is one the options could have given."""
+    if name == 'quality' and value == 'auto':
+        return True
+    if type(value) is not int and not (name == 'render_scale' and type(value) is float):
+        return False
+    if name == 'fps':
+        return value >= 0
+    if name == 'render_scale':
+        return MIN_RENDER_SCALE <= value <= MAX_RENDER_SCALE
+    if name == 'quality':
+        return 0 <= value < len(QUALITY_LEVELS)
+    return value in TIME_SCALES
+
+progress = Progress()
+
+JOURNAL_MAGIC = b"PVZJ"
+# kind, tick, x, y, button / key / size of the board that follows a START
+JOURNAL_RECORD = struct.Struct("<BIhhi")
+JOURNAL_START, JOURNAL_CLICK, JOURNAL_KEY, JOURNAL_MARK = range(4)
+
+class InputJournal:
+    """Append-only journal of a level's inputs, for recovery after a crash.
+
+    begin() writes the level's starting board (encode_game, which carries
+    the random state); after that every click and key press is one
+    JOURNAL_RECORD stamped with the tick it was applied before. Records
+    collect in memory and at most every FLUSH_INTERVAL seconds go, with a
+    MARK of the current tick, to a thread that appends and fsyncs them, so
+    a crash loses at most that much play. A level that ends normally
+    deletes its journal, so one left at startup means a crash: replay()
+    rebuilds the board by running the ticks headlessly with the same
+    inputs, which the fixed-step simulation turns into the same game.
+    """
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self):
+        self.enabled = False
+        self.active = False
+        self.game = None
+        self.buffer = bytearray()
+        self.last = 0.0
+        self.ops = queue.Queue()
+        self.thread = None
+
+    def path(self):
+        return save_path('journal', 'bin')
+
+    def begin(self, game):
+        if not self.enabled:
+            return
+        try:
+            board = encode_game(game)
+        except (struct.error, ValueError) as exc:
+            log.warning("input journal off for this level: %s", exc)
+            self.active = False
+            return
+        self.active = True
+        self.game = game
+        self.buffer = bytearray()
+        self.last = time.perf_counter()
+        self.send('start', JOURNAL_MAGIC + JOURNAL_RECORD.pack(
+            JOURNAL_START, game.frame_count, 0, 0, len(board)) + board)
+
+    def click(self, game, pos, button):
+        if self.active:
+            self.buffer += JOURNAL_RECORD.pack(JOURNAL_CLICK, game.frame_count, pos[0], pos[1], button)
+
+    def key(self, game, key):
+        if self.active:
+            self.buffer += JOURNAL_RECORD.pack(JOURNAL_KEY, game.frame_count, 0, 0, key)
+
+    def maybe_flush(self):
+        now = time.perf_counter()
+        if self.active and now - self.last >= self.FLUSH_INTERVAL:
+            self.last = now
+            self.flush()
+
+    def flush(self):
+        self.buffer += JOURNAL_RECORD.pack(JOURNAL_MARK, self.game.frame_count, 0, 0, 0)
+        self.send('append', bytes(self.buffer))
+        self.buffer = bytearray()
+
+    def end(self):
+        """The level ended normally: delete its journal."""
+        if self.enabled:
+            self.active = False
+            self.game = None
+            self.send('end', None)
+
+    def stop(self):
+        """Write what is buffered, close the file (keeping it) and end the thread."""
+        if self.active:
+            self.flush()
+            self.active = False
+        if self.thread is not None and self.thread.is_alive():
+            self.ops.put(('stop', None))
+            self.thread.join()
+        self.thread = None
+
+    def send(self, op, data):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name='input-journal', daemon=True)
+            self.thread.start()
+        self.ops.put((op, data))
+
+    def run(self):
+        f = None
+        try:
+            while True:
+                op, data = self.ops.get()
+                try:
+                    if op == 'start':
+                        if f:
+                            f.close()
+                        os.makedirs(os.path.dirname(self.path()) or '.', exist_ok=True)
+                        f = open(self.path(), "wb")
+                    elif op == 'end':
+                        if f:
+                            f.close()
+                            f = None
+                        if os.path.exists(self.path()):
+                            os.remove(self.path())
+                    elif op == 'stop':
+                        return
+                    if f and data:
+                        f.write(data)
+                        f.flush()
+                        os.fsync(f.fileno())
+                except OSError as exc:
+                    log.error("could not write %s: %s", self.path(), exc)
+        finally:
+            if f:
+                f.close()
+
+    def load(self):
+        """(starting board, records) of a journal left by a crash, or None."""
+        try:
+            with open(self.path(), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        offset = len(JOURNAL_MAGIC) + JOURNAL_RECORD.size
+        if not data.startswith(JOURNAL_MAGIC) or len(data) < offset:
+            return None
+        kind, _, _, _, size = JOURNAL_RECORD.unpack_from(data, len(JOURNAL_MAGIC))
+        if kind != JOURNAL_START or len(data) < offset + size:
+            return None
+        board = data[offset:offset + size]
+        offset += size
+        # A record cut short by the crash is dropped.
+        count = (len(data) - offset) // JOURNAL_RECORD.size
+        records = [JOURNAL_RECORD.unpack_from(data, offset + i * JOURNAL_RECORD.size)
+                   for i in range(count)]
+        return board, records
+
+    def replay(self, board, records):
+        """The Game rebuilt from a journal, as of its last record."""
+        game = decode_game(board)
+        for kind, tick, x, y, _ in records:
+            while game.frame_count < tick and not (game.game_over or game.win):
+                game.update()
+            if kind == JOURNAL_CLICK:
+                apply_click(game, (x, y))
+        return game
+
+    def discard(self):
+        if os.path.exists(self.path()):
+            os.remove(self.path())
+
+journal = InputJournal()
+
+def recover_crashed_level():
+    """Offer to restore the level a crash interrupted; the Game, "quit" or None."""
+    found = journal.load() if journal.enabled else None
+    if found is None:
+        return None
+    board, records = found
+    try:
+        start_board = decode_game(board)
+    except (ValueError, struct.error) as exc:
+        log.warning("ignoring input journal %s: %s", journal.path(), exc)
+        journal.discard()
+        return None
+    answer = ask_screen("Restore?", [
+        "The game closed unexpectedly during",
+        "%s level %s." % (start_board.mode.capitalize(), start_board.level_str),
+        "Continue where it stopped?"])
+    if answer == "quit":
+        return answer
+    if not answer:
+        journal.discard()
+        return None
+    start = time.perf_counter()
+    game = journal.replay(board, records)
+    log.info("restored %s %s at tick %d from %d journal records in %.2fs",
+             game.level_str, game.mode, game.frame_count, len(records), time.perf_counter() - start)
+    return game
+
+# ==========================================
+# GAME LOOP (with ESC to menu)
+# ==========================================
+PROFILE_START = None         # frame at which a level starts a cProfile capture
+PACING_REPORT = False        # print frame interval statistics after each level
+LOW_LATENCY = False          # sleep in event.wait() and present clicks immediately
+SIM_FPS = 60                 # Game.update always runs at this rate
+RENDER_FPS = 60              # frames drawn per second, 0 = uncapped
+MAX_FRAME_TIME = 0.25        # longest stretch of real time one frame may simulate
+TIME_SCALES = (1, 2, 4, 8, 0)  # fast-forward speeds cycled with F, 0 = as fast as possible
+TIME_SCALE = 1               # speed each level starts at
+FAST_FORWARD_KEY = pygame.K_f
+SIM_BUDGET = 0.75            # share of a frame that fast-forward ticks may use
+
+time_scale_panels = {}
+
+def wait_for_input(deadline):
+    """Sleep until perf_counter() reaches `deadline`, waking early for a click.
+
+    Returns (events, on_time): the events that arrived while sleeping and
+    whether the deadline was reached (False when a click cut the sleep short).
+    """
+    events = []
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return events, True
+        event = pygame.event.wait(max(1, int(remaining * 1000)))
+        latency.polled()
+        if event.type != pygame.NOEVENT:
+            events.append(event)
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                return events, False
+
+def apply_click(game, pos):
+    """A left click on the level: Game.handle_click, then sun collection."""
+    game.handle_click(pos)
+    for s in game.suns[:]:
+        if s.rect.collidepoint(pos):
+            game.sun_points += s.value
+            game.sun_earned += s.value
+            game.suns.remove(s)
+
+def next_level(level_str):
+    """The level after `level_str`: 1-10 is followed by 2-1."""
+    w, sl = map(int, level_str.split('-'))
+    sl += 1
+    if sl > 10:
+        sl = 1
+        w += 1
+    return f"{w}-{sl}"
+
+def fast_forward(game, ticks, budget_end):
+    """Run up to `ticks` updates (None = no limit) and return how many ran.
+
+    Stops early once perf_counter() passes `budget_end` or the level ends,
+    so a heavy board slows the game down instead of the frame rate. Every
+    tick is a whole Game.update at the normal step: peas still move
+    PEA_SPEED pixels and test for hits each tick, so fast-forward means
+    more ticks per frame, never longer ones that could skip a zombie.
+    """
+    ran = 0
+    while ticks is None or ran < ticks:
+        game.update()
+        ran += 1
+        if time.perf_counter() >= budget_end or game.game_over or game.win:
+            break
+    return ran
+
+def next_time_scale(scale):
+    return TIME_SCALES[(TIME_SCALES.index(scale) + 1) % len(TIME_SCALES)]
+
+def draw_time_scale(scale):
+    """Show the fast-forward speed in the top right corner of the lawn."""
+    key = (scale, RENDER_SCALE)
+    panel = time_scale_panels.get(key)
+    if panel is None:
+        text = small_font.render(">> " + ("max" if scale == 0 else "%dx" % scale), True, YELLOW)
+        panel = pygame.Surface((text.get_width() + 8, text.get_height() + 4))
+        panel.set_alpha(200)
+        panel.blit(text, (4, 2))
+        time_scale_panels[key] = panel
+    backend.draw_panel(panel, (sc(GAME_WIDTH) - panel.get_width() - 4, 4))
+
+class SimulationClock:
+    """How many Game.update ticks each drawn frame runs, for the frame loops.
+
+    At 1x with RENDER_FPS equal to SIM_FPS that is exactly one per frame.
+    At any other render rate the simulation keeps its fixed step through an
+    accumulator, and advance() returns how far between the last two ticks
+    moving entities are drawn. Fast-forward: see run_game.
+    """
+
+    def __init__(self, time_scale=1):
+        self.time_scale = time_scale
+        self.interpolate = RENDER_FPS != SIM_FPS
+        self.step = 1.0 / SIM_FPS
+        self.frame_period = 1.0 / RENDER_FPS if RENDER_FPS else 0.0
+        self.accumulator = 0.0
+        self.last_time = time.perf_counter()
+
+    def cycle_speed(self):
+        self.time_scale = next_time_scale(self.time_scale)
+        self.accumulator = 0.0
+
+    def click(self, game, pos, button):
+        journal.click(game, pos, button)
+        apply_click(game, pos)
+
+    def key(self, game, key):
+        journal.key(game, key)
+
+    def pause(self):
+        """Nothing runs between frames, so there is nothing to stop."""
+
+    def resume(self):
+        """Forget the time that passed while paused."""
+        self.last_time = time.perf_counter()
+
+    def advance(self, game, tick_due=True):
+        """Run this frame's ticks and return the interpolation alpha.
+
+        `tick_due` is False for the extra frames LOW_LATENCY draws for a
+        click; they only advance an interpolating simulation.
+        """
+        now = time.perf_counter()
+        elapsed = min(now - self.last_time, MAX_FRAME_TIME)
+        self.last_time = now
+        scale = self.time_scale
+        if scale != 1:
+            budget_end = now + SIM_BUDGET * (self.frame_period or self.step)
+            if not scale:
+                if tick_due or self.interpolate:
+                    fast_forward(game, None, budget_end)
+            elif self.interpolate:
+                self.accumulator += elapsed * scale
+                ticks = int(self.accumulator / self.step)
+                if ticks and fast_forward(game, ticks, budget_end) == ticks:
+                    self.accumulator -= ticks * self.step
+                elif ticks:
+                    self.accumulator = 0.0
+            elif tick_due:
+                fast_forward(game, scale, budget_end)
+            return 1.0
+        if self.interpolate:
+            self.accumulator += elapsed
+            while self.accumulator >= self.step:
+                game.remember_positions()
+                game.update()
+                self.accumulator -= self.step
+            return self.accumulator / self.step
+        if tick_due:
+            game.update()
+        return 1.0
+
+class LevelFrames:
+    """Everything one frame of a level does, shared by the level loops.
+
+    run_game, run_split_game and AsyncLevel.frames differ only in where
+    Game.update runs, which `sim` hides (a SimulationClock here, or a
+    WorkerSimulation that fills `game` from the worker's board), and in how
+    they wait for the next frame. Each calls step() once per frame, which
+    handles the events, draws and presents the frame and feeds the
+    monitors, and then waits with wait() or on its own. `autosaves` is
+    False where something else saves the board.
+    """
+
+    def __init__(self, level_str, mode, game, sim, autosaves=True):
+        self.level_str = level_str
+        self.game = game
+        self.sim = sim
+        self.autosaves = autosaves
+        self.capture_start = PROFILE_START
+        self.pending = []        # events a LOW_LATENCY wait took off the queue
+        self.tick_due = True     # False for a frame drawn early for a click
+        self.deadline = time.perf_counter()
+        pacer.begin_level()
+        if metrics.enabled:
+            metrics.begin_level(game, level_str, mode)
+
+    def step(self):
+        """Run one frame; returns the level's result once it ends, else None."""
+        global current_stage
+        game = self.game
+        sim = self.sim
+        loop_start = time.perf_counter()
+        current_stage = 'events'
+        if watchdog.enabled:
+            watchdog.begin_frame(game.frame_count)
+        if memory.enabled:
+            memory.begin_frame(game.frame_count)
+        pause_reason = None
+        events = self.pending + pygame.event.get()
+        self.pending = []
+        for event in events:
+            if event.type == pygame.QUIT:
+                return "quit"
+            if event.type == pygame.KEYDOWN:
+                sim.key(game, event.key)
+                if event.key == pygame.K_ESCAPE:
+                    return "menu"          # Press ESC to return to main menu
+                if event.key == PAUSE_KEY:
+                    pause_reason = "key"
+                if event.key == FAST_FORWARD_KEY:
+                    sim.cycle_speed()
+                if event.key == FrameProfiler.TOGGLE_KEY:
+                    profiler.toggle()
+                if event.key == FrameCapture.HOTKEY and capture:
+                    capture.start(game.frame_count)
+            if event.type in FOCUS_LOST_EVENTS:
+                pause_reason = pause_reason or "focus"
+            elif event.type in FOCUS_GAINED_EVENTS and pause_reason == "focus":
+                pause_reason = None
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if latency.enabled:
+                    latency.click()
+                sim.click(game, event_pos(event), event.button)
+                if game.win:
+                    return next_level(self.level_str)
+                if game.game_over:
+                    return "menu"
+        if latency.enabled:
+            latency.polled()
+
+        if profiler.enabled or tracer.enabled:
+            record_span('events', loop_start)
+
+        if pause_reason:
+            watchdog.cancel_frame()
+            sim.pause()
+            result = pause_game(pause_reason)
+            if result:
+                return result
+            sim.resume()
+            self.deadline = time.perf_counter()
+            self.tick_due = True
+
+        frame_start = time.perf_counter()
+        alpha = sim.advance(game, self.tick_due)
+        backend.draw_game(game, alpha)
+        if sim.time_scale != 1:
+            draw_time_scale(sim.time_scale)
+        if profiler.enabled:
+            profiler.draw(game)
+        with span('flip'):
+            backend.present()
+        if latency.enabled:
+            latency.presented()
+        if profiler.enabled:
+            profiler.end_frame()
+        if tracer.enabled:
+            record_span('frame', loop_start, {'frame': game.frame_count})
+            tracer.maybe_flush()
+        if capture:
+            if capture.active:
+                saved = capture.end_frame(self.level_str, game.frame_count)
+                if saved:
+                    print("profile written to %s.pstats" % saved)
+            elif self.capture_start is not None and game.frame_count >= self.capture_start:
+                capture.start(game.frame_count)
+                self.capture_start = None
+        if watchdog.enabled:
+            watchdog.end_frame(game)
+        if memory.enabled:
+            memory.end_frame()
+        if autosave.enabled and self.autosaves:
+            autosave.maybe_save(game)
+        journal.maybe_flush()
+        work_ms = (time.perf_counter() - frame_start) * 1000
+        if governor:
+            governor.frame(work_ms)
+        if metrics.enabled:
+            metrics.frame(work_ms)
+        return None
+
+    def next_deadline(self):
+        """When the next frame is due: a steady cadence that never tries to
+        catch up on missed frames. A frame drawn early for a click keeps
+        the deadline it cut short."""
+        if self.tick_due:
+            self.deadline = max(self.deadline + self.sim.frame_period, time.perf_counter())
+        return self.deadline
+
+    def wait(self):
+        """Wait for the next frame in the pacer, or in event.wait() with LOW_LATENCY."""
+        if LOW_LATENCY:
+            self.pending, self.tick_due = wait_for_input(self.next_deadline())
+            if self.tick_due:
+                pacer.mark(RENDER_FPS)
+        else:
+            pacer.wait(RENDER_FPS)
+
+def run_game(level_str, mode="adventure", game=None):
+    """Run a level and return the next level string or 'menu'.
+
+    `game` is a resumed Game to continue instead of starting the level.
+
+    When RENDER_FPS equals SIM_FPS every frame runs exactly one update. At
+    any other render rate the simulation keeps its fixed 60 Hz step through
+    an accumulator, and frames draw moving entities interpolated between
+    the last two ticks.
+
+    In LOW_LATENCY mode the loop sleeps in pygame.event.wait() instead of
+    clock.tick(), so input is polled right up to the next frame. A click
+    wakes it at once: the click is applied and an extra frame is drawn and
+    flipped without advancing the simulation, then the loop goes back to
+    sleeping until the frame that was due.
+
+    FAST_FORWARD_KEY cycles through TIME_SCALES. At N x a frame runs N
+    times the ticks it would at 1x and draws only the last of them (not
+    interpolated); at 'max' it runs ticks for SIM_BUDGET of a frame. Ticks
+    that do not fit in that budget are dropped rather than owed, so the
+    frame rate holds and the game runs slower than asked instead.
+    """
+    if game is None:
+        game = Game(level_str, mode)
+    frames = LevelFrames(level_str, mode, game, SimulationClock(TIME_SCALE))
+    while True:
+        result = frames.step()
+        if result:
+            return result
+        frames.wait()
+
+def run_headless(level_str, mode, ticks, seed=None):
+    """Simulate `ticks` updates of a level without drawing and return the Game."""
+    if seed is not None:
+        random.seed(seed)
+    game = Game(level_str, mode)
+    memory.begin_level(level_str)
+    try:
+        for _ in range(ticks):
+            if capture and not capture.active and game.frame_count == PROFILE_START:
+                capture.start(game.frame_count)
+            if memory.enabled:
+                memory.begin_frame(game.frame_count)
+            game.update()
+            if memory.enabled:
+                memory.end_frame()
+            if capture and capture.active:
+                saved = capture.end_frame(level_str, game.frame_count)
+                if saved:
+                    print("profile written to %s.pstats" % saved)
+    finally:
+        memory.end_level()
+    if capture:
+        saved = capture.end_level(level_str, game.frame_count)
+        if saved:
+            print("profile written to %s.pstats" % saved)
+    return game
+
+# ==========================================
+# SIMULATION PROCESS (--sim-process)
+# ==========================================
+# Game.update runs in a worker process at a fixed SIM_FPS while this process
+# only draws. Every tick the worker writes the entities into one of two
+# buffers in a multiprocessing.shared_memory block and then flips the
+# front index. Each frame the render process copies the used part of the
+# front buffer out of the mapping (a tolist() per region, nothing is
+# pickled or piped) and fills a render-only Game from the copy. The copy
+# is what makes a read checkable: the worker may start rewriting that
+# buffer at any time, so the generation is compared after copying, and
+# only then is the data used. Clicks, keys, pause and speed changes go
+# the other way over a one-way Pipe.
+SIM_PROCESS = False
+
+class SharedGameState:
+    """Double-buffered entity state in a shared memory block of doubles.
+
+    Slot 0 is the index of the front buffer. Each buffer starts with a
+    generation counter that is odd while the worker writes it, so a reader
+    that raced two publishes sees the counter change and tries again.
+    Entity regions have fixed capacities; a board beyond them is drawn
+    without the excess, the simulation itself is not limited.
+    """
+    HEADER = 11                  # generation, stamp, frame, sun, earned, selected, over, win, counts
+    PLANT_FIELDS = 6             # type + 1 (0 = empty), health, max_health, armed, sleeping, chewing
+    ZOMBIE_FIELDS = 10           # type, x, y, prev_x, prev_y, health, max_health, angry, has_pole, slowed
+    MOVER_FIELDS = 5             # projectiles: type, x, y, prev_x, prev_y; suns: value, x, y, prev_x, prev_y
+    MAX_ZOMBIES = 256
+    MAX_PROJECTILES = 1024
+    MAX_SUNS = 256
+    READ_TRIES = 3
+
+    def __init__(self, name=None):
+        """Create the block, or attach to the one called `name`. Layout
+        depends on the grid size, so apply the profile first."""
+        from multiprocessing import shared_memory
+        cells = GRID_ROWS * GRID_COLS
+        self.mowers = self.HEADER
+        self.cooldowns = self.mowers + GRID_ROWS
+        self.plants = self.cooldowns + len(PLANT_TYPES)
+        self.zombies = self.plants + cells * self.PLANT_FIELDS
+        self.projectiles = self.zombies + self.MAX_ZOMBIES * self.ZOMBIE_FIELDS
+        self.suns = self.projectiles + self.MAX_PROJECTILES * self.MOVER_FIELDS
+        self.size = self.suns + self.MAX_SUNS * self.MOVER_FIELDS
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None,
+                                              size=8 * (1 + 2 * self.size))
+        self.slots = self.shm.buf.cast('d')
+        self.pools = {}
+
+    def close(self, unlink=False):
+        self.slots.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+    def publish(self, game):
+        """Write `game` into the back buffer and make it the front one."""
+        slots = self.slots
+        back = 1 - int(slots[0])
+        base = 1 + back * self.size
+        generation = slots[base] + 1
+        slots[base] = generation
+        zombies = game.zombies[:self.MAX_ZOMBIES]
+        projectiles = game.projectiles[:self.MAX_PROJECTILES]
+        suns = game.suns[:self.MAX_SUNS]
+        selected = PLANT_TYPES.index(game.selected_plant) if game.selected_plant else -1
+        values = [time.perf_counter(), game.frame_count, game.sun_points, game.sun_earned, selected,
+                  game.game_over, game.win, len(zombies), len(projectiles), len(suns)]
+        mowers = game.lawn_mowers
+        values += [-1] * GRID_ROWS if mowers is None else mowers
+        cooldowns = game.plant_cooldowns
+        values += [-1] * len(PLANT_TYPES) if cooldowns is None else [cooldowns[p] for p in PLANT_TYPES]
+        for row in game.grid:
+            for plant in row:
+                if plant is None:
+                    values += (0, 0, 0, 0, 0, 0)
+                else:
+                    values += (PLANT_TYPES.index(plant.type) + 1, plant.health, plant.max_health,
+                               plant.is_armed, plant.sleeping, plant.chewing > 0)
+        slots[base + 1:base + self.zombies] = array('d', values)
+        values = []
+        for z in zombies:
+            values += (ZOMBIE_TYPES.index(z.type), z.x, z.y, getattr(z, 'prev_x', z.x),
+                       getattr(z, 'prev_y', z.y), z.health, z.max_health, z.angry, z.has_pole, z.slowed > 0)
+        self.write(base + self.zombies, values)
+        values = []
+        for p in projectiles:
+            values += (PROJECTILE_TYPES.index(p.type), p.x, p.y,
+                       getattr(p, 'prev_x', p.x), getattr(p, 'prev_y', p.y))
+        self.write(base + self.projectiles, values)
+        values = []
+        for s in suns:
+            values += (s.value, s.x, s.y, getattr(s, 'prev_x', s.x), getattr(s, 'prev_y', s.y))
+        self.write(base + self.suns, values)
+        slots[base] = generation + 1
+        slots[0] = back
+
+    def write(self, start, values):
+        if values:
+            self.slots[start:start + len(values)] = array('d', values)
+
+    def read(self, game):
+        """Copy the front buffer into `game`, a render-only Game.
+
+        Returns the perf_counter() time the worker published it, or None
+        when no consistent buffer could be read (the previous state stays).
+        """
+        slots = self.slots
+        for _ in range(self.READ_TRIES):
+            base = 1 + int(slots[0]) * self.size
+            generation = slots[base]
+            if generation % 2:
+                continue
+            header = slots[base + 1:base + self.plants].tolist()
+            zombie_count, projectile_count, sun_count = (int(n) for n in header[7:10])
+            start = base + self.zombies
+            zombies = slots[start:start + zombie_count * self.ZOMBIE_FIELDS].tolist()
+            start = base + self.projectiles
+            projectiles = slots[start:start + projectile_count * self.MOVER_FIELDS].tolist()
+            start = base + self.suns
+            suns = slots[start:start + sun_count * self.MOVER_FIELDS].tolist()
+            plants = slots[base + self.plants:base + self.zombies].tolist()
+            if slots[base] == generation:
+                self.apply(game, header, plants, zombies, projectiles, suns)
+                return header[0]
+        return None
+
+    def mirror(self, cls, kind, index):
+        """The index'th reusable render-only `cls` object of its kind."""
+        pool = self.pools.setdefault(kind, [])
+        while len(pool) <= index:
+            entity = cls.__new__(cls)
+            entity.rect = pygame.Rect(0, 0, 0, 0)
+            pool.append(entity)
+        return pool[index]
+
+    def apply(self, game, header, plants, zombies, projectiles, suns):
+        (_, game.frame_count, game.sun_points, game.sun_earned, selected,
+         over, win) = (int(v) for v in header[:7])
+        game.selected_plant = PLANT_TYPES[selected] if selected >= 0 else None
+        game.game_over, game.win = bool(over), bool(win)
+        mowers = header[self.mowers - 1:self.cooldowns - 1]
+        if game.lawn_mowers is not None:
+            game.lawn_mowers = [bool(m) for m in mowers]
+        if game.plant_cooldowns is not None:
+            cooldowns = header[self.cooldowns - 1:]
+            game.plant_cooldowns = {p: int(f) for p, f in zip(PLANT_TYPES, cooldowns)}
+        size = CELL_SIZE - PLANT_MARGIN
+        fields = self.PLANT_FIELDS
+        for cell in range(GRID_ROWS * GRID_COLS):
+            kind, health, max_health, armed, sleeping, chewing = plants[cell * fields:(cell + 1) * fields]
+            row, col = divmod(cell, GRID_COLS)
+            if not kind:
+                game.grid[row][col] = None
+                continue
+            plant = self.mirror(Plant, 'plant', cell)
+            plant.type = PLANT_TYPES[int(kind) - 1]
+            plant.x, plant.y = col*CELL_SIZE+PLANT_INSET, row*CELL_SIZE+PLANT_INSET
+            plant.rect.update(plant.x, plant.y, size, size)
+            plant.health, plant.max_health = health, max_health
+            plant.is_armed, plant.sleeping, plant.chewing = bool(armed), bool(sleeping), int(chewing)
+            game.grid[row][col] = plant
+        size = CELL_SIZE - ZOMBIE_MARGIN
+        game.zombies = []
+        for i in range(0, len(zombies), self.ZOMBIE_FIELDS):
+            kind, x, y, prev_x, prev_y, health, max_health, angry, pole, slowed = zombies[i:i + self.ZOMBIE_FIELDS]
+            z = self.mirror(Zombie, 'zombie', i // self.ZOMBIE_FIELDS)
+            z.type = ZOMBIE_TYPES[int(kind)]
+            z.x, z.y, z.prev_x, z.prev_y = x, y, prev_x, prev_y
+            z.rect.update(x, y, size, size)
+            z.health, z.max_health = health, max_health
+            z.angry, z.has_pole, z.slowed = bool(angry), bool(pole), int(slowed)
+            game.zombies.append(z)
+        game.projectiles = []
+        for i in range(0, len(projectiles), self.MOVER_FIELDS):
+            kind, x, y, prev_x, prev_y = projectiles[i:i + self.MOVER_FIELDS]
+            p = self.mirror(Projectile, 'projectile', i // self.MOVER_FIELDS)
+            p.type = PROJECTILE_TYPES[int(kind)]
+            p.x, p.y, p.prev_x, p.prev_y = x, y, prev_x, prev_y
+            game.projectiles.append(p)
+        game.suns = []
+        for i in range(0, len(suns), self.MOVER_FIELDS):
+            value, x, y, prev_x, prev_y = suns[i:i + self.MOVER_FIELDS]
+            s = self.mirror(Sun, 'sun', i // self.MOVER_FIELDS)
+            s.value = int(value)
+            s.x, s.y, s.prev_x, s.prev_y = x, y, prev_x, prev_y
+            game.suns.append(s)
+
+def simulation_worker(profile, level_str, mode, shm_name, commands, time_scale, saved=None):
+    """Body of the simulation process: tick at SIM_FPS and publish every tick.
+
+    Small delays are caught up so the tick rate stays exact; a stall longer
+    than MAX_FRAME_TIME is dropped instead. `saved` is encode_game() data
+    of a resumed level. The worker holds the real board, so it also
+    autosaves, and saves once more when told to quit mid-level, and keeps
+    the input journal of the clicks it applies.
+    """
+    import multiprocessing.connection
+    apply_profile(profile)
+    # Whatever monitors the parent had running stay with the parent.
+    profiler.enabled = tracer.enabled = watchdog.enabled = memory.enabled = False
+    gc.callbacks.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    state = SharedGameState(shm_name)
+    game = decode_game(saved) if saved else Game(level_str, mode)
+    autosave.begin_level()
+    journal.begin(game)
+    state.publish(game)
+    step = 1.0 / SIM_FPS
+    paused = False
+    next_tick = time.perf_counter() + step
+    # The forked worker holds the sending end of the pipe too, so a parent
+    # that dies without sending 'quit' only shows up as its sentinel.
+    waitables = [commands, multiprocessing.parent_process().sentinel]
+    try:
+        while True:
+            timeout = None if paused else max(0.0, next_tick - time.perf_counter())
+            ready = multiprocessing.connection.wait(waitables, timeout)
+            if waitables[1] in ready:
+                return                  # keeps the journal for recovery
+            if ready:
+                command, arg = commands.recv()
+                if command == 'quit':
+                    if autosave.enabled and not (game.game_over or game.win):
+                        autosave.save(game)
+                    return
+                if command == 'click':
+                    pos, button = arg
+                    journal.click(game, pos, button)
+                    apply_click(game, pos)
+                elif command == 'key':
+                    journal.key(game, arg)
+                elif command == 'speed':
+                    time_scale = arg
+                elif command == 'pause':
+                    paused = arg
+                    next_tick = time.perf_counter() + step
+                state.publish(game)
+                continue
+            now = time.perf_counter()
+            game.remember_positions()
+            if time_scale == 1:
+                game.update()
+            else:
+                fast_forward(game, time_scale or None, now + SIM_BUDGET * step)
+            state.publish(game)
+            if autosave.enabled:
+                autosave.maybe_save(game)
+            journal.maybe_flush()
+            next_tick += step
+            if next_tick < now - MAX_FRAME_TIME:
+                next_tick = now
+    finally:
+        state.close()
+        writer.stop()
+        journal.stop()
+
+class WorkerSimulation:
+    """SimulationClock's part in LevelFrames when Game.update runs in the
+    worker: inputs become commands, and advance() reads the worker's latest
+    board into `game`, interpolated by how long ago it was published."""
+
+    def __init__(self, state, commands, worker, time_scale):
+        self.state = state
+        self.commands = commands
+        self.worker = worker
+        self.time_scale = time_scale
+        self.step = 1.0 / SIM_FPS
+        self.frame_period = 1.0 / RENDER_FPS if RENDER_FPS else 0.0
+        self.published = None
+
+    def cycle_speed(self):
+        self.time_scale = next_time_scale(self.time_scale)
+        self.commands.send(('speed', self.time_scale))
+
+    def click(self, game, pos, button):
+        self.commands.send(('click', (pos, button)))
+
+    def key(self, game, key):
+        self.commands.send(('key', key))
+
+    def pause(self):
+        self.commands.send(('pause', True))
+
+    def resume(self):
+        self.commands.send(('pause', False))
+
+    def advance(self, game, tick_due=True):
+        now = time.perf_counter()
+        with span('read_state'):
+            stamp = self.state.read(game)
+        if stamp is not None:
+            self.published = stamp
+        if self.time_scale != 1 or self.published is None:
+            return 1.0
+        return min(1.0, (now - self.published) / self.step)
+
+def worker_exited(exitcode):
+    """The simulation process died mid-level: log it, and with saving on
+    rebuild its board from the input journal it kept and autosave that, so
+    the level resumes from the menu. Returns "menu"."""
+    log.error("simulation process exited with code %s, returning to the menu", exitcode)
+    found = journal.load() if journal.enabled and autosave.enabled else None
+    if found is None:
+        return "menu"
+    try:
+        game = journal.replay(*found)
+    except (ValueError, struct.error) as exc:
+        log.warning("could not replay input journal %s: %s", journal.path(), exc)
+        return "menu"
+    if not (game.game_over or game.win):
+        autosave.save(game)
+        log.info("saved %s %s at tick %d to resume", game.level_str, game.mode, game.frame_count)
+    return "menu"
+
+def run_split_game(level_str, mode="adventure", game=None):
+    """run_game with Game.update in a worker process; see SIM_PROCESS.
+
+    Frames are drawn at RENDER_FPS, interpolated by how long ago the worker
+    published its last tick. With LOW_LATENCY a click is sent at once but
+    shows from the first board the worker publishes after applying it.
+    """
+    import multiprocessing
+    # Forking hands the worker this module with the profile already loaded,
+    # also when the game was started through one of the launcher scripts.
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    state = SharedGameState()
+    receiver, commands = context.Pipe(duplex=False)
+    saved = encode_game(game) if game else None
+    worker = context.Process(target=simulation_worker, name='pvz-simulation', daemon=True,
+                             args=(PROFILE, level_str, mode, state.shm.name, receiver, TIME_SCALE, saved))
+    worker.start()
+    if game is None:
+        game = Game(level_str, mode)
+    sim = WorkerSimulation(state, commands, worker, TIME_SCALE)
+    # `game` mirrors the worker's board, so the worker is the one that saves it.
+    frames = LevelFrames(level_str, mode, game, sim, autosaves=False)
+    try:
+        while True:
+            if not worker.is_alive():
+                return worker_exited(worker.exitcode)
+            result = frames.step()
+            if result:
+                return result
+            frames.wait()
+    finally:
+        if worker.is_alive():
+            commands.send(('quit', None))
+            worker.join(1.0)
+        if worker.is_alive():
+            worker.terminate()
+        state.close(unlink=True)
+
+# ==========================================
+# ASYNCIO LOOP (--asyncio)
+# ==========================================
+# The level loop as one task on an asyncio event loop: it pumps pygame
+# events, steps and draws a frame, then awaits the next frame's deadline
+# instead of sleeping in the pacer. Everything that may touch a disk or a
+# socket runs as another task of the level (AsyncLevel.tasks) and hands
+# its blocking part to the thread that owns the file (the save writer, the
+# trace writer), so slow I/O costs that thread rather than a frame.
+ASYNC_LOOP = False
+
+class TaskStats:
+    """Per-task latency accounting for the asyncio loop.
+
+    Every time a task runs it reports its lag, how much later than asked it
+    woke up (what the other tasks cost it), and its run time from waking to
+    finishing.
+    """
+    WINDOW = 600
+
+    def __init__(self):
+        self.samples = {}        # task name -> deque of (lag, run) in ms
+
+    def reset(self):
+        self.samples = {}
+
+    def record(self, name, lag, run):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.WINDOW)
+        samples.append((lag * 1000, run * 1000))
+
+    def quantiles(self, name):
+        """p50 and p99 lag, p50 and p99 run time, and the longest run, in ms."""
+        samples = self.samples[name]
+        last = len(samples) - 1
+        lags = sorted(lag for lag, _ in samples)
+        runs = sorted(run for _, run in samples)
+        return (lags[last // 2], lags[last * 99 // 100], runs[last // 2], runs[last * 99 // 100], runs[last])
+
+    def snapshot(self):
+        return {name: self.quantiles(name) for name in self.samples}
+
+    def summary(self):
+        return "; ".join("%s lag p50 %.2f / p99 %.2f ms, run p50 %.2f / p99 %.2f / max %.2f ms"
+                         % ((name,) + values) for name, values in sorted(self.snapshot().items()))
+
+task_stats = TaskStats()
+
+class AsyncLevel:
+    """One level on an asyncio event loop; run() returns what run_game would."""
+    TELEMETRY_INTERVAL = 1.0
+    PREFETCH_INTERVAL = 0.5
+    PREFETCH_SUN_AHEAD = 500     # "Sun: N" counters rendered ahead of the current sun
+    INPUT_POLL = 0.001           # seconds between click checks with LOW_LATENCY
+
+    def __init__(self, level_str, mode, game=None):
+        self.level_str = level_str
+        self.mode = mode
+        self.game = game or Game(level_str, mode)
+
+    def tasks(self):
+        """The level's background tasks as (name, period in seconds, coroutine function)."""
+        tasks = [('telemetry', self.TELEMETRY_INTERVAL, self.flush_telemetry),
+                 ('prefetch', self.PREFETCH_INTERVAL, self.prefetch)]
+        if autosave.enabled:
+            tasks.append(('autosave', Autosaver.INTERVAL, self.autosave))
+        return tasks
+
+    async def run(self):
+        import asyncio
+        task_stats.reset()
+        background = [asyncio.create_task(self.periodic(name, period, job), name=name)
+                      for name, period, job in self.tasks()]
+        try:
+            return await self.frames()
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+
+    async def periodic(self, name, period, job):
+        """Run `job` every `period` seconds; a failing job is logged once
+        and keeps its schedule instead of silently ending the task."""
+        import asyncio
+        due = time.perf_counter() + period
+        failed = False
+        while True:
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            start = time.perf_counter()
+            try:
+                await job()
+            except Exception:
+                if not failed:
+                    log.exception("%s task of level %s failed", name, self.level_str)
+                failed = True
+            task_stats.record(name, start - due, time.perf_counter() - start)
+            due = max(due + period, time.perf_counter())
+
+    async def flush_telemetry(self):
+        """Hand the trace buffer to its writer and refresh the metrics snapshot."""
+        if tracer.enabled:
+            tracer.flush()
+        if metrics.enabled:
+            metrics.publish()
+
+    async def autosave(self):
+        """Encode the board here, between frames; the save writer thread
+        compresses and writes it, newest save first as for Autosaver."""
+        game = self.game
+        if not (game.game_over or game.win):
+            autosave.save(game)
+
+    async def prefetch(self):
+        """Render the sidebar texts the level is about to need, between frames.
+
+        On the loop's own (main) thread, as SDL_ttf wants, for at most
+        Warmup.SLICE_MS per run.
+        """
+        game = self.game
+        low = game.sun_points // 25 * 25
+        wanted = [(font, f"Sun: {sun}") for sun in range(low, low + self.PREFETCH_SUN_AHEAD + 1, 25)]
+        wanted.append((font, f"Lvl: {game.level_str}"))
+        end = time.perf_counter() + Warmup.SLICE_MS / 1000
+        for cached, text in wanted:
+            if len(cached.surfaces) >= CachedFont.MAX_ENTRIES or time.perf_counter() >= end:
+                break
+            cached.render(text, True, BLACK)
+
+    async def frames(self):
+        """The frame task: LevelFrames.step(), then await the next frame's deadline."""
+        frames = LevelFrames(self.level_str, self.mode, self.game, SimulationClock(TIME_SCALE),
+                             autosaves=False)
+        lag = 0.0
+        while True:
+            loop_start = time.perf_counter()
+            result = frames.step()
+            if result:
+                return result
+            task_stats.record('frame', lag, time.perf_counter() - loop_start)
+            deadline = frames.next_deadline()
+            await self.wait_until(frames, deadline)
+            if frames.tick_due:
+                lag = max(0.0, time.perf_counter() - deadline)
+                pacer.mark(RENDER_FPS)
+
+    async def wait_until(self, frames, deadline):
+        """Await `deadline`. With LOW_LATENCY, poll for a click every
+        INPUT_POLL seconds meanwhile and end the wait early for one (the
+        event loop must not block in event.wait(), its tasks run now)."""
+        import asyncio
+        frames.tick_due = True
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            if LOW_LATENCY:
+                if latency.enabled:
+                    latency.polled()
+                if pygame.event.peek(pygame.MOUSEBUTTONDOWN):
+                    frames.tick_due = False
+                    return
+                remaining = min(remaining, self.INPUT_POLL)
+            await asyncio.sleep(remaining)
+
+def run_level(level_str, mode, game=None):
+    """Run a level inside a trace span and flush the trace between levels.
+
+    With saving on, a level that was left unfinished is resumed from its
+    autosave, and leaving one unfinished saves it. A finished level's
+    autosave is removed and a won adventure level moves progress on.
+    `game` is a board restored from the input journal, played instead.
+    """
+    tracer.instant('level_start', {'level': level_str, 'mode': mode})
+    if game is None and autosave.enabled:
+        game = autosave.resume(level_str, mode)
+    if game is None:
+        game = Game(level_str, mode)
+    autosave.begin_level()
+    if not SIM_PROCESS:
+        journal.begin(game)
+    memory.begin_level(level_str)
+    try:
+        with span('level ' + level_str, {'mode': mode}):
+            if ASYNC_LOOP:
+                import asyncio
+                result = asyncio.run(AsyncLevel(level_str, mode, game).run())
+            else:
+                # run_split_game draws `game` as a mirror of the worker's
+                # board, so the worker is the one that saves it.
+                result = (run_split_game if SIM_PROCESS else run_game)(level_str, mode, game)
+    finally:
+        memory.end_level()
+    if autosave.enabled:
+        if game.game_over or game.win:
+            autosave.discard(mode)
+        elif not SIM_PROCESS:
+            autosave.save(game)
+    if mode == "adventure" and game.win:
+        progress.reached(next_level(level_str))
+    if capture:
+        saved = capture.end_level(level_str, game.frame_count)
+        if saved:
+            print("profile written to %s.pstats" % saved)
+    journal.end()
+    if latency.enabled:
+        print("level %s: %s" % (level_str, latency.summary()))
+    if PACING_REPORT:
+        print("level %s: %s" % (level_str, pacer.level_summary(RENDER_FPS)))
+        if ASYNC_LOOP:
+            print("level %s: tasks: %s" % (level_str, task_stats.summary()))
+    if tracer.enabled:
+        tracer.flush()
+    return result
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AC'S PVZ 1.X")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="classic",
+                        help="game variant: screen size, rules and effects (lowspec for cheap hardware)")
+    parser.add_argument("--renderer", choices=("software", "sdl2"), default="software",
+                        help="draw with software surfaces or the SDL2 Renderer/Texture API")
+    parser.add_argument("--render-driver", default=None,
+                        help="SDL render driver for --renderer sdl2 (e.g. software, opengl)")
+    parser.add_argument("--window", type=parse_size, default=None,
+                        help="window size as WIDTHxHEIGHT, e.g. 600x400 (default: the profile's)")
+    parser.add_argument("--render-scale", type=parse_render_scale, default=None,
+                        help="internal render resolution relative to the profile's screen size")
+    parser.add_argument("--fps", type=int, default=None,
+                        help="frames drawn per second, e.g. 120 or 144 (0 = uncapped); "
+                             "the simulation stays at %d Hz" % SIM_FPS)
+    parser.add_argument("--speed", type=parse_time_scale, default=None, metavar="{1,2,4,8,max}",
+                        help="fast-forward every level from the start (F cycles the speed in game)")
+    loops = parser.add_mutually_exclusive_group()
+    loops.add_argument("--sim-process", action="store_true",
+                       help="run the simulation in a worker process at %d Hz and only draw here" % SIM_FPS)
+    loops.add_argument("--asyncio", action="store_true",
+                       help="run levels on an asyncio event loop, with I/O in background tasks")
+    parser.add_argument("--save-dir", default=SAVE_DIR,
+                        help="where progress, settings and the mid-level autosave are kept")
+    parser.add_argument("--no-save", action="store_true",
+                        help="neither load nor write progress, autosaves and the input journal")
+    parser.add_argument("--save-settings", action="store_true",
+                        help="also use the --fps, --render-scale, --quality and --speed given "
+                             "here in later runs (otherwise they apply to this run only)")
+    parser.add_argument("--pacing", choices=FramePacer.STRATEGIES, default="tick",
+                        help="how to wait for the next frame: clock.tick, tick_busy_loop, "
+                             "sleep-then-spin or display vsync")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long startup took up to the first menu frame")
+    parser.add_argument("--pacing-report", action="store_true",
+                        help="print a frame interval histogram, jitter and dropped frames per level")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome/Perfetto trace of frames and stages to FILE")
+    parser.add_argument("--hitch-ms", type=float, default=0, metavar="MS",
+                        help="log sampled stacks of frames slower than MS milliseconds, e.g. 25")
+    parser.add_argument("--hitch-log", default="pvz_hitches.log",
+                        help="rotating log file for --hitch-ms")
+    parser.add_argument("--log-file", metavar="FILE",
+                        help="append warnings and errors to FILE instead of stderr")
+    parser.add_argument("--mem-report", metavar="FILE",
+                        help="trace allocations and GC pauses per frame, appending a report per level to FILE")
+    parser.add_argument("--gc-freeze", action="store_true",
+                        help="gc.freeze() everything alive after level load (steady-state mode)")
+    parser.add_argument("--latency", action="store_true",
+                        help="measure click-to-flip latency (shown in the F3 overlay, summarised per level)")
+    parser.add_argument("--low-latency", action="store_true",
+                        help="poll input while waiting for the next frame and flip clicks immediately")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file", metavar="FILE",
+                        help="rewrite FILE with Prometheus metrics every second")
+    parser.add_argument("--profile-frames", type=int, default=0, metavar="N",
+                        help="enable cProfile captures of N frames (start one with F9)")
+    parser.add_argument("--profile-start", type=int, default=None, metavar="FRAME",
+                        help="also start a capture automatically when a level reaches FRAME")
+    parser.add_argument("--profile-dir", default=".",
+                        help="where capture .pstats/.txt files are written")
+    parser.add_argument("--headless", type=int, default=0, metavar="TICKS",
+                        help="simulate TICKS updates of --level without drawing, then exit")
+    parser.add_argument("--level", default="1-1", help="level for --headless")
+    parser.add_argument("--mode", default="adventure", help="game mode for --headless")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for --headless")
+    parser.add_argument("--quality", type=parse_quality, default=None,
+                        help="'auto' to adapt effects to frame time, or a fixed level "
+                             "0 (all effects) to %d (cheapest)" % (len(QUALITY_LEVELS) - 1))
+    return parser.parse_args(argv)
+
+def parse_size(text):
+    try:
+        w, h = map(int, text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected WIDTHxHEIGHT, got %r" % text)
+    return (w, h)
+
+def parse_render_scale(text):
+    try:
+        scale = float(text)
+    except ValueError:
+        scale = None
+    if scale is None or not MIN_RENDER_SCALE <= scale <= MAX_RENDER_SCALE:
+        raise argparse.ArgumentTypeError("expected a scale from %g to %g, got %r"
+                                         % (MIN_RENDER_SCALE, MAX_RENDER_SCALE, text))
+    return scale
+
+def parse_quality(text):
+    if text == "auto":
+        return text
+    if text.isdigit() and int(text) < len(QUALITY_LEVELS):
+        return int(text)
+    raise argparse.ArgumentTypeError("expected 'auto' or 0-%d, got %r" % (len(QUALITY_LEVELS) - 1, text))
+
+def parse_time_scale(text):
+    scale = 0 if text == "max" else int(text) if text.isdigit() else None
+    if scale not in TIME_SCALES:
+        raise argparse.ArgumentTypeError("expected 1, 2, 4, 8 or max, got %r" % text)
+    return scale
+
+def first_set(*values):
+    """The first of `values` that is not None."""
+    return next(value for value in values if value is not None)
+
+def main(argv=None):
+    global governor, capture, RENDER_FPS, PROFILE_START, LOW_LATENCY, PACING_REPORT, STARTUP_REPORT
+    global TIME_SCALE, SIM_PROCESS, ASYNC_LOOP, SAVE_DIR
+    startup.mark('imported')
+    args = parse_args(argv)
+    logging.basicConfig(filename=args.log_file, format=LOG_FORMAT)
+    log.setLevel(logging.INFO)
+    levels()
+    apply_profile(args.profile)
+    profile = PROFILES[args.profile]
+    SAVE_DIR = args.save_dir
+    if not (args.no_save or args.headless):
+        autosave.enabled = progress.enabled = journal.enabled = True
+        progress.load()
+    # Options given on the command line win over the saved settings, which
+    # win over the profile's defaults. Only --save-settings saves them.
+    saved = progress.settings
+    RENDER_FPS = first_set(args.fps, saved.get('fps'), profile['render_fps'])
+    render_scale = first_set(args.render_scale, saved.get('render_scale'), profile['render_scale'])
+    quality_level = first_set(args.quality, saved.get('quality'), profile['quality'])
+    TIME_SCALE = first_set(args.speed, saved.get('speed'), 1)
+    if args.save_settings:
+        given = {'fps': args.fps, 'render_scale': args.render_scale, 'quality': args.quality,
+                 'speed': args.speed}
+        progress.remember(**{name: value for name, value in given.items() if value is not None})
+    LOW_LATENCY = args.low_latency
+    SIM_PROCESS = args.sim_process
+    ASYNC_LOOP = args.asyncio
+    PACING_REPORT = args.pacing_report
+    STARTUP_REPORT = args.startup_report
+    pacer.strategy = args.pacing
+    latency.enabled = args.latency
+    memory.freeze = args.gc_freeze
+    if args.mem_report:
+        memory.start(args.mem_report)
+    if args.profile_frames:
+        capture = FrameCapture(args.profile_frames, args.profile_dir)
+        PROFILE_START = args.profile_start
+        if args.headless and PROFILE_START is None:
+            PROFILE_START = 0
+    if args.headless:
+        start = time.perf_counter()
+        game = run_headless(args.level, args.mode, args.headless, args.seed)
+        elapsed = time.perf_counter() - start
+        print("%d ticks of %s in %.2fs (%.0f ticks/s), %d zombies, %d projectiles, %d suns"
+              % (game.frame_count, args.level, elapsed, game.frame_count / elapsed,
+                 len(game.zombies), len(game.projectiles), len(game.suns)))
+        memory.stop()
+        return
+    init_display(args.window)
+    startup.mark('display')
+    init_backend(args.renderer, args.render_driver, vsync=args.pacing == "vsync")
+    startup.mark('renderer')
+    if render_scale != RENDER_SCALE:
+        set_render_scale(render_scale)
+    if quality_level == "auto":
+        governor = QualityGovernor(fps=RENDER_FPS or SIM_FPS, base_scale=render_scale)
+    else:
+        apply_quality(quality_level, render_scale)
+    if args.trace:
+        tracer.start(args.trace)
+    if args.hitch_ms:
+        watchdog.start(args.hitch_ms, args.hitch_log)
+    if args.metrics_port is not None or args.metrics_file:
+        metrics.start(args.metrics_port, args.metrics_file)
+    try:
+        play()
+    finally:
+        writer.stop()
+        journal.stop()
+        memory.stop()
+        metrics.stop()
+        watchdog.stop()
+        tracer.stop()
+
+def play():
+    """The menu / level state machine."""
     state = "menu"
-    current_level = "1-1"
+    current_level = progress.level
+    game = recover_crashed_level()
+    if game == "quit":
+        return
+    if game is not None:
+        state = run_level(game.level_str, game.mode, game)
+        if state and '-' in state:
+            if game.mode == "adventure":
+                current_level = state
+            state = "adventure" if game.mode == "adventure" else "menu"
 
     while state != "quit":
         if state == "menu":
-            state = main_menu()
+            with span('main_menu'):
+                state = main_menu()
         elif state == "adventure":
-            state = run_game(current_level, "adventure")
+            state = run_level(current_level, "adventure")
             if state and '-' in state:
                 current_level = state
                 state = "adventure"   # continue adventure
         elif state == "mini":
-            state = run_game("1-1", "mini")
+            state = run_level("1-1", "mini")
         elif state == "survival":
-            state = run_game("1-1", "survival")
+            state = run_level("1-1", "survival")
         elif state == "zen":
-            state = run_game("1-1", "zen")
+            state = run_level("1-1", "zen")
         # New info screens
         elif state == "howtoplay":
             lines = [
@@ -926,6 +4418,10 @@ def main():
             lines = [
                 "Mouse: Select plants, collect sun, click buttons.",
                 "ESC: Return to main menu (during gameplay).",
+                "P: Pause (also pauses when the window loses focus).",
+                "F3: Show frame timings.",
+                "F9: Profile the next frames (with --profile-frames).",
+                "F: Fast-forward (2x, 4x, 8x, max, back to 1x).",
                 "During game:",
                 "  - Click sun to collect.",
                 "  - Click plant in sidebar, then on lawn to plant.",
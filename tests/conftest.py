@@ -0,0 +1,43 @@
+"""Shared fixtures: the engine loaded the way the tools load it.
+
+The engine is one script whose name starts with '#', so it is loaded from
+its path by tools/gameload.py (SDL's dummy drivers, no window). Tests that
+touch files get SAVE_DIR pointed at a temporary directory.
+
+    python -m pytest -q
+"""
+import os
+import sys
+import random
+
+import pytest
+
+TOOLS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools")
+sys.path.insert(0, TOOLS)
+
+from gameload import load_game
+
+@pytest.fixture(scope="session")
+def engine():
+    return load_game()
+
+@pytest.fixture
+def pvz(engine, tmp_path, monkeypatch):
+    """The engine on the classic profile, saving under tmp_path."""
+    engine.apply_profile("classic")
+    monkeypatch.setattr(engine, "SAVE_DIR", str(tmp_path))
+    state = random.getstate()
+    yield engine
+    random.setstate(state)
+
+# Seed packets from the top of the sidebar down (Game.handle_sidebar_click)
+SEED_PACKETS = ('peashooter', 'sunflower', 'wallnut', 'cherrybomb', 'snowpea', 'repeater',
+                'potatomine', 'chomper', 'puffshroom', 'lilypad', 'squash')
+
+def slot_click(m, plant):
+    """Where a click selects `plant`'s seed packet in the sidebar."""
+    slot = SEED_PACKETS.index(plant)
+    return (m.GAME_WIDTH + m.SIDEBAR_WIDTH // 2, m.SEED_SLOT_TOP + slot * m.SEED_SLOT_PITCH + m.SEED_SLOT_HEIGHT // 2)
+
+def cell_click(m, row, col):
+    return (col * m.CELL_SIZE + m.CELL_SIZE // 2, row * m.CELL_SIZE + m.CELL_SIZE // 2)
@@ -0,0 +1,73 @@
+"""QualityGovernor: stepping quality down and up with hysteresis."""
+import pytest
+
+OVER, BAND, UNDER = 20.0, 12.0, 5.0      # ms of work against a 16.7 ms budget at 60 fps
+
+@pytest.fixture
+def governor(pvz, monkeypatch):
+    applied = []
+    monkeypatch.setattr(pvz, "apply_quality", lambda level, base_scale=1.0: applied.append(level))
+    governor = pvz.QualityGovernor(fps=60)
+    governor.applied = applied
+    return governor
+
+def run(governor, work_ms, frames):
+    for _ in range(frames):
+        governor.frame(work_ms)
+
+def test_steps_down_after_down_frames_over_budget(governor):
+    run(governor, OVER, 29)
+    assert governor.level == 0
+    run(governor, OVER, 1)
+    assert (governor.level, governor.applied, governor.over) == (1, [1], 0)
+
+def test_frames_inside_the_band_reset_both_streaks(governor):
+    run(governor, OVER, 29)
+    run(governor, BAND, 1)
+    run(governor, OVER, 29)
+    assert governor.level == 0
+    governor.set_level(2)
+    run(governor, UNDER, 179)
+    run(governor, BAND, 1)
+    run(governor, UNDER, 179)
+    assert governor.level == 2
+
+def test_steps_up_after_up_frames_with_headroom(governor):
+    governor.set_level(2)
+    run(governor, UNDER, 180)
+    assert (governor.level, governor.frames_since_up) == (1, 0)
+    run(governor, UNDER, 180)
+    assert governor.level == 0
+    run(governor, UNDER, 1000)
+    assert governor.applied == [2, 1, 0]
+
+def test_a_step_up_undone_quickly_doubles_the_wait(governor):
+    governor.set_level(1)
+    run(governor, UNDER, 180)
+    run(governor, OVER, 30)
+    assert (governor.level, governor.up_frames) == (1, 360)
+    run(governor, UNDER, 359)
+    assert governor.level == 1
+    run(governor, UNDER, 1)
+    assert governor.level == 0
+
+def test_a_late_step_down_keeps_the_wait(governor):
+    governor.set_level(1)
+    run(governor, UNDER, 180)
+    run(governor, BAND, 200)
+    run(governor, OVER, 30)
+    assert (governor.level, governor.up_frames) == (1, 180)
+
+def test_wait_is_capped(governor):
+    for _ in range(10):
+        governor.set_level(1)
+        run(governor, UNDER, governor.up_frames)
+        run(governor, OVER, 30)
+    assert governor.up_frames == governor.max_up_frames == 3600
+
+def test_levels_stop_at_both_ends(pvz, governor):
+    run(governor, OVER, 30 * (len(pvz.QUALITY_LEVELS) + 2))
+    assert governor.level == len(pvz.QUALITY_LEVELS) - 1
+    governor.up_frames = 10
+    run(governor, UNDER, 10 * (len(pvz.QUALITY_LEVELS) + 2))
+    assert governor.level == 0
@@ -0,0 +1,106 @@
+"""The input journal: journal_*.bin written while playing, replayed after a crash."""
+import os
+
+import pytest
+
+from conftest import slot_click, cell_click
+from gamestate import gameplay_hash
+
+TICKS = 900
+
+COLLECT = 740                # tick at which play() clicks every sun on the lawn
+
+def clicks(m):
+    """tick -> clicks: a sunflower, one there is no sun for yet, and one after COLLECT."""
+    return {5: [slot_click(m, 'sunflower')], 6: [cell_click(m, 2, 1)],
+            200: [slot_click(m, 'sunflower'), cell_click(m, 1, 3)],
+            750: [slot_click(m, 'sunflower'), cell_click(m, 3, 4)]}
+
+def play(m, journal, ticks=TICKS):
+    """Play 1-1 with clicks(), journaled; return the game and its hash at every MARK."""
+    game = m.Game("1-1")
+    journal.begin(game)
+    planned = clicks(m)
+    marks = {}
+    for tick in range(ticks):
+        suns = [sun.rect.center for sun in game.suns] if tick == COLLECT else []
+        for pos in suns + planned.get(tick, []):
+            journal.click(game, pos, 1)
+            m.apply_click(game, pos)
+        game.update()
+        if tick % 100 == 99:
+            journal.flush()
+            marks[game.frame_count] = gameplay_hash(game)
+    journal.stop()
+    return game, marks
+
+@pytest.fixture
+def journal(pvz):
+    journal = pvz.InputJournal()
+    journal.enabled = True
+    yield journal
+    journal.stop()
+
+def test_replay_rebuilds_the_played_game(pvz, journal):
+    game, _ = play(pvz, journal)
+    assert game.grid[2][1].type == 'sunflower' and game.grid[1][3] is None
+    assert game.grid[3][4].type == 'sunflower'
+    board, records = journal.load()
+    replayed = journal.replay(board, records)
+    assert replayed.frame_count == TICKS
+    assert gameplay_hash(replayed) == gameplay_hash(game)
+
+def test_records_cut_short_by_a_crash_are_dropped(pvz, journal):
+    _, marks = play(pvz, journal)
+    with open(journal.path(), "rb") as f:
+        data = f.read()
+    board, records = journal.load()
+    with open(journal.path(), "wb") as f:
+        f.write(data[:-3])
+    assert journal.load() == (board, records[:-1])
+    # Without the last MARK the replay stops at the one before it.
+    replayed = journal.replay(*journal.load())
+    assert gameplay_hash(replayed) == marks[replayed.frame_count]
+
+@pytest.mark.parametrize("cut", [0, 2, 8, 40])
+def test_journal_without_a_whole_board_is_ignored(pvz, journal, cut):
+    play(pvz, journal, 10)
+    with open(journal.path(), "rb") as f:
+        data = f.read()
+    with open(journal.path(), "wb") as f:
+        f.write(data[:cut])
+    assert journal.load() is None
+
+def test_finished_level_deletes_its_journal(pvz, journal):
+    journal.begin(pvz.Game("1-1"))
+    journal.end()
+    journal.stop()
+    assert not os.path.exists(journal.path())
+    assert journal.load() is None
+
+@pytest.fixture
+def crashed(pvz, monkeypatch):
+    """The module's journal, left behind by a level that did not end."""
+    monkeypatch.setattr(pvz.journal, "enabled", True)
+    game, _ = play(pvz, pvz.journal)
+    return game
+
+def test_recover_replays_when_asked(pvz, crashed, monkeypatch):
+    monkeypatch.setattr(pvz, "ask_screen", lambda title, lines: True)
+    assert gameplay_hash(pvz.recover_crashed_level()) == gameplay_hash(crashed)
+
+def test_recover_declined_discards_the_journal(pvz, crashed, monkeypatch):
+    monkeypatch.setattr(pvz, "ask_screen", lambda title, lines: False)
+    assert pvz.recover_crashed_level() is None
+    assert not os.path.exists(pvz.journal.path())
+
+def test_recover_ignores_an_unreadable_board(pvz, crashed, monkeypatch, caplog):
+    monkeypatch.setattr(pvz, "ask_screen", lambda title, lines: pytest.fail("asked"))
+    classic = pvz.journal.path()
+    pvz.apply_profile("cat")
+    try:
+        os.replace(classic, pvz.journal.path())
+        assert pvz.recover_crashed_level() is None
+    finally:
+        pvz.apply_profile("classic")
+    assert "ignoring input journal" in caplog.text
@@ -0,0 +1,79 @@
+"""levels.json and the LevelRules it compiles to."""
+import copy
+
+import pytest
+
+MODES = ("adventure", "mini", "survival", "zen")
+
+@pytest.fixture
+def rules(pvz, monkeypatch):
+    """Compile levels from a copy of levels.json that a test may edit."""
+    data = copy.deepcopy(pvz.levels())
+    monkeypatch.setattr(pvz, "LEVELS", data)
+    monkeypatch.setattr(pvz, "LEVEL_RULES", {})
+    def compile_level(level_str, mode="adventure"):
+        return pvz.level_rules(level_str, mode)
+    compile_level.data = data
+    return compile_level
+
+def test_every_level_compiles(rules):
+    for world in range(1, 6):
+        for sublevel in range(1, 11):
+            for mode in MODES:
+                rules("%d-%d" % (world, sublevel), mode)
+
+def test_day_level(rules):
+    r = rules("1-1")
+    assert (r.env, r.water_rows, r.sun_drop) == ("day", (), True)
+    assert (r.zombies_to_spawn, r.first_spawn, r.spawn_delay, r.spawn_speedup) == (7, 200, 400, 10)
+    assert (r.types, list(r.thresholds), r.uniform) == (("basic",), [1.0], False)
+    assert r.row_zombie == (None,) * 5
+    assert r.unlocked == {"peashooter", "sunflower"}
+
+def test_waves_by_level(rules):
+    assert rules("1-3").types == ("cone", "basic")
+    later = rules("2-7")
+    assert later.types == ("pole", "newspaper", "bucket", "basic")
+    assert list(later.thresholds) == [0.2, 0.4, 0.6, 1.0]
+    assert (later.env, later.sun_drop, later.zombies_to_spawn) == ("night", False, 19)
+
+def test_pool_and_fog_levels(rules):
+    pool = rules("3-2")
+    assert (pool.env, pool.water_rows, pool.uniform) == ("pool", (2, 3), True)
+    assert pool.types == ("basic", "cone", "bucket") and not pool.thresholds
+    assert pool.row_zombie == (None, None, "ducky", "ducky", None)
+    fog = rules("4-1")
+    assert (fog.env, fog.water_rows, fog.row_zombie) == ("fog", (2, 3), (None,) * 5)
+
+def test_rules_are_compiled_once(rules):
+    assert rules("1-4") is rules("1-4")
+    assert rules("1-4", "survival") is not rules("1-4")
+
+def test_wave_overrides_the_schedule_by_mode(rules):
+    rules.data["waves"].insert(0, {"modes": ["survival"], "count": 1000, "count_per_level": 0,
+                                   "zombies": [["football", 1]]})
+    survival = rules("1-2", "survival")
+    assert (survival.types, survival.zombies_to_spawn, survival.spawn_delay) == (("football",), 1000, 400)
+    assert rules("1-2").types == ("basic",)
+
+def test_unlocked_plants(pvz):
+    assert "wallnut" in pvz.unlocked_plants("1-4")
+    assert "potatomine" not in pvz.unlocked_plants("1-4")
+    assert pvz.unlocked_plants("2-1") == frozenset(pvz.PLANT_DATA)
+
+@pytest.mark.parametrize("wave, message", [
+    ({"zombies": [["basic", 0.5], ["gargantuar", 1]]}, "unknown zombie 'gargantuar'"),
+    ({"pick": "uniform", "zombies": ["basic"], "water_zombie": "dolphin"}, "unknown zombie 'dolphin'"),
+    ({"zombies": [["cone", 0.3], ["basic", 0.9]]}, "the last zombie of a mix needs r = 1"),
+    ({"zombies": []}, "the last zombie of a mix needs r = 1"),
+])
+def test_bad_waves_are_rejected(rules, wave, message):
+    rules.data["waves"] = [wave]
+    with pytest.raises(ValueError, match=message):
+        rules("1-1")
+
+def test_level_without_a_wave_is_rejected(rules):
+    rules.data["waves"] = [{"worlds": [2], "zombies": [["basic", 1]]}]
+    rules("2-1")
+    with pytest.raises(ValueError, match="no wave for adventure 1-1"):
+        rules("1-1")
@@ -0,0 +1,60 @@
+"""FramePacer's interval statistics, fed from a fake clock.
+
+Intervals sit mid-bucket (16.5 ms, not 16.7) so that float rounding in the
+clock arithmetic cannot move them into the neighbouring 1 ms bucket.
+"""
+import types
+
+import pytest
+
+@pytest.fixture
+def pacer(pvz, monkeypatch):
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(pvz, "time", types.SimpleNamespace(perf_counter=lambda: clock.now))
+    pacer = pvz.FramePacer('vsync')
+    def frames(intervals_ms, fps=60):
+        for ms in intervals_ms:
+            pacer.mark(fps)
+            clock.now += ms / 1000
+        pacer.mark(fps)
+    pacer.frames = frames
+    pacer.clock = clock
+    return pacer
+
+def test_intervals_land_in_the_histogram(pacer):
+    pacer.frames([16.5] * 98 + [50.5, 120.5])
+    assert pacer.count == 100
+    assert (pacer.histogram[16], pacer.histogram[50], pacer.histogram[100]) == (98, 1, 1)
+    assert pacer.longest == pytest.approx(120.5)
+    assert pacer.percentile(0.5) == 16
+    assert pacer.percentile(0.99) == 50
+
+def test_dropped_frames_count_the_periods_missed(pacer):
+    pacer.frames([16.5, 33.5, 50.5, 120.5])
+    assert pacer.dropped == 0 + 1 + 2 + 6
+
+def test_uncapped_frames_drop_nothing(pacer):
+    pacer.frames([5.5, 250.5], fps=0)
+    assert pacer.dropped == 0
+    assert "uncapped" in pacer.level_summary(0)
+
+def test_summary(pacer):
+    assert pacer.level_summary(60) == "no frames"
+    pacer.frames([20.5] * 10)
+    summary = pacer.level_summary(60).splitlines()
+    assert summary[0] == ("vsync pacing: 10 frames, mean 20.50 ms (target 16.67 ms), jitter 0.00 ms, "
+                          "p99 < 21 ms, max 20.5 ms, 0 dropped")
+    assert summary[1].split() == ["20-21", "ms", "10", "#" * 40]
+
+def test_reset_skips_the_interval_across_a_pause(pacer):
+    pacer.frames([16.5] * 3)
+    pacer.reset()
+    pacer.clock.now += 5.0
+    pacer.frames([16.5])
+    assert (pacer.count, pacer.dropped) == (4, 0)
+    assert pacer.longest < 17
+
+def test_begin_level_clears_the_statistics(pacer):
+    pacer.frames([40.5] * 5)
+    pacer.begin_level()
+    assert (pacer.count, pacer.dropped, sum(pacer.histogram)) == (0, 0, 0)
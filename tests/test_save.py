@@ -0,0 +1,136 @@
+"""Save files: encode_game/decode_game, the file header and progress_*.json."""
+import os
+import json
+import random
+import struct
+import zlib
+
+import pytest
+
+import scenarios
+from gamestate import snapshot, state_hash
+
+def board(m, ticks=700):
+    """A survival board with plants, zombies, peas and suns on it."""
+    game = scenarios.survival(m, 1, 40)
+    for _ in range(ticks):
+        game.update()
+    return game
+
+def test_decode_restores_the_encoded_state(pvz):
+    game = board(pvz)
+    assert game.zombies and game.projectiles and game.suns
+    raw = pvz.encode_game(game)
+    state = random.getstate()
+    copy = pvz.decode_game(raw)
+    assert random.getstate() == state
+    assert snapshot(copy) == snapshot(game)
+
+def test_decoded_game_plays_on_like_the_original(pvz):
+    game = board(pvz)
+    state = random.getstate()
+    copy = pvz.decode_game(pvz.encode_game(game))
+    for _ in range(600):
+        copy.update()
+    random.setstate(state)
+    for _ in range(600):
+        game.update()
+    assert state_hash(copy) == state_hash(game)
+
+def test_zombie_x_keeps_its_type(pvz):
+    game = pvz.Game("1-1")
+    scenarios.no_waves(game)
+    standing = scenarios.add_zombie(pvz, game, 1, 700)
+    walking = scenarios.add_zombie(pvz, game, 2, 700)
+    walking.x = 699.75
+    assert pvz.zombie_flags(standing) & pvz.X_IS_INT
+    assert not pvz.zombie_flags(walking) & pvz.X_IS_INT
+    copy = pvz.decode_game(pvz.encode_game(game))
+    assert [(type(z.x), z.x) for z in copy.zombies] == [(int, 700), (float, 699.75)]
+
+def test_save_file_round_trip(pvz):
+    game = board(pvz)
+    contents = pvz.save_file(pvz.encode_game(game))
+    assert contents.startswith(pvz.SAVE_MAGIC)
+    assert snapshot(pvz.load_file(contents)) == snapshot(game)
+
+@pytest.mark.parametrize("header", [b"PVZJ\x01", b"PVZS\x00", b"PVZS\x02"])
+def test_load_file_rejects_other_files_and_versions(pvz, header):
+    contents = pvz.save_file(pvz.encode_game(board(pvz, 10)))
+    with pytest.raises(ValueError, match="not a version 1 save file"):
+        pvz.load_file(header + contents[pvz.SAVE_HEADER.size:])
+
+def test_truncated_saves_raise_what_resume_catches(pvz):
+    raw = pvz.encode_game(board(pvz))
+    contents = pvz.save_file(raw)
+    for cut in range(0, len(contents), 7):
+        with pytest.raises((ValueError, struct.error, zlib.error)):
+            pvz.load_file(contents[:cut])
+    for cut in range(0, len(raw), 7):
+        with pytest.raises((ValueError, struct.error, zlib.error)):
+            pvz.decode_game(raw[:cut])
+
+def test_decode_refuses_another_profiles_save(pvz):
+    raw = pvz.encode_game(board(pvz, 10))
+    pvz.apply_profile("cat")
+    try:
+        with pytest.raises(ValueError, match="saved with the classic profile"):
+            pvz.decode_game(raw)
+    finally:
+        pvz.apply_profile("classic")
+
+def test_resume_only_the_saved_level(pvz):
+    game = board(pvz)
+    pvz.autosave.save(game)
+    pvz.writer.stop()
+    assert os.path.exists(pvz.autosave.path("survival"))
+    resumed = pvz.autosave.resume("1-9", "survival")
+    assert snapshot(resumed) == snapshot(game)
+    assert pvz.autosave.resume("1-8", "survival") is None
+    assert pvz.autosave.resume("1-9", "adventure") is None
+
+def test_resume_ignores_a_truncated_autosave(pvz, caplog):
+    contents = pvz.save_file(pvz.encode_game(board(pvz)))
+    pvz.write_atomic(pvz.autosave.path("survival"), contents[:len(contents) // 2])
+    assert pvz.autosave.resume("1-9", "survival") is None
+    assert "ignoring autosave" in caplog.text
+
+def write_progress(pvz, data):
+    pvz.write_atomic(pvz.progress.path(), json.dumps(data).encode())
+
+def test_progress_round_trip(pvz):
+    saved = pvz.Progress()
+    saved.enabled = True
+    saved.reached("1-5")
+    saved.reached("1-3")
+    saved.remember(fps=30, render_scale=0.75, quality='auto', speed=2)
+    pvz.writer.stop()
+    loaded = pvz.Progress()
+    loaded.load()
+    assert (loaded.level, loaded.best) == ("1-3", "1-5")
+    assert loaded.settings == {'fps': 30, 'render_scale': 0.75, 'quality': 'auto', 'speed': 2}
+    assert loaded.unlocked() == saved.unlocked()
+    assert 'potatomine' in loaded.unlocked() and 'snowpea' not in loaded.unlocked()
+
+def test_progress_drops_invalid_settings(pvz, caplog):
+    write_progress(pvz, {'level': "1-2", 'settings': {
+        'fps': True, 'render_scale': 0.5, 'quality': 'high', 'speed': 3, 'volume': 5}})
+    progress = pvz.Progress()
+    progress.load()
+    assert progress.settings == {'render_scale': 0.5}
+    for name in ('fps', 'quality', 'speed', 'volume'):
+        assert "ignoring setting %s=" % name in caplog.text
+
+def test_progress_best_is_never_behind_level(pvz):
+    write_progress(pvz, {'level': "2-1", 'best': "1-3"})
+    progress = pvz.Progress()
+    progress.load()
+    assert (progress.level, progress.best) == ("2-1", "2-1")
+
+@pytest.mark.parametrize("contents", [b"{", b"[]", b'{"best": "1-2"}', b'{"level": "one"}'])
+def test_progress_ignores_a_broken_file(pvz, caplog, contents):
+    pvz.write_atomic(pvz.progress.path(), contents)
+    progress = pvz.Progress()
+    progress.load()
+    assert (progress.level, progress.best, progress.settings) == ("1-1", "1-1", {})
+    assert "ignoring progress file" in caplog.text
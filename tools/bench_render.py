@@ -0,0 +1,250 @@
+"""Rendering benchmarks under SDL's dummy video driver.
+
+Draws scripted scenes with fixed seeds: Game.draw for boards built by
+scenarios.py (advanced a few hundred ticks so every kind of entity is on
+screen), a board with freshly planted seed packets (their recharge timers,
+in profiles that have them), a main_menu frame and a display_info_screen
+frame. It reports:
+- draws per second
+- the cost of each draw span
+- the number of pygame.draw.* and Font.render calls per frame
+
+Every scene's first frame is hashed and checked against
+tools/golden_frames.json, so an optimisation that changes pixels fails
+loudly instead of slipping through:
+
+    python tools/bench_render.py                  # measure and verify
+    python tools/bench_render.py --update-golden  # accept the current pixels
+
+--profile and --render-scale draw the same scenes for another profile or
+internal resolution; their hashes are kept under "<profile>@<scale>/<scene>":
+
+    python tools/bench_render.py --profile cat --render-scale 0.5
+
+The exit status is 1 when a frame no longer matches its golden hash.
+"""
+import os
+import sys
+import random
+import json
+import time
+import hashlib
+import argparse
+
+import scenarios
+from gameload import GAME, load_game
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_frames.json")
+GAME_SCENES = ("empty", "full_board", "repeater_wall", "pool_ducky", "survival_100")
+WARMUP_TICKS = 240
+
+def frame_hash(surface):
+    return hashlib.sha256(surface.get_view("2").raw).hexdigest()[:16]
+
+class CountingFont:
+    """Stands in for a pygame Font and counts render() calls."""
+    def __init__(self, font, counts):
+        self.font = font
+        self.counts = counts
+
+    def render(self, *args, **kwargs):
+        self.counts["font.render"] = self.counts.get("font.render", 0) + 1
+        return self.font.render(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.font, name)
+
+class CallCounter:
+    """Count pygame.draw.* and Font.render calls while active."""
+    FONTS = ("font", "small_font", "title_font")
+
+    def __init__(self, m):
+        self.m = m
+        self.counts = {}
+
+    def __enter__(self):
+        draw = self.m.pygame.draw
+        self.saved_draw = {name: getattr(draw, name) for name in dir(draw)
+                           if not name.startswith("_") and callable(getattr(draw, name))}
+        for name, func in self.saved_draw.items():
+            setattr(draw, name, self.counting("draw." + name, func))
+        self.saved_fonts = {name: getattr(self.m, name) for name in self.FONTS}
+        for name, font in self.saved_fonts.items():
+            setattr(self.m, name, CountingFont(font, self.counts))
+        return self.counts
+
+    def __exit__(self, *exc):
+        for name, func in self.saved_draw.items():
+            setattr(self.m.pygame.draw, name, func)
+        for name, font in self.saved_fonts.items():
+            setattr(self.m, name, font)
+
+    def counting(self, key, func):
+        counts = self.counts
+        def wrapper(*args, **kwargs):
+            counts[key] = counts.get(key, 0) + 1
+            return func(*args, **kwargs)
+        return wrapper
+
+def game_scene(m, name, seed):
+    """Return draw(frame) for a board from scenarios.py after WARMUP_TICKS ticks."""
+    builders = {scene: builder for scene, builder, _ in scenarios.all_scenarios()}
+    game = builders[name](m, seed)
+    for _ in range(WARMUP_TICKS):
+        game.update()
+    return lambda frame: game.draw(m.screen)
+
+def recharge_scene(m, seed):
+    """Return draw(frame) for 1-5 a second after every unlocked plant was planted."""
+    random.seed(seed)
+    game = m.Game("1-5")
+    scenarios.no_waves(game)
+    game.sun_points = 10000
+    for i, plant in enumerate(p for p in m.PLANT_DATA if p in game.rules.unlocked):
+        game.place_plant(i % m.GRID_ROWS, 1 + i // m.GRID_ROWS, plant)     # clear of the mowers
+    for _ in range(m.SIM_FPS):
+        game.update()
+    return lambda frame: game.draw(m.screen)
+
+def loop_scene(m, run):
+    """Return draw(frames) that runs a menu loop for that many presented frames."""
+    def draw(frames):
+        presented = [0]
+        present_screen = m.backend.present_screen
+        def counting_present():
+            present_screen()
+            presented[0] += 1
+            if presented[0] >= frames:
+                m.pygame.event.post(m.pygame.event.Event(m.pygame.QUIT))
+        m.backend.present_screen = counting_present
+        try:
+            run()
+        finally:
+            del m.backend.present_screen
+    return draw
+
+def all_scenes(m, seed):
+    scenes = [(name, game_scene(m, name, seed), False) for name in GAME_SCENES]
+    scenes.append(("recharge", recharge_scene(m, seed), False))
+    scenes.append(("main_menu", loop_scene(m, m.main_menu), True))
+    scenes.append(("info_screen", loop_scene(m, lambda: m.display_info_screen(
+        "Controls", ["Left click: Select seed packet / plant / collect sun",
+                     "ESC: Return to main menu", "P: Pause"])), True))
+    return scenes
+
+def profile_stages(m, draw, frames):
+    profiler = getattr(m, "profiler", None)
+    if profiler is None:
+        return {}
+    totals = {}
+    profiler.enabled = True
+    try:
+        for frame in range(frames):
+            draw(frame)
+            for name, ms in profiler.current.items():
+                totals[name] = totals.get(name, 0.0) + ms
+            profiler.current.clear()
+    finally:
+        profiler.enabled = False
+    return {name: round(ms / frames, 4) for name, ms in sorted(totals.items())}
+
+def golden_key(m, args, name):
+    """Scenes of the classic profile at its own scale keep their plain names."""
+    scale = getattr(m, "RENDER_SCALE", 1.0)
+    if args.profile == "classic" and scale == 1.0:
+        return name
+    return "%s@%g/%s" % (args.profile, scale, name)
+
+def bench(m, args, golden):
+    # The menu loops pace themselves; skip the sleep so only drawing is timed.
+    if hasattr(m, "pacer"):
+        m.pacer.strategy = "vsync"
+    results, mismatched = {}, []
+    for name, draw, is_loop in all_scenes(m, args.seed):
+        # Speckles on the sidebar's edge bleed one pixel into areas no scene
+        # repaints, so start the hashed frame from a cleared screen.
+        m.screen.fill((0, 0, 0))
+        m.stone_random.seed(args.seed)
+        with CallCounter(m) as counts:
+            draw(1)
+        digest = frame_hash(m.screen)
+        start = time.perf_counter()
+        if is_loop:
+            draw(args.frames)
+        else:
+            for frame in range(args.frames):
+                draw(frame)
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "draws_per_sec": round(args.frames / elapsed, 1),
+            "ms_per_draw": round(elapsed * 1000 / args.frames, 4),
+            "stages_ms": {} if is_loop else profile_stages(m, draw, args.frames),
+            "calls_per_frame": dict(sorted(counts.items())),
+            "frame_hash": digest,
+        }
+        expected = golden.get("frames", {}).get(golden_key(m, args, name))
+        status = "new" if expected is None else ("ok" if expected == digest else "CHANGED")
+        if status == "CHANGED":
+            mismatched.append(name)
+        print("%-14s %8.1f draws/s %8.3f ms  %4d draw calls %3d font.render  %s %s"
+              % (name, results[name]["draws_per_sec"], results[name]["ms_per_draw"],
+                 sum(n for key, n in counts.items() if key.startswith("draw.")),
+                 counts.get("font.render", 0), digest, status))
+    return results, mismatched
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rendering benchmarks with golden frame checks")
+    parser.add_argument("--game", default=GAME, help="game script to benchmark")
+    parser.add_argument("--frames", type=int, default=200, help="frames timed per scene")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--profile", default="classic", help="variant profile to draw")
+    parser.add_argument("--render-scale", type=float, default=None,
+                        help="internal resolution (default: the profile's)")
+    parser.add_argument("--golden", default=GOLDEN, help="golden frame hashes (JSON)")
+    parser.add_argument("--update-golden", action="store_true",
+                        help="store the current frame hashes as the new golden set")
+    parser.add_argument("--out", help="write machine-readable results to this JSON file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    m = load_game(args.game)
+    if args.profile != "classic":
+        m.apply_profile(args.profile)
+    m.init_display()
+    scale = args.render_scale
+    if scale is None and hasattr(m, "PROFILES"):
+        scale = m.PROFILES[args.profile]["render_scale"]
+    if scale and scale != m.RENDER_SCALE:
+        m.set_render_scale(scale)
+    # A fixed quality level is part of the profile's look (lowspec draws no speckles)
+    quality = m.PROFILES[args.profile]["quality"] if hasattr(m, "PROFILES") else "auto"
+    if quality != "auto":
+        m.apply_quality(quality, m.RENDER_SCALE)
+    golden = {}
+    if os.path.exists(args.golden):
+        with open(args.golden) as f:
+            golden = json.load(f)
+    versions = {"pygame": m.pygame.version.ver, "sdl": ".".join(map(str, m.pygame.get_sdl_version()))}
+    if golden and golden.get("versions") != versions:
+        print("note: golden hashes were made with %s, running %s" % (golden.get("versions"), versions))
+    results, mismatched = bench(m, args, golden)
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump({"versions": versions, "frames": args.frames, "seed": args.seed,
+                       "scenes": results}, out, indent=2)
+    if args.update_golden:
+        # Only this profile and scale's hashes are replaced; the others are kept.
+        frames = dict(golden.get("frames", {}))
+        frames.update((golden_key(m, args, name), r["frame_hash"]) for name, r in results.items())
+        with open(args.golden, "w") as out:
+            json.dump({"versions": versions, "seed": args.seed, "frames": frames}, out, indent=2)
+            out.write("\n")
+        return 0
+    if mismatched:
+        print("frames changed: %s (run with --update-golden if intended)" % ", ".join(mismatched))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
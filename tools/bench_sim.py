@@ -0,0 +1,156 @@
+"""Headless simulation benchmarks for Game.update.
+
+Runs each fixed-seed scenario from scenarios.py without drawing and
+reports ticks per second, the cost of each update stage and the memory the
+run allocates, then optionally compares against a stored baseline:
+
+    python tools/bench_sim.py --out results.json
+    python tools/bench_sim.py --baseline results.json --threshold 0.1
+
+Each scenario is run three ways so the measurements do not disturb each
+other: timed with instrumentation off (best of --repeat), once with the
+frame profiler's spans on for the per-stage split, and once under
+tracemalloc. The exit status is 1 when any scenario regressed.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+
+import scenarios
+from gameload import GAME, load_game
+
+MIN_TICKS = 30
+
+def run_ticks(game, ticks):
+    for _ in range(ticks):
+        game.update()
+
+def timed(m, builder, seed, ticks, repeat):
+    """Best wall time of `repeat` runs, in seconds."""
+    best = None
+    for _ in range(repeat):
+        game = builder(m, seed)
+        start = time.perf_counter()
+        run_ticks(game, ticks)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, game
+
+def stage_costs(m, builder, seed, ticks):
+    """Mean milliseconds per tick spent in each span of Game.update."""
+    profiler = getattr(m, "profiler", None)
+    if profiler is None:
+        return {}
+    game = builder(m, seed)
+    totals = {}
+    profiler.enabled = True
+    try:
+        for _ in range(ticks):
+            game.update()
+            for name, ms in profiler.current.items():
+                totals[name] = totals.get(name, 0.0) + ms
+            profiler.current.clear()
+    finally:
+        profiler.enabled = False
+    return {name: round(ms / ticks, 4) for name, ms in sorted(totals.items())}
+
+def memory_use(m, builder, seed, ticks):
+    """Peak and retained KB allocated while running the scenario."""
+    game = builder(m, seed)
+    tracemalloc.start()
+    try:
+        run_ticks(game, ticks)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1), round(current / 1024, 1)
+
+def bench(m, args):
+    results = {}
+    for name, builder, scale in scenarios.all_scenarios(args.sizes):
+        if args.only and name not in args.only:
+            continue
+        ticks = max(MIN_TICKS, int(args.ticks * scale))
+        elapsed, game = timed(m, builder, args.seed, ticks, args.repeat)
+        peak_kb, retained_kb = memory_use(m, builder, args.seed, ticks)
+        results[name] = {
+            "ticks": ticks,
+            "ticks_per_sec": round(ticks / elapsed, 1),
+            "ms_per_tick": round(elapsed * 1000 / ticks, 4),
+            "stages_ms": stage_costs(m, builder, args.seed, ticks),
+            "peak_kb": peak_kb,
+            "retained_kb": retained_kb,
+            "end_state": {"zombies": len(game.zombies), "projectiles": len(game.projectiles),
+                          "suns": len(game.suns), "game_over": game.game_over},
+        }
+        print("%-16s %6d ticks %10.1f ticks/s %9.4f ms/tick  peak %8.1f KB"
+              % (name, ticks, results[name]["ticks_per_sec"], results[name]["ms_per_tick"], peak_kb))
+    return results
+
+def compare(results, baseline, threshold):
+    """Print the change against the baseline; return the regressed scenario names."""
+    regressed = []
+    print("\nagainst baseline (threshold %.0f%%):" % (threshold * 100))
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            print("  %-16s no baseline" % name)
+            continue
+        ratio = result["ms_per_tick"] / base["ms_per_tick"]
+        if ratio > 1 + threshold:
+            verdict = "REGRESSION"
+            regressed.append(name)
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = "ok"
+        print("  %-16s %9.4f -> %9.4f ms/tick  %+6.1f%%  %s"
+              % (name, base["ms_per_tick"], result["ms_per_tick"], (ratio - 1) * 100, verdict))
+        for stage, ms in result["stages_ms"].items():
+            base_ms = base.get("stages_ms", {}).get(stage)
+            if base_ms and ms > base_ms * (1 + threshold) and ms - base_ms > 0.001:
+                print("      %-20s %8.4f -> %8.4f ms" % (stage, base_ms, ms))
+    return regressed
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Game.update benchmarks")
+    parser.add_argument("--game", default=GAME, help="game script to benchmark")
+    parser.add_argument("--ticks", type=int, default=600, help="ticks per scenario (survival scales down)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scenario, best one counts")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(scenarios.SURVIVAL_SIZES),
+                        help="zombie counts for the survival scenarios")
+    parser.add_argument("--only", nargs="+", metavar="SCENARIO", help="run only these scenarios")
+    parser.add_argument("--out", help="write machine-readable results to this JSON file")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown in ms/tick that counts as a regression")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    m = load_game(args.game)
+    results = bench(m, args)
+    report = {
+        "meta": {"game": os.path.basename(args.game), "python": platform.python_version(),
+                 "pygame": m.pygame.version.ver, "machine": platform.machine(),
+                 "platform": platform.platform(), "seed": args.seed, "ticks": args.ticks,
+                 "repeat": args.repeat, "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "scenarios": results,
+    }
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump(report, out, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
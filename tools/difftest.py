@@ -0,0 +1,216 @@
+"""Differential test: a candidate engine against the reference Game.update.
+
+Both engines play the same randomized sessions: a level, a mode, starting
+sun and a log of clicks (seed packets, lawn cells, falling suns), all drawn
+from the session seed. They run in lockstep and their full state (see
+gamestate.py) is compared every --every ticks. The two modules share the
+global random module, so each engine keeps its own random state and the
+harness swaps it in around every tick.
+
+On a divergence the session is shrunk: cut to the first differing tick,
+inputs removed while the divergence persists, and the smallest seed below
+the original that still diverges. The result is written as a repro file
+that --replay runs again:
+
+    python tools/difftest.py --reference HEAD --seeds 200
+    python tools/difftest.py --replay divergence.json
+
+--reference takes a git revision (the game script is read from it) or a
+path to a game script; --candidate defaults to the working tree's script.
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import subprocess
+import tempfile
+
+from gameload import GAME, ROOT, load_game
+from gamestate import snapshot, first_difference
+
+LEVELS = ("1-1", "1-5", "1-9", "2-3", "2-8", "3-2", "3-7", "4-5", "5-10")
+MODES = ("adventure", "survival")
+PLANTS = 11                  # seed packets in the sidebar
+SEED_TRIES = 50              # smaller seeds tried while shrinking
+
+def load_reference(ref):
+    """Module for a game script path or for ###pvz.py at git revision `ref`.
+
+    The script is written to a temporary directory together with the data
+    files it reads from its own directory (levels.json), as of `ref`.
+    """
+    if os.path.isfile(ref):
+        return load_game(ref, "pvz_reference")
+    directory = tempfile.mkdtemp(suffix="_reference")
+    for name in (os.path.basename(GAME), "levels.json"):
+        shown = subprocess.run(["git", "show", "%s:%s" % (ref, name)], cwd=ROOT, capture_output=True)
+        if shown.returncode and name != "levels.json":
+            shown.check_returncode()
+        if not shown.returncode:
+            with open(os.path.join(directory, name), "wb") as out:
+                out.write(shown.stdout)
+    return load_game(os.path.join(directory, os.path.basename(GAME)), "pvz_reference")
+
+def make_session(seed, ticks):
+    """Level, mode, starting sun and a click log, all drawn from `seed`."""
+    rng = random.Random(seed)
+    inputs = []
+    tick = rng.randint(1, 40)
+    while tick < ticks:
+        kind = rng.random()
+        if kind < 0.6:
+            inputs.append([tick, "plant", rng.randrange(PLANTS), rng.randrange(9), rng.randrange(5)])
+        elif kind < 0.8:
+            inputs.append([tick, "sun", rng.randrange(4)])
+        else:
+            inputs.append([tick, "click", rng.randrange(1000), rng.randrange(600)])
+        tick += rng.randint(1, 80)
+    return {"seed": seed, "level": rng.choice(LEVELS), "mode": rng.choice(MODES),
+            "sun": rng.choice((150, 500, 2000, 5000)), "ticks": ticks, "inputs": inputs}
+
+def click(game, pos):
+    """What run_game does with a left click: Game.handle_click, then sun pickup."""
+    game.handle_click(pos)
+    for sun in game.suns[:]:
+        if sun.rect.collidepoint(pos):
+            game.sun_points += sun.value
+            if hasattr(game, "sun_earned"):
+                game.sun_earned += sun.value
+            game.suns.remove(sun)
+
+def click_positions(m, game, entry):
+    """Screen positions an input log entry clicks, in the reference engine's layout."""
+    kind = entry[1]
+    if kind == "plant":
+        _, _, slot, col, row = entry
+        top = getattr(m, "SEED_SLOT_TOP", 40)
+        pitch = getattr(m, "SEED_SLOT_PITCH", 60)
+        return [(m.GAME_WIDTH + 20, top + slot * pitch + pitch // 3),
+                (col * m.CELL_SIZE + m.CELL_SIZE // 2, row * m.CELL_SIZE + m.CELL_SIZE // 2)]
+    if kind == "sun":
+        if entry[2] < len(game.suns):
+            return [game.suns[entry[2]].rect.center]
+        return []
+    return [(entry[2], entry[3])]
+
+class Engine:
+    """A Game with a private random state."""
+    def __init__(self, m, session, seed):
+        self.m = m
+        random.seed(seed)
+        self.game = m.Game(session["level"], session["mode"])
+        self.game.sun_points = session["sun"]
+        self.rng = random.getstate()
+
+    def step(self, positions):
+        random.setstate(self.rng)
+        for pos in positions:
+            click(self.game, pos)
+        self.game.update()
+        self.rng = random.getstate()
+
+def run_session(ref_m, cand_m, session, every, seed=None):
+    """Play `session` on both engines; return the first divergence or None."""
+    seed = session["seed"] if seed is None else seed
+    ref, cand = Engine(ref_m, session, seed), Engine(cand_m, session, seed)
+    inputs = sorted(session["inputs"])
+    next_input = 0
+    for tick in range(1, session["ticks"] + 1):
+        positions = []
+        while next_input < len(inputs) and inputs[next_input][0] == tick:
+            positions += click_positions(ref_m, ref.game, inputs[next_input])
+            next_input += 1
+        ref.step(positions)
+        cand.step(positions)
+        finished = ref.game.game_over or ref.game.win
+        if tick % every == 0 or tick == session["ticks"] or finished:
+            found = first_difference(snapshot(ref.game), snapshot(cand.game))
+            if found:
+                return {"tick": tick, "path": found[0], "reference": found[1], "candidate": found[2]}
+            if finished:
+                return None
+    return None
+
+def shrink(ref_m, cand_m, session, divergence):
+    """Smallest tick count, input log and seed that still diverge."""
+    session = dict(session, ticks=divergence["tick"])
+    divergence = run_session(ref_m, cand_m, session, 1)
+    session["ticks"] = divergence["tick"]
+    inputs = [entry for entry in session["inputs"] if entry[0] <= session["ticks"]]
+
+    chunk = max(1, len(inputs) // 2)
+    while inputs:
+        i = 0
+        while i < len(inputs):
+            trial = dict(session, inputs=inputs[:i] + inputs[i + chunk:])
+            found = run_session(ref_m, cand_m, trial, 1)
+            if found:
+                inputs, divergence = trial["inputs"], found
+                session["ticks"] = found["tick"]
+            else:
+                i += chunk
+        if chunk == 1:
+            break
+        chunk //= 2
+    session["inputs"] = inputs
+
+    for seed in range(min(session["seed"], SEED_TRIES)):
+        found = run_session(ref_m, cand_m, session, 1, seed)
+        if found:
+            session = dict(session, seed=seed, ticks=found["tick"])
+            divergence = found
+            break
+    return session, divergence
+
+def report(session, divergence):
+    print("divergence at tick %d: %s reference=%r candidate=%r"
+          % (divergence["tick"], divergence["path"], divergence["reference"], divergence["candidate"]))
+    print("  seed %d, level %s %s, sun %d, %d inputs"
+          % (session["seed"], session["level"], session["mode"], session["sun"], len(session["inputs"])))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare a candidate engine with the reference one")
+    parser.add_argument("--reference", default="HEAD", help="git revision or path of the reference script")
+    parser.add_argument("--candidate", default=GAME, help="path of the candidate script")
+    parser.add_argument("--seeds", type=int, default=100, help="number of sessions to play")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--ticks", type=int, default=3000, help="ticks per session")
+    parser.add_argument("--every", type=int, default=50, help="compare full state every N ticks")
+    parser.add_argument("--repro", default="divergence.json", help="where to write the shrunk repro")
+    parser.add_argument("--no-shrink", action="store_true")
+    parser.add_argument("--replay", metavar="FILE", help="run a repro file instead of random sessions")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    ref_m = load_reference(args.reference)
+    cand_m = load_game(args.candidate, "pvz_candidate")
+    if args.replay:
+        with open(args.replay) as f:
+            session = json.load(f)["session"]
+        divergence = run_session(ref_m, cand_m, session, 1)
+        if divergence:
+            report(session, divergence)
+            return 1
+        print("no divergence")
+        return 0
+    for seed in range(args.first_seed, args.first_seed + args.seeds):
+        session = make_session(seed, args.ticks)
+        divergence = run_session(ref_m, cand_m, session, args.every)
+        if divergence is None:
+            continue
+        report(session, divergence)
+        if not args.no_shrink:
+            session, divergence = shrink(ref_m, cand_m, session, divergence)
+            print("shrunk:")
+            report(session, divergence)
+        with open(args.repro, "w") as out:
+            json.dump({"session": session, "divergence": divergence}, out, indent=1)
+        print("repro written to %s" % args.repro)
+        return 1
+    print("%d sessions of %d ticks, no divergence" % (args.seeds, args.ticks))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""Load a game script as a module for the tools in this directory.
+
+The game scripts cannot be imported by name (their file names start with
+'#'), so the tools load them from their path, with SDL's dummy video and
+audio drivers for tools that draw. Importing the game opens nothing (older
+revisions opened their window at import); pass display=True to open it.
+"""
+import os
+import sys
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAME = os.path.join(ROOT, "###pvz.py")
+
+def load_game(path=GAME, name="pvz", display=False):
+    """Execute the game script at `path` and return it as a module."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    if display and hasattr(module, "init_display"):
+        module.init_display()
+    return module
@@ -0,0 +1,112 @@
+"""Canonical snapshots and hashes of a Game's simulation state.
+
+snapshot() turns a Game into plain JSON data: every public attribute of the
+game and of the plants, zombies, projectiles and suns it holds, with Rects
+as [x, y, w, h]. Render-only state (the interpolation positions) is left
+out, so two engines that simulate identically snapshot identically however
+they draw.
+
+gameplay_snapshot() and gameplay_hash() cover a fixed list of gameplay
+fields instead, for stored hashes (the replay corpus) that must survive
+engine changes which only add attributes.
+"""
+import json
+import hashlib
+
+RENDER_ONLY = frozenset(("prev_x", "prev_y"))
+MAX_DEPTH = 8
+
+def attributes(obj):
+    names = getattr(obj, "__dict__", None)
+    if names is None:
+        names = [name for cls in type(obj).__mro__ for name in getattr(cls, "__slots__", ())]
+    return sorted(name for name in names if not name.startswith("_") and name not in RENDER_ONLY)
+
+def snapshot(value, depth=0):
+    """Plain JSON-able data for `value` and everything it refers to."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if depth > MAX_DEPTH:
+        return "<%s>" % type(value).__name__
+    if isinstance(value, (list, tuple)):
+        return [snapshot(item, depth + 1) for item in value]
+    if isinstance(value, dict):
+        return {str(key): snapshot(item, depth + 1) for key, item in value.items()}
+    if type(value).__name__ == "Rect":
+        return [value.x, value.y, value.w, value.h]
+    data = {"class": type(value).__name__}
+    for name in attributes(value):
+        attr = getattr(value, name, None)
+        if not callable(attr):
+            data[name] = snapshot(attr, depth + 1)
+    return data
+
+def state_hash(game):
+    text = json.dumps(snapshot(game), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+def first_difference(reference, candidate, path="game"):
+    """Path and values of the first place `candidate` differs from `reference`.
+
+    Attributes only the candidate has (an optimized engine's indexes, say)
+    are ignored; attributes it lacks count as differences.
+    """
+    if isinstance(reference, dict) and isinstance(candidate, dict):
+        for key in sorted(reference):
+            if key not in candidate:
+                return "%s.%s" % (path, key), reference[key], "<missing>"
+            found = first_difference(reference[key], candidate[key], "%s.%s" % (path, key))
+            if found:
+                return found
+        return None
+    if isinstance(reference, list) and isinstance(candidate, list):
+        if len(reference) != len(candidate):
+            return "len(%s)" % path, len(reference), len(candidate)
+        for i, (ref, cand) in enumerate(zip(reference, candidate)):
+            found = first_difference(ref, cand, "%s[%d]" % (path, i))
+            if found:
+                return found
+        return None
+    if reference != candidate or type(reference) is not type(candidate):
+        return path, reference, candidate
+    return None
+
+# Gameplay state with a fixed schema, for hashes that must stay valid while
+# the engine gains caches, indexes or new bookkeeping attributes.
+GAME_FIELDS = ("level_str", "mode", "env", "water_rows", "frame_count", "sun_points",
+               "selected_plant", "game_over", "win", "zombies_spawned", "zombies_to_spawn",
+               "spawn_delay", "next_spawn")
+RULE_FIELDS = ("plant_cooldowns", "lawn_mowers")     # only in variants with those rules
+ENTITY_FIELDS = {
+    "plant": ("type", "x", "y", "rect", "health", "last_shot", "last_sun_gen", "exploded",
+              "arm_timer", "is_armed", "chewing", "sleeping"),
+    "zombie": ("type", "row", "col", "x", "y", "rect", "health", "speed", "eating",
+               "has_pole", "angry", "slowed"),
+    "projectile": ("type", "x", "y", "rect", "target_row", "damage", "speed"),
+    "sun": ("x", "y", "rect", "value", "falling"),
+}
+
+def entity_state(kind, entity):
+    if entity is None:
+        return None
+    state = [snapshot(getattr(entity, name, None)) for name in ENTITY_FIELDS[kind]]
+    if kind == "zombie":
+        target = entity.target_plant
+        state.append(None if target is None else [target.x, target.y])
+    return state
+
+def gameplay_snapshot(game):
+    state = {name: snapshot(getattr(game, name)) for name in GAME_FIELDS}
+    for name in RULE_FIELDS:
+        value = getattr(game, name, None)
+        if value is not None:
+            state[name] = snapshot(value)
+    state["grid"] = [[entity_state("plant", plant) for plant in row] for row in game.grid]
+    state["zombies"] = [entity_state("zombie", z) for z in game.zombies]
+    state["projectiles"] = [entity_state("projectile", p) for p in game.projectiles]
+    state["suns"] = [entity_state("sun", s) for s in game.suns]
+    return state
+
+def gameplay_hash(game):
+    text = json.dumps(gameplay_snapshot(game), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
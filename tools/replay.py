@@ -0,0 +1,156 @@
+"""Golden replays: recorded seeded sessions for every game variant.
+
+The variants are the engine's gameplay profiles (PROFILES in ###pvz.py;
+lowspec plays exactly like classic and has no corpus of its own). Each file
+under tools/replays/<variant>/ holds one session: the seed, level,
+mode and starting sun, the clicks as (tick, x, y) and the gameplay hash
+(gamestate.gameplay_hash) after every CHECKPOINT ticks and at the end.
+Checking replays every session headlessly, in parallel across processes,
+and reports the first checkpoint that no longer matches:
+
+    python tools/replay.py                 # check the whole corpus
+    python tools/replay.py --variant cat   # one variant
+    python tools/replay.py --record        # (re)record the corpus
+
+Recording keeps the inputs of existing files and only refreshes their
+hashes, so re-recording after an intended gameplay change is a reviewable
+diff of hashes.
+"""
+import os
+import sys
+import json
+import glob
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from gameload import GAME, ROOT, load_game
+from gamestate import gameplay_hash
+from difftest import make_session, click
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replays")
+VARIANTS = ("cat", "classic", "holdings")
+CHECKPOINT = 1000
+SESSIONS = 8
+TICKS = 6000
+
+modules = {}
+
+def variant_module(variant):
+    """The engine with the variant's profile applied, loaded once per process."""
+    if variant not in modules:
+        m = load_game(GAME, "pvz_" + variant)
+        m.apply_profile(variant)
+        modules[variant] = m
+    return modules[variant]
+
+def resolve(m, game, entry):
+    """Turn an abstract input from difftest.make_session into click positions."""
+    kind = entry[1]
+    if kind == "plant":
+        _, _, slot, col, row = entry
+        top, pitch = m.SEED_SLOT_TOP, m.SEED_SLOT_PITCH
+        col %= m.GRID_COLS
+        return [(m.GAME_WIDTH + 20, top + slot * pitch + pitch // 3),
+                (col * m.CELL_SIZE + m.CELL_SIZE // 2, row * m.CELL_SIZE + m.CELL_SIZE // 2)]
+    if kind == "sun":
+        return [game.suns[entry[2]].rect.center] if entry[2] < len(game.suns) else []
+    return [(entry[2] * m.SCREEN_WIDTH // 1000, entry[3] * m.SCREEN_HEIGHT // 600)]
+
+def play(variant, session, clicks=None):
+    """Play a session; return (clicks, checkpoint hashes, end hash).
+
+    With `clicks` given they are replayed as recorded; otherwise the
+    session's abstract inputs are resolved against the live game and the
+    resulting clicks are returned for storing.
+    """
+    m = variant_module(variant)
+    random.seed(session["seed"])
+    game = m.Game(session["level"], session["mode"])
+    game.sun_points = session["sun"]
+    recording = clicks is None
+    if recording:
+        clicks = []
+        pending = sorted(session["inputs"])
+    else:
+        pending = [[tick, "click", x, y] for tick, x, y in clicks]
+    checkpoints = {}
+    next_input = 0
+    for tick in range(1, session["ticks"] + 1):
+        while next_input < len(pending) and pending[next_input][0] == tick:
+            entry = pending[next_input]
+            positions = resolve(m, game, entry) if recording else [(entry[2], entry[3])]
+            for pos in positions:
+                click(game, pos)
+                if recording:
+                    clicks.append([tick, pos[0], pos[1]])
+            next_input += 1
+        game.update()
+        if tick % CHECKPOINT == 0:
+            checkpoints[str(tick)] = gameplay_hash(game)
+    return clicks, checkpoints, gameplay_hash(game)
+
+def check_file(path):
+    """Replay one corpus file; return (path, None) or (path, description of the mismatch)."""
+    with open(path) as f:
+        replay = json.load(f)
+    _, checkpoints, end = play(replay["variant"], replay, replay["clicks"])
+    for tick in sorted(replay["checkpoints"], key=int):
+        if checkpoints.get(tick) != replay["checkpoints"][tick]:
+            return path, "first mismatch at tick %s (%s, expected %s)" % (
+                tick, checkpoints.get(tick), replay["checkpoints"][tick])
+    if end != replay["end"]:
+        return path, "end state %s, expected %s" % (end, replay["end"])
+    return path, None
+
+def record(variant, index, path):
+    if os.path.exists(path):
+        with open(path) as f:
+            replay = json.load(f)
+        _, checkpoints, end = play(variant, replay, replay["clicks"])
+    else:
+        session = make_session(1000 * index + VARIANTS.index(variant), TICKS)
+        clicks, checkpoints, end = play(variant, session)
+        replay = {key: session[key] for key in ("seed", "level", "mode", "sun", "ticks")}
+        replay.update(variant=variant, clicks=clicks)
+    replay.update(checkpoints=checkpoints, end=end)
+    with open(path, "w") as out:
+        json.dump(replay, out, indent=1)
+        out.write("\n")
+    return path
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check or record the golden replay corpus")
+    parser.add_argument("--variant", choices=VARIANTS, action="append",
+                        help="limit to a variant (repeatable)")
+    parser.add_argument("--record", action="store_true", help="record new sessions and refresh hashes")
+    parser.add_argument("--sessions", type=int, default=SESSIONS, help="sessions per variant when recording")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    variants = args.variant or list(VARIANTS)
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        if args.record:
+            jobs = []
+            for variant in variants:
+                os.makedirs(os.path.join(CORPUS, variant), exist_ok=True)
+                for index in range(args.sessions):
+                    path = os.path.join(CORPUS, variant, "session%02d.json" % index)
+                    jobs.append(pool.submit(record, variant, index, path))
+            for job in jobs:
+                print("recorded %s" % os.path.relpath(job.result(), ROOT))
+            return 0
+        paths = sorted(path for variant in variants
+                       for path in glob.glob(os.path.join(CORPUS, variant, "*.json")))
+        failures = 0
+        for path, problem in pool.map(check_file, paths):
+            if problem:
+                failures += 1
+                print("FAIL %s: %s" % (os.path.relpath(path, ROOT), problem))
+    print("%d replays, %d failed" % (len(paths), failures))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
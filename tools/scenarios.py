@@ -0,0 +1,102 @@
+"""Fixed-seed board setups shared by the benchmark tools.
+
+Every builder takes the loaded game module and returns a ready Game. The
+global random module is seeded first, so building the same scenario twice
+gives the same board and the same run.
+"""
+import random
+
+SURVIVAL_SIZES = (10, 100, 1000, 10000)
+STURDY = 10 ** 9             # health for plants that must outlast the run
+
+def place(m, game, row, col, kind, sturdy=False):
+    inset = getattr(m, "PLANT_INSET", 5)
+    plant = m.Plant(col * m.CELL_SIZE + inset, row * m.CELL_SIZE + inset, kind, game.env)
+    if sturdy:
+        plant.health = plant.max_health = STURDY
+    game.grid[row][col] = plant
+    return plant
+
+def add_zombie(m, game, row, x, kind="basic"):
+    zombie = m.Zombie(row, m.GRID_COLS - 1, kind, game.env)
+    zombie.x = zombie.rect.x = x
+    zombie.col = max(0, int(x / m.CELL_SIZE))
+    game.zombies.append(zombie)
+    return zombie
+
+def heavy_waves(game, every=10):
+    """Keep spawning a zombie every `every` ticks for the whole run."""
+    game.zombies_to_spawn = 10 ** 9
+    game.spawn_delay = every + game.spawn_speedup
+    game.next_spawn = 1
+    game.reschedule()
+
+def no_waves(game):
+    """Spawn no zombies at all."""
+    game.next_spawn = float("inf")
+    game.reschedule()
+
+def empty(m, seed):
+    """Day lawn, nothing planted and no zombies: the fixed cost of a tick."""
+    random.seed(seed)
+    game = m.Game("1-1")
+    no_waves(game)
+    return game
+
+def full_board(m, seed):
+    """Every cell planted with non-shooters and zombies stuck eating the last column."""
+    random.seed(seed)
+    game = m.Game("1-5")
+    no_waves(game)
+    for row in range(m.GRID_ROWS):
+        for col in range(m.GRID_COLS):
+            place(m, game, row, col, "wallnut" if col == m.GRID_COLS - 1 else "sunflower", sturdy=True)
+        for i in range(4):
+            add_zombie(m, game, row, (m.GRID_COLS - 1) * m.CELL_SIZE + 20 + i * 5, "bucket")
+    return game
+
+def repeater_wall(m, seed):
+    """Four columns of repeaters behind wall-nuts against a zombie every 10 ticks."""
+    random.seed(seed)
+    game = m.Game("1-9")
+    for row in range(m.GRID_ROWS):
+        for col in range(4):
+            place(m, game, row, col, "repeater", sturdy=True)
+        place(m, game, row, 4, "wallnut", sturdy=True)
+    heavy_waves(game)
+    return game
+
+def pool_ducky(m, seed):
+    """Pool level with lily pad shooters on the water lanes and heavy waves."""
+    random.seed(seed)
+    game = m.Game("3-5")
+    for row in range(m.GRID_ROWS):
+        for col in range(3):
+            # A plant on a lily pad replaces the pad in the grid.
+            place(m, game, row, col, "peashooter", sturdy=True)
+    heavy_waves(game)
+    return game
+
+def survival(m, seed, n):
+    """`n` zombies spread over the right half of the lawn against two shooter columns."""
+    random.seed(seed)
+    game = m.Game("1-9", "survival")
+    no_waves(game)
+    kinds = ("basic", "cone", "bucket", "newspaper", "pole")
+    for row in range(m.GRID_ROWS):
+        place(m, game, row, 0, "repeater", sturdy=True)
+        place(m, game, row, 1, "snowpea", sturdy=True)
+    for _ in range(n):
+        add_zombie(m, game, random.randrange(m.GRID_ROWS),
+                   random.uniform(m.GAME_WIDTH / 2, m.GAME_WIDTH + 200), random.choice(kinds))
+    return game
+
+def all_scenarios(sizes=SURVIVAL_SIZES):
+    """[(name, builder(m, seed), ticks scale)], ticks scale being relative to --ticks."""
+    scenarios = [("empty", empty, 1.0), ("full_board", full_board, 1.0),
+                 ("repeater_wall", repeater_wall, 1.0), ("pool_ducky", pool_ducky, 1.0)]
+    for n in sizes:
+        # Keep the big boards affordable: the work per tick grows with n.
+        scale = min(1.0, 100.0 / n) if n > 100 else 1.0
+        scenarios.append(("survival_%d" % n, lambda m, seed, n=n: survival(m, seed, n), scale))
+    return scenarios